@@ -1,7 +1,10 @@
 """ """
 
 import argparse
+import functools
+import sys
 
+import geopandas as gpd
 from shapely import geometry
 from sqlalchemy.dialects.postgresql import JSON
 from tqdm import tqdm
@@ -12,35 +15,64 @@ from src.data import loaders
 logger = tools.get_logger(__name__)
 
 
-def process_extent_buildings(
+def write_buildings(
+    buildings_gdf: gpd.GeoDataFrame,
     bounds_fid: int | str,
-    bounds_geom: geometry.Polygon,
     bounds_table: str,
     target_schema: str,
     target_table: str,
+    partition: bool = False,
 ):
     """ """
-    engine = tools.get_sqlalchemy_engine()
-    buildings_gdf = loaders.load_buildings(bounds_geom, 3035)  # type:ignore
     buildings_gdf["bounds_key"] = bounds_table
     buildings_gdf["bounds_fid"] = bounds_fid
-    buildings_gdf.to_postgis(  # type: ignore
-        target_table,
-        engine,
-        if_exists="append",
-        schema=target_schema,
-        index=True,
-        index_label="fid",
-        dtype={
-            "sources": JSON,
-            "names": JSON,
-        },
-    )
+    with tools.record_stage_stats("buildings.write") as stage:
+        tools.bulk_to_postgis(
+            buildings_gdf,
+            target_table,
+            if_exists="append",
+            schema=target_schema,
+            index=True,
+            index_label="fid",
+            partition_by="bounds_fid" if partition else None,
+            dtype={
+                "sources": JSON,
+                "names": JSON,
+            },
+        )
+        stage["rows"] = len(buildings_gdf)
+
+
+def process_extent_buildings(
+    bounds_fid: int | str,
+    bounds_geom: geometry.Polygon,
+    bounds_table: str,
+    target_schema: str,
+    target_table: str,
+    partition: bool = False,
+    overture_gdf: gpd.GeoDataFrame | None = None,
+    batch_rows: int | None = None,
+):
+    """
+    Loads and writes the buildings for the bounds, using the rows already fetched if provided.
+    If batch_rows is set, the buildings are instead streamed and written in batches to cap peak memory.
+    """
+    if batch_rows is None or overture_gdf is not None:
+        buildings_gdf = loaders.load_buildings(bounds_geom, 3035, overture_gdf)
+        write_buildings(buildings_gdf, bounds_fid, bounds_table, target_schema, target_table, partition)
+        return
+    for batch_gdf in loaders.iter_buildings(bounds_geom, 3035, batch_rows):
+        # skip empty batches so that a new table isn't created from an empty frame's dtypes
+        if not batch_gdf.empty:
+            write_buildings(batch_gdf, bounds_fid, bounds_table, target_schema, target_table, partition)
 
 
-def load_overture_buildings(drop: bool = False) -> None:
+def load_overture_buildings(
+    drop: bool = False, partition: bool = False, parallel_workers: int = 1, batch_rows: int | None = None
+) -> list[int | str]:
     """ """
     logger.info("Loading overture buildings")
+    tools.start_query_stats_run()
     tools.prepare_schema("overture")
     load_key = "overture_buildings"
     bounds_schema = "eu"
@@ -48,40 +80,56 @@ def load_overture_buildings(drop: bool = False) -> None:
     bounds_geom_col = "geom"
     bounds_fid_col = "fid"
     target_schema = "overture"
-    target_table = "overture_buildings"
     bounds_fids_geoms = tools.iter_boundaries(bounds_schema, bounds_table, bounds_fid_col, bounds_geom_col, wgs84=True)
-    # iter
-    for bound_fid, bound_geom in tqdm(bounds_fids_geoms):
-        tools.process_func_with_bound_tracking(
-            bound_fid=bound_fid,
-            load_key=load_key,
-            core_function=process_extent_buildings,
-            func_args=[
-                bound_fid,
-                bound_geom,
-                bounds_table,
-                target_schema,
-                target_table,
-            ],
-            content_schema=target_schema,
-            content_tables=[target_table],
-            bounds_schema=bounds_schema,
-            bounds_table=bounds_table,
-            bounds_geom_col=bounds_geom_col,
-            bounds_fid_col=bounds_fid_col,
-            drop=drop,
-        )
+    process_bounds = functools.partial(
+        tools.process_extent_with_bound_tracking,
+        process_extent=process_extent_buildings,
+        load_key=load_key,
+        target_schema=target_schema,
+        bounds_schema=bounds_schema,
+        bounds_table=bounds_table,
+        bounds_geom_col=bounds_geom_col,
+        bounds_fid_col=bounds_fid_col,
+        drop=drop,
+        partition=partition,
+        batch_rows=batch_rows,
+    )
+    bounds_args = ((bound_fid, [bound_fid, bound_geom]) for bound_fid, bound_geom in tqdm(bounds_fids_geoms))
+    return tools.process_bounds_in_pool(process_bounds, bounds_args, parallel_workers)
 
 
 if __name__ == "__main__":
     """
     Examples are run from the project folder (the folder containing src)
     python -m src.data.ingest_overture_buildings
+    python -m src.data.ingest_overture_buildings --parallel_workers 4 --batch_rows 100000
     """
     if True:
         parser = argparse.ArgumentParser(description="Load overture buildings to DB.")
         parser.add_argument("--drop", action="store_true", help="Whether to drop existing tables.")
+        parser.add_argument(
+            "--partition",
+            action="store_true",
+            help="Whether to list partition newly created tables by bounds_fid so that reloads drop partitions.",
+        )
+        parser.add_argument(
+            "--parallel_workers",
+            type=int,
+            default=1,
+            help="The number of processes to use for loading bounds in parallel. Defaults to 1.",
+        )
+        parser.add_argument(
+            "--batch_rows",
+            type=int,
+            default=None,
+            help=(
+                "Stream the buildings for each bounds in batches of up to this many rows to cap peak memory "
+                "for very large bounds. Defaults to loading each bounds at once."
+            ),
+        )
         args = parser.parse_args()
-        load_overture_buildings(drop=args.drop)
+        failed_fids = load_overture_buildings(args.drop, args.partition, args.parallel_workers, args.batch_rows)
+        if failed_fids:
+            sys.exit(1)
     else:
         load_overture_buildings(drop=False)
@@ -1,7 +1,10 @@
 """ """
 
 import argparse
+import functools
+import sys
 
+import geopandas as gpd
 from shapely import geometry
 from sqlalchemy.dialects.postgresql import JSON
 from tqdm import tqdm
@@ -18,30 +21,35 @@ def process_extent_infrast(
     bounds_table: str,
     target_schema: str,
     target_table: str,
+    partition: bool = False,
+    overture_gdf: gpd.GeoDataFrame | None = None,
 ):
-    """ """
-    engine = tools.get_sqlalchemy_engine()
-    infrast_gdf = loaders.load_infrastructure(bounds_geom, 3035)
+    """Loads and writes the infrastructure for the bounds, using the rows already fetched if provided."""
+    infrast_gdf = loaders.load_infrastructure(bounds_geom, 3035, overture_gdf)
     infrast_gdf["bounds_key"] = bounds_table
     infrast_gdf["bounds_fid"] = bounds_fid
-    infrast_gdf.to_postgis(  # type: ignore
-        target_table,
-        engine,
-        if_exists="append",
-        schema=target_schema,
-        index=True,
-        index_label="fid",
-        dtype={
-            "sources": JSON,
-            "names": JSON,
-            "source_tags": JSON,
-        },
-    )
+    with tools.record_stage_stats("infrastructure.write") as stage:
+        tools.bulk_to_postgis(
+            infrast_gdf,
+            target_table,
+            if_exists="append",
+            schema=target_schema,
+            index=True,
+            index_label="fid",
+            partition_by="bounds_fid" if partition else None,
+            dtype={
+                "sources": JSON,
+                "names": JSON,
+                "source_tags": JSON,
+            },
+        )
+        stage["rows"] = len(infrast_gdf)
 
 
-def load_overture_infrast(drop: bool = False) -> None:
+def load_overture_infrast(drop: bool = False, partition: bool = False, parallel_workers: int = 1) -> list[int | str]:
     """ """
     logger.info("Loading overture infrastructure")
+    tools.start_query_stats_run()
     tools.prepare_schema("overture")
     load_key = "overture_infrast"
     bounds_schema = "eu"
@@ -49,29 +57,21 @@ def load_overture_infrast(drop: bool = False) -> None:
     bounds_geom_col = "geom"
     bounds_fid_col = "fid"
     target_schema = "overture"
-    target_table = "overture_infrast"
     bounds_fids_geoms = tools.iter_boundaries(bounds_schema, bounds_table, bounds_fid_col, bounds_geom_col, wgs84=True)
-    # iter
-    for bound_fid, bound_geom in tqdm(bounds_fids_geoms):
-        tools.process_func_with_bound_tracking(
-            bound_fid=bound_fid,
-            load_key=load_key,
-            core_function=process_extent_infrast,
-            func_args=[
-                bound_fid,
-                bound_geom,
-                bounds_table,
-                target_schema,
-                target_table,
-            ],
-            content_schema=target_schema,
-            content_tables=[target_table],
-            bounds_schema=bounds_schema,
-            bounds_table=bounds_table,
-            bounds_geom_col=bounds_geom_col,
-            bounds_fid_col=bounds_fid_col,
-            drop=drop,
-        )
+    process_bounds = functools.partial(
+        tools.process_extent_with_bound_tracking,
+        process_extent=process_extent_infrast,
+        load_key=load_key,
+        target_schema=target_schema,
+        bounds_schema=bounds_schema,
+        bounds_table=bounds_table,
+        bounds_geom_col=bounds_geom_col,
+        bounds_fid_col=bounds_fid_col,
+        drop=drop,
+        partition=partition,
+    )
+    bounds_args = ((bound_fid, [bound_fid, bound_geom]) for bound_fid, bound_geom in tqdm(bounds_fids_geoms))
+    return tools.process_bounds_in_pool(process_bounds, bounds_args, parallel_workers)
 
 
 if __name__ == "__main__":
@@ -82,7 +82,22 @@ if __name__ == "__main__":
     if True:
         parser = argparse.ArgumentParser(description="Load overture infrastructure to DB.")
         parser.add_argument("--drop", action="store_true", help="Whether to drop existing tables.")
+        parser.add_argument(
+            "--partition",
+            action="store_true",
+            help="Whether to list partition newly created tables by bounds_fid so that reloads drop partitions.",
+        )
+        parser.add_argument(
+            "--parallel_workers",
+            type=int,
+            default=1,
+            help="The number of processes to use for loading bounds in parallel. Defaults to 1.",
+        )
         args = parser.parse_args()
-        load_overture_infrast(drop=args.drop)
+        failed_fids = load_overture_infrast(
+            drop=args.drop, partition=args.partition, parallel_workers=args.parallel_workers
+        )
+        if failed_fids:
+            sys.exit(1)
     else:
         load_overture_infrast(drop=False)
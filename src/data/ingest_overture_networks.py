@@ -3,9 +3,11 @@
 import argparse
 import concurrent.futures
 import os
+import sys
 import traceback
 
-from cityseer.tools import graphs, io
+import pandas as pd
+import shapely
 from shapely import geometry
 from sqlalchemy.dialects.postgresql import JSON
 
@@ -24,86 +26,208 @@ def process_extent_network(
     target_edges_table: str,
     target_clean_nodes_table: str,
     target_clean_edges_table: str,
+    partition: bool = False,
+    tile_size: int | None = None,
+    tile_overlap: int = 2000,
+    tile_workers: int = 1,
 ):
     """ """
-    engine = tools.get_sqlalchemy_engine()
-    nodes_gdf, edges_gdf, clean_edges_gdf = loaders.load_network(bounds_geom, 3035)
+    partition_by = "bounds_fid" if partition else None
+    # hydrated from the on-disk network cache if NETWORK_CACHE_DIR is set
+    nodes_gdf, edges_gdf, _clean_edges_gdf, nodes_dual_gdf, edges_dual_gdf = loaders.load_network_cached(
+        bounds_geom, 3035, tile_size=tile_size, tile_overlap=tile_overlap, tile_workers=tile_workers
+    )
     # NODES
     nodes_gdf["bounds_key"] = bounds_table
     nodes_gdf["bounds_fid"] = bounds_fid
-    nodes_gdf.to_postgis(  # type: ignore
-        target_nodes_table,
-        engine,
-        if_exists="append",
-        schema=target_schema,
-        index=True,
-        index_label="fid",
-        dtype={
-            "sources": JSON,
-        },
-    )
+    with tools.record_stage_stats("network.write_nodes") as stage:
+        tools.bulk_to_postgis(
+            nodes_gdf,
+            target_nodes_table,
+            if_exists="append",
+            schema=target_schema,
+            index=True,
+            index_label="fid",
+            partition_by=partition_by,
+            dtype={
+                "sources": JSON,
+            },
+        )
+        stage["rows"] = len(nodes_gdf)
     # EDGES
     edges_gdf["bounds_key"] = bounds_table
     edges_gdf["bounds_fid"] = bounds_fid
-    edges_gdf.to_postgis(  # type: ignore
-        target_edges_table,
-        engine,
-        if_exists="append",
-        schema=target_schema,
-        index=True,
-        index_label="fid",
-        dtype={
-            "sources": JSON,
-            "names": JSON,
-            "connectors": JSON,
-            "routes": JSON,
-            "subclass_rules": JSON,
-            "access_restrictions": JSON,
-            "level_rules": JSON,
-            "destinations": JSON,
-            "prohibited_transitions": JSON,
-            "road_surface": JSON,
-            "road_flags": JSON,
-            "speed_limits": JSON,
-            "width_rules": JSON,
-        },
-    )
+    with tools.record_stage_stats("network.write_edges") as stage:
+        tools.bulk_to_postgis(
+            edges_gdf,
+            target_edges_table,
+            if_exists="append",
+            schema=target_schema,
+            index=True,
+            index_label="fid",
+            partition_by=partition_by,
+            dtype={
+                "sources": JSON,
+                "names": JSON,
+                "connectors": JSON,
+                "routes": JSON,
+                "subclass_rules": JSON,
+                "access_restrictions": JSON,
+                "level_rules": JSON,
+                "destinations": JSON,
+                "prohibited_transitions": JSON,
+                "road_surface": JSON,
+                "road_flags": JSON,
+                "speed_limits": JSON,
+                "width_rules": JSON,
+            },
+        )
+        stage["rows"] = len(edges_gdf)
     # DUAL CLEAN NETWORK
-    nx_clean = io.nx_from_generic_geopandas(clean_edges_gdf)
-    # cast to dual
-    nx_dual = graphs.nx_to_dual(nx_clean)
-    # back to GDF
-    nodes_dual_gdf, edges_dual_gdf, _network_structure = io.network_structure_from_nx(nx_dual, crs=3035)
-    # write
     nodes_dual_gdf["bounds_key"] = bounds_table
     nodes_dual_gdf["bounds_fid"] = bounds_fid
-    nodes_dual_gdf.to_postgis(
-        target_clean_nodes_table,
-        engine,
-        if_exists="append",
-        schema=target_schema,
-        index=True,
-        index_label="fid",
-    )
+    with tools.record_stage_stats("network.write_dual_nodes") as stage:
+        tools.bulk_to_postgis(
+            nodes_dual_gdf,
+            target_clean_nodes_table,
+            if_exists="append",
+            schema=target_schema,
+            index=True,
+            index_label="fid",
+            partition_by=partition_by,
+        )
+        stage["rows"] = len(nodes_dual_gdf)
     edges_dual_gdf["bounds_key"] = bounds_table
     edges_dual_gdf["bounds_fid"] = bounds_fid
-    edges_dual_gdf.to_postgis(
-        target_clean_edges_table,
-        engine,
-        if_exists="append",
-        schema=target_schema,
-        index=True,
-        index_label="fid",
+    with tools.record_stage_stats("network.write_dual_edges") as stage:
+        tools.bulk_to_postgis(
+            edges_dual_gdf,
+            target_clean_edges_table,
+            if_exists="append",
+            schema=target_schema,
+            index=True,
+            index_label="fid",
+            partition_by=partition_by,
+        )
+        stage["rows"] = len(edges_dual_gdf)
+
+
+def _edge_signatures(edges_df: pd.DataFrame) -> pd.Series:
+    """Signatures from the segment geometry, class, and connector ids, i.e. the inputs to the road graph."""
+    connector_ids = tools.explode_struct_key(edges_df["connectors"], "connector_id").dropna().astype(str)
+    joined_ids = connector_ids.groupby(level=0).agg(",".join).reindex(range(len(edges_df)), fill_value="")
+    attrs = [f"{road_class}|{ids}" for road_class, ids in zip(edges_df["class"], joined_ids, strict=True)]
+    return pd.Series(tools.geometry_signatures(edges_df["geom"], attrs), index=edges_df.index)
+
+
+def diff_extent_network(
+    bounds_fid: int | str,
+    bounds_geom: geometry.Polygon,
+    target_schema: str,
+    target_nodes_table: str,
+    target_edges_table: str,
+    release: str,
+) -> dict[str, dict[str, int]]:
+    """Compares the stored connectors and segments for the bounds against those from the Overture release."""
+    bounds_geom_crs = tools.reproject_geometry(bounds_geom, 4326, 3035)
+    nodes_gdf, edges_gdf = loaders.fetch_network(bounds_geom, 3035, release=release)
+    # trimmed as per the stored content
+    nodes_gdf = tools.trim_to_bounds(nodes_gdf, bounds_geom_crs)
+    edges_gdf = tools.trim_to_bounds(edges_gdf, bounds_geom_crs)
+    stored_nodes = tools.db_fetch(
+        f"""
+        SELECT fid, geom
+        FROM {target_schema}.{target_nodes_table}
+        WHERE bounds_fid = %s;
+        """,
+        (bounds_fid,),  # type: ignore
+    )
+    stored_edges = tools.db_fetch(
+        f"""
+        SELECT fid, class, connectors, geom
+        FROM {target_schema}.{target_edges_table}
+        WHERE bounds_fid = %s;
+        """,
+        (bounds_fid,),  # type: ignore
     )
+    stored_nodes_df = pd.DataFrame(stored_nodes, columns=["fid", "geom"]).set_index("fid")
+    stored_edges_df = pd.DataFrame(stored_edges, columns=["fid", "class", "connectors", "geom"]).set_index("fid")
+    stored_nodes_df["geom"] = shapely.from_wkb(stored_nodes_df["geom"])
+    stored_edges_df["geom"] = shapely.from_wkb(stored_edges_df["geom"])
+    return {
+        "connectors": tools.diff_signatures(
+            pd.Series(tools.geometry_signatures(stored_nodes_df["geom"]), index=stored_nodes_df.index),
+            pd.Series(tools.geometry_signatures(nodes_gdf.geometry), index=nodes_gdf.index),
+        ),
+        "segments": tools.diff_signatures(_edge_signatures(stored_edges_df), _edge_signatures(edges_gdf)),
+    }
+
+
+def find_changed_bounds(
+    bounds_fids_geoms: list[tuple[int | str, geometry.Polygon]],
+    target_fids: list[int],
+    target_schema: str,
+    target_nodes_table: str,
+    target_edges_table: str,
+    parallel_workers: int = 1,
+) -> list[int]:
+    """Returns the target bounds fids whose road network changed in the current Overture release."""
+    release = loaders.overture_release()
+    logger.info(f"Comparing stored networks against Overture release {release}")
+    changed_fids = []
+    futures = {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=parallel_workers) as executor:
+        for bound_fid, bound_geom in bounds_fids_geoms:
+            if bound_fid not in target_fids:
+                continue
+            args = (bound_fid, bound_geom, target_schema, target_nodes_table, target_edges_table, release)
+            futures[executor.submit(diff_extent_network, *args)] = bound_fid
+        for future in concurrent.futures.as_completed(futures):
+            bound_fid = futures[future]
+            try:
+                diffs = future.result()
+            except Exception:
+                # rebuilt rather than risk keeping a stale network
+                logger.error(f"Failed to diff bounds fid {bound_fid}, treating as changed:\n{traceback.format_exc()}")
+                changed_fids.append(int(bound_fid))
+                continue
+            if any(count for diff in diffs.values() for count in diff.values()):
+                logger.info(f"Network changed for bounds fid {bound_fid}: {diffs}")
+                changed_fids.append(int(bound_fid))
+    logger.info(f"Networks changed for {len(changed_fids)} of {len(futures)} bounds")
+    return sorted(changed_fids)
+
+
+def mark_changed_bounds_dirty(changed_fids: list[int], load_key: str, bounds_schema: str, bounds_table: str) -> None:
+    """Marks the network tracking rows and the metrics tracking rows for the affected metrics bounds as dirty."""
+    if not changed_fids:
+        return
+    tools.tracking_state_set_dirty(load_key, changed_fids)
+    # metrics are tracked per eu.bounds and use dual networks within the 10km buffer
+    if tools.check_table_exists("loads", "metrics"):
+        metrics_fids = tools.db_fetch(
+            f"""
+            SELECT DISTINCT b.fid
+            FROM eu.bounds b, {bounds_schema}.{bounds_table} u
+            WHERE u.fid = ANY(%s) AND ST_Intersects(b.geom_10000, u.geom);
+            """,
+            (changed_fids,),  # type: ignore
+        )
+        tools.tracking_state_set_dirty("metrics", [metrics_fid[0] for metrics_fid in metrics_fids])
 
 
 def process_network(
     target_bounds_fids: list[int] | str,
     drop: bool = False,
     parallel_workers: int = 1,
-):
+    partition: bool = False,
+    tile_size: int | None = None,
+    tile_overlap: int = 2000,
+    diff: bool = False,
+) -> list[int | str]:
     """ """
     logger.info("Preparing cleaned networks")
+    tools.start_query_stats_run()
     load_key = "dual_edges"
     bounds_schema = "eu"
     bounds_table = "unioned_bounds_10000"
@@ -125,50 +249,69 @@ def process_network(
     # set to quiet mode
     os.environ["CITYSEER_QUIET_MODE"] = "true"
 
-    futures = {}
-    with concurrent.futures.ProcessPoolExecutor(max_workers=parallel_workers) as executor:
-        try:
-            for bound_fid, bound_geom in bounds_fids_geoms:
-                if bound_fid not in target_fids:
-                    continue
-                args = (
-                    bound_fid,
-                    load_key,
-                    process_extent_network,
-                    [
-                        bound_fid,
-                        bound_geom,
-                        bounds_table,
-                        target_schema,
-                        target_nodes_table,
-                        target_edges_table,
-                        target_clean_nodes_table,
-                        target_clean_edges_table,
-                    ],
-                    target_schema,
-                    [target_nodes_table, target_edges_table, target_clean_nodes_table, target_clean_edges_table],
-                    bounds_schema,
-                    bounds_table,
-                    bounds_geom_col,
-                    bounds_fid_col,
-                    drop,
-                )
-                futures[executor.submit(tools.process_func_with_bound_tracking, *args)] = args
-            for future in concurrent.futures.as_completed(futures):
-                try:
-                    future.result()
-                except Exception as exc:
-                    logger.error(traceback.format_exc())
-                    raise RuntimeError("An error occurred in the background task") from exc
-        except KeyboardInterrupt:
-            executor.shutdown(wait=True, cancel_futures=True)
-            raise
+    # only rebuild bounds with changed road networks - these are marked dirty so that their tracking rows reload
+    if diff:
+        target_fids = find_changed_bounds(
+            bounds_fids_geoms, target_fids, target_schema, target_nodes_table, target_edges_table, parallel_workers
+        )
+        mark_changed_bounds_dirty(target_fids, load_key, bounds_schema, bounds_table)
+
+    def bounds_args(bound_fid, bound_geom, bounds_tile_size, bounds_tile_workers):
+        return [
+            bound_fid,
+            load_key,
+            process_extent_network,
+            [
+                bound_fid,
+                bound_geom,
+                bounds_table,
+                target_schema,
+                target_nodes_table,
+                target_edges_table,
+                target_clean_nodes_table,
+                target_clean_edges_table,
+                partition,
+                bounds_tile_size,
+                tile_overlap,
+                bounds_tile_workers,
+            ],
+            target_schema,
+            [target_nodes_table, target_edges_table, target_clean_nodes_table, target_clean_edges_table],
+            bounds_schema,
+            bounds_table,
+            bounds_geom_col,
+            bounds_fid_col,
+            drop,
+        ]
+
+    # oversized bounds are built one at a time with their tiles spread across the workers
+    # this avoids giant bounds running single threaded while other workers go idle
+    tiled_args = []
+    if tile_size is not None:
+        for bound_fid, bound_geom in bounds_fids_geoms:
+            if bound_fid not in target_fids:
+                continue
+            min_x, min_y, max_x, max_y = tools.reproject_geometry(bound_geom, 4326, 3035).bounds
+            if max(max_x - min_x, max_y - min_y) > tile_size:
+                tiled_args.append((bound_fid, bounds_args(bound_fid, bound_geom, tile_size, parallel_workers)))
+    # run in process so that the tiles can use the workers - failures are collected rather than ending the run
+    failed_fids = tools.process_bounds_in_pool(tools.process_func_with_bound_tracking, tiled_args, 1)
+
+    tiled_fids = {bound_fid for bound_fid, _args in tiled_args}
+    untiled_args = (
+        (bound_fid, bounds_args(bound_fid, bound_geom, None, 1))
+        for bound_fid, bound_geom in bounds_fids_geoms
+        if bound_fid in target_fids and bound_fid not in tiled_fids
+    )
+    failed_fids += tools.process_bounds_in_pool(tools.process_func_with_bound_tracking, untiled_args, parallel_workers)
+    return failed_fids
 
 
 if __name__ == "__main__":
     """
     Examples are run from the project folder (the folder containing src)
     python -m src.data.ingest_overture_networks all --parallel_workers 4
+    python -m src.data.ingest_overture_networks all --parallel_workers 4 --diff
     """
 
     if True:
@@ -185,12 +328,48 @@ if __name__ == "__main__":
             help="The number of CPU cores to use for processing bounds in parallel. Defaults to 2.",
         )
         parser.add_argument("--drop", action="store_true", help="Whether to drop existing tables.")
+        parser.add_argument(
+            "--partition",
+            action="store_true",
+            help="Whether to list partition newly created tables by bounds_fid so that reloads drop partitions.",
+        )
+        parser.add_argument(
+            "--tile_size",
+            type=int,
+            default=None,
+            help=(
+                "Tile size in metres. Bounds exceeding this width or height are cleaned in overlapping tiles "
+                "across the parallel workers, then stitched. Defaults to no tiling."
+            ),
+        )
+        parser.add_argument(
+            "--tile_overlap",
+            type=int,
+            default=2000,
+            help="Overlap in metres between neighbouring tiles. Defaults to 2000.",
+        )
+        parser.add_argument(
+            "--diff",
+            action="store_true",
+            help=(
+                "Compare stored segments and connectors against the current Overture release "
+                "and only rebuild bounds with changed networks, marking their metrics for reprocessing."
+            ),
+        )
         args = parser.parse_args()
-        process_network(
+        if args.diff and args.drop:
+            parser.error("--diff cannot be combined with --drop.")
+        failed_fids = process_network(
             args.bounds_fid,
             args.drop,
             args.parallel_workers,
+            args.partition,
+            args.tile_size,
+            args.tile_overlap,
+            args.diff,
         )
+        if failed_fids:
+            sys.exit(1)
     else:
         bounds_fids = [269]
         process_network(
@@ -4,7 +4,10 @@ Taken from https://github.com/OvertureMaps/schema/blob/0f9fdbcd88e7c0fc08e9c8c68
 """
 
 import argparse
+import functools
+import sys
 
+import geopandas as gpd
 from shapely import geometry
 from sqlalchemy.dialects.postgresql import JSON
 from tqdm import tqdm
@@ -14,8 +17,6 @@ from src.data import loaders
 
 logger = tools.get_logger(__name__)
 
-OVERTURE_SCHEMA = tools.generate_overture_schema()
-
 
 def process_extent_places(
     bounds_fid: int | str,
@@ -23,36 +24,41 @@ def process_extent_places(
     bounds_table: str,
     target_schema: str,
     target_table: str,
+    partition: bool = False,
+    overture_gdf: gpd.GeoDataFrame | None = None,
 ):
-    """ """
-    engine = tools.get_sqlalchemy_engine()
-    places_gdf = loaders.load_places(bounds_geom, 3035)
+    """Loads and writes the places for the bounds, using the rows already fetched if provided."""
+    places_gdf = loaders.load_places(bounds_geom, 3035, overture_gdf)
     places_gdf["bounds_key"] = bounds_table
     places_gdf["bounds_fid"] = bounds_fid
-    places_gdf.to_postgis(  # type: ignore
-        target_table,
-        engine,
-        if_exists="append",
-        schema=target_schema,
-        index=True,
-        index_label="fid",
-        dtype={
-            "sources": JSON,
-            "names": JSON,
-            "categories": JSON,
-            "brand": JSON,
-            "addresses": JSON,
-            "websites": JSON,
-            "socials": JSON,
-            "emails": JSON,
-            "phones": JSON,
-        },
-    )
+    with tools.record_stage_stats("places.write") as stage:
+        tools.bulk_to_postgis(
+            places_gdf,
+            target_table,
+            if_exists="append",
+            schema=target_schema,
+            index=True,
+            index_label="fid",
+            partition_by="bounds_fid" if partition else None,
+            dtype={
+                "sources": JSON,
+                "names": JSON,
+                "categories": JSON,
+                "brand": JSON,
+                "addresses": JSON,
+                "websites": JSON,
+                "socials": JSON,
+                "emails": JSON,
+                "phones": JSON,
+            },
+        )
+        stage["rows"] = len(places_gdf)
 
 
-def load_overture_places(drop: bool = False) -> None:
+def load_overture_places(drop: bool = False, partition: bool = False, parallel_workers: int = 1) -> list[int | str]:
     """ """
     logger.info("Loading overture places")
+    tools.start_query_stats_run()
     tools.prepare_schema("overture")
     load_key = "overture_place"
     bounds_schema = "eu"
@@ -60,29 +66,21 @@ def load_overture_places(drop: bool = False) -> None:
     bounds_geom_col = "geom"
     bounds_fid_col = "fid"
     target_schema = "overture"
-    target_table = "overture_place"
     bounds_fids_geoms = tools.iter_boundaries(bounds_schema, bounds_table, bounds_fid_col, bounds_geom_col, wgs84=True)
-    # iter
-    for bound_fid, bound_geom in tqdm(bounds_fids_geoms):
-        tools.process_func_with_bound_tracking(
-            bound_fid=bound_fid,
-            load_key=load_key,
-            core_function=process_extent_places,
-            func_args=[
-                bound_fid,
-                bound_geom,
-                bounds_table,
-                target_schema,
-                target_table,
-            ],
-            content_schema=target_schema,
-            content_tables=[target_table],
-            bounds_schema=bounds_schema,
-            bounds_table=bounds_table,
-            bounds_geom_col=bounds_geom_col,
-            bounds_fid_col=bounds_fid_col,
-            drop=drop,
-        )
+    process_bounds = functools.partial(
+        tools.process_extent_with_bound_tracking,
+        process_extent=process_extent_places,
+        load_key=load_key,
+        target_schema=target_schema,
+        bounds_schema=bounds_schema,
+        bounds_table=bounds_table,
+        bounds_geom_col=bounds_geom_col,
+        bounds_fid_col=bounds_fid_col,
+        drop=drop,
+        partition=partition,
+    )
+    bounds_args = ((bound_fid, [bound_fid, bound_geom]) for bound_fid, bound_geom in tqdm(bounds_fids_geoms))
+    return tools.process_bounds_in_pool(process_bounds, bounds_args, parallel_workers)
 
 
 if __name__ == "__main__":
@@ -93,7 +91,22 @@ if __name__ == "__main__":
     if True:
         parser = argparse.ArgumentParser(description="Load overture places to DB.")
         parser.add_argument("--drop", action="store_true", help="Whether to drop existing tables.")
+        parser.add_argument(
+            "--partition",
+            action="store_true",
+            help="Whether to list partition newly created tables by bounds_fid so that reloads drop partitions.",
+        )
+        parser.add_argument(
+            "--parallel_workers",
+            type=int,
+            default=1,
+            help="The number of processes to use for loading bounds in parallel. Defaults to 1.",
+        )
         args = parser.parse_args()
-        load_overture_places(drop=args.drop)
+        failed_fids = load_overture_places(
+            drop=args.drop, partition=args.partition, parallel_workers=args.parallel_workers
+        )
+        if failed_fids:
+            sys.exit(1)
     else:
         load_overture_places(drop=False)
@@ -0,0 +1,191 @@
+"""
+Loads the buildings, infrastructure, and places in a single pass over the bounds.
+The themes are fetched concurrently per bounds, then written per the individual ingestion scripts.
+Each theme keeps its own tracking table, so this can be combined with, or resumed by, the individual scripts.
+"""
+
+import argparse
+import functools
+import sys
+import traceback
+
+from shapely import geometry
+from tqdm import tqdm
+
+from src import tools
+from src.data import ingest_overture_buildings, ingest_overture_infrast, ingest_overture_places, loaders
+
+logger = tools.get_logger(__name__)
+
+# Overture type: load key and target table, extent processing function
+THEMES = {
+    "building": ("overture_buildings", ingest_overture_buildings.process_extent_buildings),
+    "infrastructure": ("overture_infrast", ingest_overture_infrast.process_extent_infrast),
+    "place": ("overture_place", ingest_overture_places.process_extent_places),
+}
+
+
+def process_bounds_themes(
+    bound_fid: int | str,
+    bound_geom: geometry.Polygon,
+    overture_types: list[str],
+    bounds_schema: str,
+    bounds_table: str,
+    bounds_geom_col: str,
+    bounds_fid_col: str,
+    target_schema: str,
+    drop: bool = False,
+    partition: bool = False,
+    batch_rows: int | None = None,
+) -> bool:
+    """
+    Fetches the themes still to be loaded for the bounds together, then writes each with its own tracking.
+    If batch_rows is set, the buildings are instead streamed in batches after the other themes are written.
+    A theme failing to load doesn't stop the remaining themes. If the fetch fails, each fetched theme is failed.
+    Returns False if any of the themes are held by another worker, as per process_extent_with_bound_tracking.
+    """
+    pending_types = [
+        overture_type
+        for overture_type in overture_types
+        if drop or not tools.tracking_state_check_loaded(THEMES[overture_type][0], bound_fid)
+    ]
+    if not pending_types:
+        return True
+    stream_types = ["building"] if batch_rows is not None and "building" in pending_types else []
+    fetch_types = [overture_type for overture_type in pending_types if overture_type not in stream_types]
+    failed_types = []
+    held_types = []
+    theme_gdfs = {}
+    if fetch_types:
+        try:
+            with tools.query_stats_bounds(bound_fid):
+                theme_gdfs = loaders.fetch_overture_types(bound_geom, 3035, fetch_types)
+        except Exception as err:
+            logger.error(f"Failed to fetch themes for bounds fid {bound_fid}:\n{traceback.format_exc()}")
+            # claim so that the failures are recorded against the themes' tracking rows
+            worker = tools.tracking_worker_id()
+            for overture_type in fetch_types:
+                load_key = THEMES[overture_type][0]
+                if tools.tracking_claim(load_key, worker, bounds_fid=bound_fid, reclaim_done=drop) is not None:
+                    tools.tracking_state_set_failed(load_key, bound_fid, worker, repr(err))
+            failed_types.extend(fetch_types)
+    # streamed themes go last so that the fetched themes are released first
+    for overture_type in [*fetch_types, *stream_types]:
+        if overture_type in failed_types:
+            continue
+        load_key, process_extent = THEMES[overture_type]
+        if overture_type in stream_types:
+            extent_kwargs = {"batch_rows": batch_rows}
+        else:
+            extent_kwargs = {"overture_gdf": theme_gdfs.pop(overture_type)}
+        try:
+            claimed = tools.process_extent_with_bound_tracking(
+                bound_fid,
+                bound_geom,
+                process_extent=process_extent,
+                load_key=load_key,
+                target_schema=target_schema,
+                bounds_schema=bounds_schema,
+                bounds_table=bounds_table,
+                bounds_geom_col=bounds_geom_col,
+                bounds_fid_col=bounds_fid_col,
+                drop=drop,
+                partition=partition,
+                **extent_kwargs,
+            )
+        except Exception:
+            logger.error(f"Failed to load {overture_type} for bounds fid {bound_fid}:\n{traceback.format_exc()}")
+            failed_types.append(overture_type)
+            continue
+        if not claimed:
+            held_types.append(overture_type)
+    if failed_types:
+        raise RuntimeError(f"Failed to load {', '.join(failed_types)} for bounds fid {bound_fid}.")
+    return not held_types
+
+
+def load_overture_themes(
+    overture_types: list[str],
+    drop: bool = False,
+    partition: bool = False,
+    parallel_workers: int = 1,
+    batch_rows: int | None = None,
+) -> list[int | str]:
+    """ """
+    logger.info(f"Loading overture themes: {', '.join(overture_types)}")
+    tools.start_query_stats_run()
+    tools.prepare_schema("overture")
+    bounds_schema = "eu"
+    bounds_table = "unioned_bounds_2000"
+    bounds_geom_col = "geom"
+    bounds_fid_col = "fid"
+    target_schema = "overture"
+    if not tools.check_table_exists(bounds_schema, bounds_table):
+        raise OSError(f"Cannot proceed because the {bounds_schema}.{bounds_table} table does not exist.")
+    for overture_type in overture_types:
+        tools.init_tracking_table(
+            THEMES[overture_type][0], bounds_schema, bounds_table, bounds_fid_col, bounds_geom_col
+        )
+    bounds_fids_geoms = tools.iter_boundaries(bounds_schema, bounds_table, bounds_fid_col, bounds_geom_col, wgs84=True)
+    process_bounds = functools.partial(
+        process_bounds_themes,
+        overture_types=overture_types,
+        bounds_schema=bounds_schema,
+        bounds_table=bounds_table,
+        bounds_geom_col=bounds_geom_col,
+        bounds_fid_col=bounds_fid_col,
+        target_schema=target_schema,
+        drop=drop,
+        partition=partition,
+        batch_rows=batch_rows,
+    )
+    bounds_args = ((bound_fid, [bound_fid, bound_geom]) for bound_fid, bound_geom in tqdm(bounds_fids_geoms))
+    return tools.process_bounds_in_pool(process_bounds, bounds_args, parallel_workers)
+
+
+if __name__ == "__main__":
+    """
+    Examples are run from the project folder (the folder containing src)
+    python -m src.data.ingest_overture_themes
+    python -m src.data.ingest_overture_themes --themes building place
+    python -m src.data.ingest_overture_themes --parallel_workers 4 --batch_rows 100000
+    """
+    if True:
+        parser = argparse.ArgumentParser(description="Load overture buildings, infrastructure, and places to DB.")
+        parser.add_argument(
+            "--themes",
+            type=str,
+            nargs="+",
+            choices=list(THEMES),
+            default=list(THEMES),
+            help="The Overture types to load. Defaults to all.",
+        )
+        parser.add_argument("--drop", action="store_true", help="Whether to drop existing tables.")
+        parser.add_argument(
+            "--partition",
+            action="store_true",
+            help="Whether to list partition newly created tables by bounds_fid so that reloads drop partitions.",
+        )
+        parser.add_argument(
+            "--parallel_workers",
+            type=int,
+            default=1,
+            help="The number of processes to use for loading bounds in parallel. Defaults to 1.",
+        )
+        parser.add_argument(
+            "--batch_rows",
+            type=int,
+            default=None,
+            help=(
+                "Stream the buildings for each bounds in batches of up to this many rows to cap peak memory "
+                "for very large bounds. Defaults to fetching the buildings with the other themes."
+            ),
+        )
+        args = parser.parse_args()
+        failed_fids = load_overture_themes(
+            args.themes, args.drop, args.partition, args.parallel_workers, args.batch_rows
+        )
+        if failed_fids:
+            sys.exit(1)
+    else:
+        load_overture_themes(list(THEMES), drop=False)
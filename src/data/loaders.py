@@ -1,10 +1,26 @@
 """ """
 
+import concurrent.futures
+import contextvars
+import hashlib
+import json
 import logging
+import os
+import shutil
+from collections.abc import Iterator
+from pathlib import Path
 
 import geopandas as gpd
-from cityseer.tools import io
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import shapely
+from cityseer.tools import io, util
 from overturemaps import core
+from scipy.spatial import KDTree
 from shapely import geometry
 
 from src import tools
@@ -12,52 +28,29 @@ from src import tools
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-
-def load_network(
-    bounds_geom_wgs: geometry.Polygon,
-    crs: int,
-) -> tuple[gpd.GeoDataFrame, gpd.GeoDataFrame, gpd.GeoDataFrame]:
-    """ """
-    # NODES
-    logger.info("Loading nodes")
-    nodes_gdf = core.geodataframe("connector", bounds_geom_wgs.bounds)  # type:ignore
-    nodes_gdf.set_crs(4326, inplace=True)
-    nodes_gdf.to_crs(crs, inplace=True)
-    nodes_gdf.set_index("id", inplace=True)
-    nodes_gdf.rename(columns={"geometry": "geom"}, inplace=True)
-    nodes_gdf.set_geometry("geom", inplace=True)
-    nodes_gdf.drop(columns=["bbox"], inplace=True)
-    # EDGES
-    logger.info("Loading edges")
-    edges_gdf = core.geodataframe("segment", bounds_geom_wgs.bounds)  # type:ignore
-    edges_gdf.set_crs(4326, inplace=True)
-    edges_gdf.to_crs(crs, inplace=True)
-    edges_gdf.set_index("id", inplace=True)
-    edges_gdf.rename(columns={"geometry": "geom"}, inplace=True)
-    edges_gdf.set_geometry("geom", inplace=True)
-    edges_gdf.drop(columns=["bbox"], inplace=True)
-    # CLEAN
-    logger.info("Cleaning network")
-    edges_gdf = edges_gdf[edges_gdf["subtype"] == "road"]  # type: ignore
-    multigraph = tools.generate_graph(
-        nodes_gdf=nodes_gdf,  # type: ignore
-        edges_gdf=edges_gdf,  # type: ignore
-        # not dropping "parking_aisle" because this sometimes removes important links
-    )
-    multigraph = io._auto_clean_network(
-        multigraph,
-        geom_wgs=bounds_geom_wgs,
-        to_crs_code=crs,
-        final_clean_distances=(5, 10),
-        remove_disconnected=100,
-        green_footways=True,
-        green_service_roads=False,
-    )
-    clean_edges_gdf = io.geopandas_from_nx(multigraph, crs=crs)
-    # JSON
-    nodes_gdf["sources"] = nodes_gdf["sources"].apply(tools.col_to_json)  # type: ignore
-    for col in [
+# parameters passed to cityseer's network cleaning - these form part of the network cache key
+NETWORK_CLEAN_PARAMS = {
+    "final_clean_distances": (5, 10),
+    "remove_disconnected": 100,
+    "green_footways": True,
+    "green_service_roads": False,
+}
+# bump when changes to graph generation or cleaning should invalidate cached networks
+NETWORK_CACHE_VERSION = 1
+NETWORK_CACHE_LAYERS = ["nodes", "edges", "clean_edges", "nodes_dual", "edges_dual"]
+# columns read per Overture type: those processed or written by the loaders, so that columns added by later
+# releases don't reach the DB writes - None reads all columns
+OVERTURE_COLUMNS: dict[str, list[str] | None] = {
+    "connector": ["id", "geometry", "bbox", "version", "sources"],
+    "segment": [
+        "id",
+        "geometry",
+        "bbox",
+        "version",
         "sources",
+        "subtype",
+        "class",
+        "subclass",
         "names",
         "connectors",
         "routes",
@@ -70,54 +63,681 @@ def load_network(
         "road_flags",
         "speed_limits",
         "width_rules",
-    ]:
-        edges_gdf[col] = edges_gdf[col].apply(tools.col_to_json).astype("str")  # type: ignore
+    ],
+    "building": None,
+    "infrastructure": None,
+    "place": [
+        "id",
+        "geometry",
+        "bbox",
+        "version",
+        "sources",
+        "names",
+        "categories",
+        "confidence",
+        "websites",
+        "socials",
+        "emails",
+        "phones",
+        "brand",
+        "addresses",
+    ],
+}
+
+# download stage names per Overture type, with the stage stats count key
+OVERTURE_DOWNLOAD_STAGES = {
+    "connector": ("network.download_nodes", "nodes"),
+    "segment": ("network.download_edges", "edges"),
+    "building": ("buildings.download", "rows"),
+    "infrastructure": ("infrastructure.download", "rows"),
+    "place": ("places.download", "rows"),
+}
+
+
+def overture_mirror() -> Path | None:
+    """Returns the local Overture mirror set by the OVERTURE_MIRROR environment variable, if any."""
+    mirror_dir = os.getenv("OVERTURE_MIRROR")
+    if mirror_dir is None:
+        return None
+    return Path(mirror_dir)
+
+
+def _mirror_dataset(overture_type: str, release: str | None = None) -> ds.Dataset:
+    """ """
+    if release is None:
+        release = overture_release()
+    type_path = (
+        overture_mirror()  # type: ignore
+        / "release"
+        / release
+        / f"theme={core.type_theme_map[overture_type]}"
+        / f"type={overture_type}"
+    )
+    if not type_path.exists():
+        raise OSError(f"Overture mirror path {type_path} does not exist.")
+    return ds.dataset(type_path, format="parquet")
+
+
+def _bbox_filter(bbox: tuple[float, float, float, float]) -> pc.Expression:
+    """ """
+    xmin, ymin, xmax, ymax = bbox
+    # filtering on the bbox covering columns prunes row groups by their statistics before reading
+    return (
+        (pc.field("bbox", "xmin") < xmax)
+        & (pc.field("bbox", "xmax") > xmin)
+        & (pc.field("bbox", "ymin") < ymax)
+        & (pc.field("bbox", "ymax") > ymin)
+    )
+
+
+def _arrow_to_gdf(overture_data: pa.Table | pa.RecordBatch, columns: list[str] | None = None) -> gpd.GeoDataFrame:
+    """ """
+    if columns is not None:
+        overture_data = overture_data.select([col for col in overture_data.schema.names if col in columns])
+    overture_df = overture_data.to_pandas()
+    overture_df["geometry"] = shapely.from_wkb(overture_df["geometry"])
+    return gpd.GeoDataFrame(overture_df, geometry="geometry")  # type: ignore
+
+
+def read_overture(
+    overture_type: str,
+    bbox: tuple[float, float, float, float],
+    release: str | None = None,
+    columns: list[str] | None = None,
+) -> gpd.GeoDataFrame:
+    """
+    Reads the Overture features intersecting the WGS bbox from the local mirror if set, else from the remote release.
+    The mirror follows the release layout: release/<release>/theme=<theme>/type=<type>/*.parquet
+    """
+    if overture_mirror() is None:
+        overture_gdf: gpd.GeoDataFrame = core.geodataframe(overture_type, bbox, release=release)  # type:ignore
+        if columns is None:
+            return overture_gdf
+        return overture_gdf[[col for col in overture_gdf.columns if col in columns]]  # type: ignore
+    dataset = _mirror_dataset(overture_type, release)
+    if columns is not None:
+        columns = [col for col in dataset.schema.names if col in columns]
+    return _arrow_to_gdf(dataset.to_table(columns=columns, filter=_bbox_filter(bbox)))
+
+
+def iter_overture(
+    overture_type: str,
+    bbox: tuple[float, float, float, float],
+    release: str | None = None,
+    columns: list[str] | None = None,
+    batch_rows: int = 100_000,
+) -> Iterator[gpd.GeoDataFrame]:
+    """
+    Iterates the Overture features intersecting the WGS bbox in batches of at most batch_rows, as per read_overture.
+    Remote batches follow the files' row groups, so are sliced to batch_rows before conversion.
+    """
+    if overture_mirror() is None:
+        if release is None:
+            release = overture_release()
+        reader = core.record_batch_reader(overture_type, bbox, release=release)
+        if reader is None:
+            raise OSError(f"Unable to read Overture {overture_type} for release {release}.")
+        for batch in reader:
+            for offset in range(0, batch.num_rows, batch_rows):
+                yield _arrow_to_gdf(batch.slice(offset, batch_rows), columns)
+        return
+    dataset = _mirror_dataset(overture_type, release)
+    if columns is not None:
+        columns = [col for col in dataset.schema.names if col in columns]
+    for batch in dataset.to_batches(columns=columns, filter=_bbox_filter(bbox), batch_size=batch_rows):
+        if batch.num_rows:
+            yield _arrow_to_gdf(batch)
+
+
+def _clean_network_graph(
+    nodes_gdf: gpd.GeoDataFrame,
+    edges_gdf: gpd.GeoDataFrame,
+    bounds_geom_wgs: geometry.Polygon,
+    crs: int,
+) -> nx.MultiGraph:
+    """ """
+    with tools.record_stage_stats("network.generate_graph") as stage:
+        multigraph = tools.generate_graph(
+            nodes_gdf=nodes_gdf,
+            edges_gdf=edges_gdf,
+            # not dropping "parking_aisle" because this sometimes removes important links
+        )
+        stage["nodes"], stage["edges"] = multigraph.number_of_nodes(), multigraph.number_of_edges()
+    with tools.record_stage_stats("network.auto_clean") as stage:
+        multigraph = io._auto_clean_network(
+            multigraph,
+            geom_wgs=bounds_geom_wgs,
+            to_crs_code=crs,
+            **NETWORK_CLEAN_PARAMS,  # type: ignore
+        )
+        stage["nodes"], stage["edges"] = multigraph.number_of_nodes(), multigraph.number_of_edges()
+    return multigraph
+
+
+def clean_network(
+    nodes_gdf: gpd.GeoDataFrame,
+    edges_gdf: gpd.GeoDataFrame,
+    bounds_geom_wgs: geometry.Polygon,
+    crs: int,
+) -> gpd.GeoDataFrame:
+    """ """
+    multigraph = _clean_network_graph(nodes_gdf, edges_gdf, bounds_geom_wgs, crs)
+    with tools.record_stage_stats("network.geopandas_from_nx") as stage:
+        clean_edges_gdf = io.geopandas_from_nx(multigraph, crs=crs)
+        stage["edges"] = len(clean_edges_gdf)
+    return clean_edges_gdf
+
+
+def network_tiles(
+    bounds_geom_crs: geometry.Polygon, tile_size: int, tile_overlap: int
+) -> list[tuple[tuple[int, int], geometry.Polygon, geometry.Polygon]]:
+    """
+    Splits bounds into a grid of square tiles anchored at the bounds' lower left corner.
+    Returns the tile's grid key, core geom, and core geom buffered by the overlap for those intersecting the bounds.
+    """
+    min_x, min_y, max_x, max_y = bounds_geom_crs.bounds
+    tiles = []
+    for col in range(int(np.ceil((max_x - min_x) / tile_size))):
+        for row in range(int(np.ceil((max_y - min_y) / tile_size))):
+            tile_x, tile_y = min_x + col * tile_size, min_y + row * tile_size
+            core_geom = geometry.box(tile_x, tile_y, tile_x + tile_size, tile_y + tile_size)
+            if not core_geom.intersects(bounds_geom_crs):
+                continue
+            tiles.append(((col, row), core_geom, core_geom.buffer(tile_overlap, join_style="mitre")))
+    return tiles
+
+
+def _clean_network_tile(
+    tile_key: tuple[int, int],
+    nodes_gdf: gpd.GeoDataFrame,
+    edges_gdf: gpd.GeoDataFrame,
+    tile_geom_crs: geometry.Polygon,
+    crs: int,
+    bounds_fid: int | str | None = None,
+) -> tuple[tuple[int, int], gpd.GeoDataFrame]:
+    """ """
+    # attributes the tile's stage stats to the bounds and flushes them from the worker process
+    with tools.query_stats_bounds(bounds_fid):
+        tile_geom_wgs = tools.reproject_geometry(tile_geom_crs, crs, 4326)
+        multigraph = _clean_network_graph(nodes_gdf, edges_gdf, tile_geom_wgs, crs)
+        with tools.record_stage_stats("network.geopandas_from_nx") as stage:
+            clean_edges_gdf = io.geopandas_from_nx(multigraph, crs=crs)
+            stage["edges"] = len(clean_edges_gdf)
+    # orient geoms from start to end node so that edge ends can be matched to node keys when stitching
+    if not clean_edges_gdf.empty:
+        clean_edges_gdf["geom"] = [
+            geometry.LineString(
+                util.align_linestring_coords(
+                    geom.coords, (multigraph.nodes[start_key]["x"], multigraph.nodes[start_key]["y"])
+                )
+            )
+            for geom, start_key in zip(clean_edges_gdf.geom, clean_edges_gdf.start_nd_key, strict=True)
+        ]
+    return tile_key, clean_edges_gdf
+
+
+def stitch_network_tiles(
+    tile_edges: list[tuple[tuple[int, int], gpd.GeoDataFrame]],
+    origin: tuple[float, float],
+    tile_size: int,
+    snap_dist: float = 10,
+) -> gpd.GeoDataFrame:
+    """
+    Stitches cleaned tile networks: each tile keeps the edges with midpoints inside its core.
+    Cells without a tile, e.g. where the core doesn't intersect the bounds, are owned by the nearest tile.
+    Edge ends reaching past a tile's core into the overlap are snapped to the same node from the owning tile,
+    matched by node key - i.e. the connector id for nodes not consolidated by cleaning - else by nearest end.
+    """
+    tile_keys = {tile_key for tile_key, _edges_gdf in tile_edges}
+    tile_cells = np.array(sorted(tile_keys))
+
+    def owner_keys(xys: np.ndarray) -> list[tuple[int, int]]:
+        # position in tile units from the origin
+        tile_xys = (xys - np.array(origin)) / tile_size
+        cells = np.floor(tile_xys).astype(int)
+        no_tile = np.array([cell not in tile_keys for cell in map(tuple, cells.tolist())], dtype=bool)
+        if no_tile.any():
+            # distance from each position to each tile core
+            gaps = np.maximum(tile_cells - tile_xys[no_tile, None], tile_xys[no_tile, None] - (tile_cells + 1))
+            gap_dists = np.hypot(*np.maximum(gaps, 0).transpose(2, 0, 1))
+            cells[no_tile] = tile_cells[np.argmin(gap_dists, axis=1)]
+        return [(int(cell_x), int(cell_y)) for cell_x, cell_y in cells]
+
+    kept_gdfs = []
+    for tile_key, edges_gdf in tile_edges:
+        if edges_gdf.empty:
+            continue
+        mid_xys = shapely.get_coordinates(
+            shapely.line_interpolate_point(edges_gdf.geometry.values, 0.5, normalized=True)
+        )
+        is_owned = [owner_key == tile_key for owner_key in owner_keys(mid_xys)]
+        kept_gdf: gpd.GeoDataFrame = edges_gdf[is_owned].copy()  # type: ignore
+        kept_gdf["tile_key"] = [tile_key] * len(kept_gdf)
+        kept_gdfs.append(kept_gdf)
+    if not kept_gdfs:
+        return tile_edges[0][1].iloc[:0]  # type: ignore
+    stitched_gdf: gpd.GeoDataFrame = pd.concat(kept_gdfs, ignore_index=True)  # type: ignore
+    # edge ends as rows: edge position, start or end, node key, tile, and coords
+    geoms = stitched_gdf.geometry.values
+    end_xys = np.vstack(
+        [
+            shapely.get_coordinates(shapely.get_point(geoms, 0)),
+            shapely.get_coordinates(shapely.get_point(geoms, -1)),
+        ]
+    )
+    ends_df = pd.DataFrame(
+        {
+            "edge_pos": np.tile(np.arange(len(stitched_gdf)), 2),
+            "is_end": np.repeat([False, True], len(stitched_gdf)),
+            "node_key": np.concatenate([stitched_gdf["start_nd_key"], stitched_gdf["end_nd_key"]]).astype(str),  # type: ignore
+            "tile_key": list(stitched_gdf["tile_key"]) * 2,  # type: ignore
+            "x": end_xys[:, 0],
+            "y": end_xys[:, 1],
+        }
+    )
+    ends_df["cell_key"] = owner_keys(end_xys)
+    ends_df["is_owned"] = ends_df["cell_key"] == ends_df["tile_key"]
+    owned_df = ends_df[ends_df["is_owned"]]
+    seam_df = ends_df[~ends_df["is_owned"]]
+    if seam_df.empty:
+        return stitched_gdf.drop(columns=["tile_key"])  # type: ignore
+    # match seam ends by node key against ends from the owning tiles
+    owned_xys = owned_df.drop_duplicates("node_key").set_index("node_key")[["x", "y"]]
+    snap_xys = owned_xys.reindex(seam_df["node_key"]).to_numpy(copy=True)
+    # nodes only reached by edges owned by other tiles - snap to the first tile's end so that these tiles agree
+    seam_tile_counts = seam_df.groupby("node_key")["tile_key"].nunique()
+    shared = np.isnan(snap_xys[:, 0]) & (seam_df["node_key"].map(seam_tile_counts).to_numpy() > 1)
+    first_xys = seam_df.drop_duplicates("node_key").set_index("node_key")[["x", "y"]]
+    snap_xys[shared] = first_xys.reindex(seam_df["node_key"][shared]).to_numpy()
+    # otherwise snap to the nearest end owned by the tile containing the seam end, e.g. for differently merged nodes
+    unmatched = np.isnan(snap_xys[:, 0])
+    for cell_key in seam_df["cell_key"][unmatched].unique():
+        cell_owned_df = owned_df[owned_df["tile_key"] == cell_key]
+        if cell_owned_df.empty:
+            continue
+        cell_idxs = np.flatnonzero(unmatched & (seam_df["cell_key"] == cell_key).to_numpy())
+        dists, nearest_idxs = KDTree(cell_owned_df[["x", "y"]].to_numpy()).query(
+            seam_df[["x", "y"]].to_numpy()[cell_idxs], distance_upper_bound=snap_dist
+        )
+        found = np.isfinite(dists)
+        snap_xys[cell_idxs[found]] = cell_owned_df[["x", "y"]].to_numpy()[nearest_idxs[found]]  # type: ignore
+    # replace the edge end coords
+    coords_list = [np.array(geom.coords) for geom in geoms]
+    for edge_pos, is_end, snap_xy in zip(seam_df["edge_pos"], seam_df["is_end"], snap_xys, strict=True):
+        if np.isnan(snap_xy[0]):
+            continue
+        coords_list[edge_pos][-1 if is_end else 0, :2] = snap_xy
+    stitched_gdf = stitched_gdf.set_geometry(  # type: ignore
+        gpd.GeoSeries([geometry.LineString(coords) for coords in coords_list], crs=stitched_gdf.crs),  # type: ignore
+    )
+    logger.info(f"Stitched {len(seam_df)} edge ends across tile seams, {int(np.isnan(snap_xys[:, 0]).sum())} unmatched")
+    return stitched_gdf.drop(columns=["tile_key"])  # type: ignore
+
+
+def _prepare_overture_gdf(overture_gdf: gpd.GeoDataFrame, crs: int) -> gpd.GeoDataFrame:
+    """Reprojects to the CRS and indexes by id."""
+    overture_gdf.set_crs(4326, inplace=True)
+    overture_gdf.to_crs(crs, inplace=True)
+    overture_gdf.set_index("id", inplace=True)
+    overture_gdf.rename(columns={"geometry": "geom"}, inplace=True)
+    overture_gdf.set_geometry("geom", inplace=True)
+    overture_gdf.drop(columns=["bbox"], inplace=True)
+    return overture_gdf
+
+
+def fetch_overture(
+    overture_type: str,
+    bounds_geom_wgs: geometry.Polygon,
+    crs: int,
+    release: str | None = None,
+) -> gpd.GeoDataFrame:
+    """Fetches an Overture type for the bounds' extent, reprojected to the CRS and indexed by id."""
+    logger.info(f"Loading {overture_type}")
+    stage_name, count_key = OVERTURE_DOWNLOAD_STAGES[overture_type]
+    with tools.record_stage_stats(stage_name) as stage:
+        overture_gdf = read_overture(overture_type, bounds_geom_wgs.bounds, release, OVERTURE_COLUMNS[overture_type])
+        overture_gdf = _prepare_overture_gdf(overture_gdf, crs)
+        stage[count_key] = len(overture_gdf)
+    return overture_gdf
+
+
+def fetch_overture_types(
+    bounds_geom_wgs: geometry.Polygon,
+    crs: int,
+    overture_types: list[str],
+    release: str | None = None,
+) -> dict[str, gpd.GeoDataFrame]:
+    """Fetches several Overture types for the bounds' extent concurrently so that their downloads overlap."""
+    if release is None:
+        release = overture_release()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(overture_types)) as executor:
+        # run in copies of the context so that stage stats are attributed to the bounds fid
+        futures = {
+            overture_type: executor.submit(
+                contextvars.copy_context().run, fetch_overture, overture_type, bounds_geom_wgs, crs, release
+            )
+            for overture_type in overture_types
+        }
+        return {overture_type: future.result() for overture_type, future in futures.items()}
+
+
+def fetch_network(
+    bounds_geom_wgs: geometry.Polygon,
+    crs: int,
+    release: str | None = None,
+) -> tuple[gpd.GeoDataFrame, gpd.GeoDataFrame]:
+    """Fetches the Overture connectors and road segments for the bounds' extent."""
+    network_gdfs = fetch_overture_types(bounds_geom_wgs, crs, ["connector", "segment"], release=release)
+    nodes_gdf, edges_gdf = network_gdfs["connector"], network_gdfs["segment"]
+    edges_gdf = edges_gdf[edges_gdf["subtype"] == "road"]
+
+    return nodes_gdf, edges_gdf  # type: ignore
+
+
+def load_network(
+    bounds_geom_wgs: geometry.Polygon,
+    crs: int,
+    tile_size: int | None = None,
+    tile_overlap: int = 2000,
+    tile_workers: int = 1,
+    release: str | None = None,
+) -> tuple[gpd.GeoDataFrame, gpd.GeoDataFrame, gpd.GeoDataFrame]:
+    """
+    Loads and cleans the network for the bounds.
+    If a tile size is provided, the network is cleaned per overlapping tile in parallel and stitched.
+    """
+    nodes_gdf, edges_gdf = fetch_network(bounds_geom_wgs, crs, release=release)
+    # CLEAN
+    logger.info("Cleaning network")
+    bounds_geom_crs = tools.reproject_geometry(bounds_geom_wgs, 4326, crs)
+    if tile_size is None:
+        clean_edges_gdf = clean_network(nodes_gdf, edges_gdf, bounds_geom_wgs, crs)  # type: ignore
+    else:
+        clean_edges_gdf = clean_network_tiled(
+            nodes_gdf,  # type: ignore
+            edges_gdf,  # type: ignore
+            bounds_geom_crs,
+            crs,
+            tile_size,
+            tile_overlap,
+            tile_workers,
+        )
+    # JSON
+    with tools.record_stage_stats("network.json") as stage:
+        nodes_gdf["sources"] = tools.series_to_json(nodes_gdf["sources"])  # type: ignore
+        for col in [
+            "sources",
+            "names",
+            "connectors",
+            "routes",
+            "subclass_rules",
+            "access_restrictions",
+            "level_rules",
+            "destinations",
+            "prohibited_transitions",
+            "road_surface",
+            "road_flags",
+            "speed_limits",
+            "width_rules",
+        ]:
+            edges_gdf[col] = tools.series_to_json(edges_gdf[col])  # type: ignore
+        stage["nodes"], stage["edges"] = len(nodes_gdf), len(edges_gdf)
     # trim
     logger.info("Trimming to bounds")
-    bounds_geom_crs = tools.reproject_geometry(bounds_geom_wgs, 4326, crs)
-    nodes_gdf = nodes_gdf[nodes_gdf.intersects(bounds_geom_crs)]
-    edges_gdf = edges_gdf[edges_gdf.intersects(bounds_geom_crs)]
-    clean_edges_gdf = clean_edges_gdf[clean_edges_gdf.intersects(bounds_geom_crs)]
+    with tools.record_stage_stats("network.trim") as stage:
+        nodes_gdf = tools.trim_to_bounds(nodes_gdf, bounds_geom_crs)
+        edges_gdf = tools.trim_to_bounds(edges_gdf, bounds_geom_crs)
+        clean_edges_gdf = tools.trim_to_bounds(clean_edges_gdf, bounds_geom_crs)
+        stage["nodes"], stage["edges"] = len(nodes_gdf), len(edges_gdf)
 
     return nodes_gdf, edges_gdf, clean_edges_gdf  # type: ignore
 
 
+def clean_network_tiled(
+    nodes_gdf: gpd.GeoDataFrame,
+    edges_gdf: gpd.GeoDataFrame,
+    bounds_geom_crs: geometry.Polygon,
+    crs: int,
+    tile_size: int,
+    tile_overlap: int,
+    tile_workers: int,
+) -> gpd.GeoDataFrame:
+    """Cleans the network per overlapping tile in parallel worker processes then stitches the tiles."""
+    tiles = network_tiles(bounds_geom_crs, tile_size, tile_overlap)
+    logger.info(f"Cleaning network in {len(tiles)} tiles of {tile_size}m with {tile_overlap}m overlap")
+    connector_ids = tools.explode_struct_key(edges_gdf["connectors"], "connector_id")  # type: ignore
+    bounds_fid = tools.query_stats_bounds_fid()
+    tile_edges = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=tile_workers) as executor:
+        futures = []
+        for tile_key, _core_geom, tile_geom in tiles:
+            edge_pos = edges_gdf.sindex.query(tile_geom, predicate="intersects")
+            if not len(edge_pos):
+                continue
+            tile_edges_gdf: gpd.GeoDataFrame = edges_gdf.iloc[np.sort(edge_pos)]  # type: ignore
+            # include connectors beyond the tile for edges crossing its boundary
+            tile_connector_ids = connector_ids[connector_ids.index.isin(edge_pos)].unique()
+            tile_nodes_gdf: gpd.GeoDataFrame = nodes_gdf[nodes_gdf.index.isin(tile_connector_ids)]  # type: ignore
+            futures.append(
+                executor.submit(
+                    _clean_network_tile, tile_key, tile_nodes_gdf, tile_edges_gdf, tile_geom, crs, bounds_fid
+                )
+            )
+        for future in concurrent.futures.as_completed(futures):
+            tile_edges.append(future.result())
+    # sort for deterministic stitching
+    tile_edges.sort(key=lambda tile_edge: tile_edge[0])
+    min_x, min_y, _max_x, _max_y = bounds_geom_crs.bounds
+    with tools.record_stage_stats("network.stitch_tiles") as stage:
+        clean_edges_gdf = stitch_network_tiles(tile_edges, (min_x, min_y), tile_size)
+        stage["edges"] = len(clean_edges_gdf)
+    return clean_edges_gdf
+
+
+def overture_release() -> str:
+    """
+    Returns the Overture release set by the OVERTURE_RELEASE environment variable, else the latest release.
+    The latest release is taken from the local mirror if set.
+    """
+    release = os.getenv("OVERTURE_RELEASE")
+    if release is not None:
+        return release
+    mirror_path = overture_mirror()
+    if mirror_path is not None:
+        return sorted(release_path.name for release_path in (mirror_path / "release").iterdir())[-1]
+    return core.get_latest_release()
+
+
+def network_cache_key(
+    bounds_geom_wgs: geometry.Polygon,
+    crs: int,
+    release: str,
+    tile_size: int | None = None,
+    tile_overlap: int = 2000,
+) -> str:
+    """Hashes the bounds geometry, target CRS, Overture release, and cleaning parameters."""
+    key_params = {
+        "version": NETWORK_CACHE_VERSION,
+        "bounds": shapely.to_wkb(shapely.normalize(bounds_geom_wgs), hex=True),
+        "crs": crs,
+        "release": release,
+        "clean_params": NETWORK_CLEAN_PARAMS,
+        # tiled cleaning can differ slightly from untiled along seams
+        "tile_size": tile_size,
+        "tile_overlap": tile_overlap if tile_size is not None else None,
+    }
+    return hashlib.sha256(json.dumps(key_params, sort_keys=True).encode()).hexdigest()
+
+
+def read_network_cache(cache_dir: Path | str, cache_key: str) -> tuple[gpd.GeoDataFrame, ...] | None:
+    """Reads the cached network layers, or returns None if not cached. Reads count as use for LRU eviction."""
+    entry_path = Path(cache_dir) / cache_key
+    if not entry_path.is_dir():
+        return None
+    try:
+        gdfs: tuple[gpd.GeoDataFrame, ...] = tuple(
+            gpd.read_parquet(entry_path / f"{layer}.parquet")  # type: ignore
+            for layer in NETWORK_CACHE_LAYERS
+        )
+    except Exception:
+        # e.g. evicted by another worker while reading
+        logger.warning(f"Unable to read cached network {cache_key}, ignoring")
+        return None
+    # parquet returns list columns as arrays
+    for gdf in gdfs:
+        for col in gdf.select_dtypes("object").columns:
+            gdf[col] = [val.tolist() if isinstance(val, np.ndarray) else val for val in gdf[col]]  # type: ignore
+    os.utime(entry_path)
+    return gdfs
+
+
+def evict_network_cache(cache_dir: Path | str, max_bytes: int, keep_key: str | None = None) -> list[str]:
+    """Evicts the least recently used cache entries until the cache fits within max_bytes."""
+    entries = []
+    for entry_path in Path(cache_dir).iterdir():
+        # skip entries being written
+        if not entry_path.is_dir() or entry_path.name.startswith("."):
+            continue
+        entry_bytes = sum(file_path.stat().st_size for file_path in entry_path.iterdir())
+        entries.append((entry_path.stat().st_mtime, entry_path, entry_bytes))
+    total_bytes = sum(entry_bytes for _mtime, _path, entry_bytes in entries)
+    evicted = []
+    for _mtime, entry_path, entry_bytes in sorted(entries, key=lambda entry: entry[0]):
+        if total_bytes <= max_bytes:
+            break
+        if entry_path.name == keep_key:
+            continue
+        shutil.rmtree(entry_path, ignore_errors=True)
+        total_bytes -= entry_bytes
+        evicted.append(entry_path.name)
+    if evicted:
+        logger.info(f"Evicted {len(evicted)} cached networks to fit the {max_bytes / 1e9:.1f}GB cache budget")
+    return evicted
+
+
+def write_network_cache(
+    cache_dir: Path | str,
+    cache_key: str,
+    gdfs: tuple[gpd.GeoDataFrame, ...],
+    max_bytes: int,
+):
+    """Writes the network layers as GeoParquet then evicts least recently used entries beyond max_bytes."""
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # write to a temporary directory then rename so that readers never see partial entries
+    tmp_path = cache_dir / f".{cache_key}.{os.getpid()}"
+    tmp_path.mkdir(exist_ok=True)
+    for layer, gdf in zip(NETWORK_CACHE_LAYERS, gdfs, strict=True):
+        gdf.to_parquet(tmp_path / f"{layer}.parquet")
+    try:
+        tmp_path.rename(cache_dir / cache_key)
+    except OSError:
+        # already written by another worker
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    evict_network_cache(cache_dir, max_bytes, keep_key=cache_key)
+
+
+def load_network_cached(
+    bounds_geom_wgs: geometry.Polygon,
+    crs: int,
+    tile_size: int | None = None,
+    tile_overlap: int = 2000,
+    tile_workers: int = 1,
+    cache_dir: Path | str | None = None,
+) -> tuple[gpd.GeoDataFrame, gpd.GeoDataFrame, gpd.GeoDataFrame, gpd.GeoDataFrame, gpd.GeoDataFrame]:
+    """
+    Loads the nodes, edges, clean edges, and dual nodes and edges for the bounds.
+    If a cache directory is provided or set with the NETWORK_CACHE_DIR environment variable,
+    networks are hydrated from, or else written to, the cache.
+    The cache is trimmed to NETWORK_CACHE_MAX_GB (defaults to 20) by evicting the least recently used networks.
+    """
+    if cache_dir is None:
+        cache_dir = os.getenv("NETWORK_CACHE_DIR")
+    release = overture_release()
+    cache_key = network_cache_key(bounds_geom_wgs, crs, release, tile_size=tile_size, tile_overlap=tile_overlap)
+    if cache_dir is not None:
+        with tools.record_stage_stats("network.cache_read"):
+            cached_gdfs = read_network_cache(cache_dir, cache_key)
+        if cached_gdfs is not None:
+            logger.info(f"Loaded network from cache: {cache_key}")
+            return cached_gdfs  # type: ignore
+    nodes_gdf, edges_gdf, clean_edges_gdf = load_network(
+        bounds_geom_wgs,
+        crs,
+        tile_size=tile_size,
+        tile_overlap=tile_overlap,
+        tile_workers=tile_workers,
+        release=release,
+    )
+    # built directly from the clean edges - use tools.dual_network_to_nx for a networkX graph when debugging
+    with tools.record_stage_stats("network.dual") as stage:
+        nodes_dual_gdf, edges_dual_gdf = tools.dual_network_from_edges_gdf(clean_edges_gdf)
+        stage["nodes"], stage["edges"] = len(nodes_dual_gdf), len(edges_dual_gdf)
+    gdfs = (nodes_gdf, edges_gdf, clean_edges_gdf, nodes_dual_gdf, edges_dual_gdf)
+    if cache_dir is not None:
+        max_bytes = int(float(os.getenv("NETWORK_CACHE_MAX_GB", "20")) * 1e9)
+        with tools.record_stage_stats("network.cache_write"):
+            write_network_cache(cache_dir, cache_key, gdfs, max_bytes)
+    return gdfs
+
+
 def load_buildings(
     bounds_geom_wgs: geometry.Polygon,
     crs: int,
+    buildings_gdf: gpd.GeoDataFrame | None = None,
 ) -> gpd.GeoDataFrame:
-    """ """
-    logger.info("Loading buildings")
-    buildings_gdf = core.geodataframe("building", bounds_geom_wgs.bounds)  # type:ignore
-    buildings_gdf.set_crs(4326, inplace=True)
-    buildings_gdf.to_crs(crs, inplace=True)
-    buildings_gdf.set_index("id", inplace=True)
-    buildings_gdf.rename(columns={"geometry": "geom"}, inplace=True)
-    buildings_gdf.set_geometry("geom", inplace=True)
-    buildings_gdf.drop(columns=["bbox"], inplace=True)
-    for col in ["sources", "names"]:
-        buildings_gdf[col] = buildings_gdf[col].apply(tools.col_to_json).astype("str")  # type: ignore
-    bounds_geom_crs = tools.reproject_geometry(bounds_geom_wgs, 4326, crs)
-    buildings_gdf = buildings_gdf[buildings_gdf.intersects(bounds_geom_crs)]
+    """Loads the buildings for the bounds, from the buildings already fetched with fetch_overture if provided."""
+    if buildings_gdf is None:
+        buildings_gdf = fetch_overture("building", bounds_geom_wgs, crs)
+    # trimmed first so that only the retained rows are serialised
+    with tools.record_stage_stats("buildings.trim") as stage:
+        bounds_geom_crs = tools.reproject_geometry(bounds_geom_wgs, 4326, crs)
+        buildings_gdf = tools.trim_to_bounds(buildings_gdf, bounds_geom_crs)
+        stage["rows"] = len(buildings_gdf)
+    with tools.record_stage_stats("buildings.json") as stage:
+        for col in ["sources", "names"]:
+            buildings_gdf[col] = tools.series_to_json(buildings_gdf[col])  # type: ignore
+        stage["rows"] = len(buildings_gdf)
 
     return buildings_gdf  # type: ignore
 
 
+def iter_buildings(
+    bounds_geom_wgs: geometry.Polygon,
+    crs: int,
+    batch_rows: int = 100_000,
+) -> Iterator[gpd.GeoDataFrame]:
+    """Loads the buildings for the bounds in batches, so that peak memory is bounded by the batch size."""
+    logger.info(f"Loading buildings in batches of {batch_rows}")
+    batches = iter_overture(
+        "building", bounds_geom_wgs.bounds, overture_release(), OVERTURE_COLUMNS["building"], batch_rows
+    )
+    while True:
+        with tools.record_stage_stats("buildings.download") as stage:
+            buildings_gdf = next(batches, None)
+            if buildings_gdf is not None:
+                buildings_gdf = _prepare_overture_gdf(buildings_gdf, crs)
+                stage["rows"] = len(buildings_gdf)
+        if buildings_gdf is None:
+            return
+        yield load_buildings(bounds_geom_wgs, crs, buildings_gdf)
+
+
 def load_infrastructure(
     bounds_geom_wgs: geometry.Polygon,
     crs: int,
+    infrast_gdf: gpd.GeoDataFrame | None = None,
 ) -> gpd.GeoDataFrame:
-    """ """
+    """Loads the infrastructure for the bounds, from the infrastructure already fetched if provided."""
     # INFRASTRUCTURE
-    logger.info("Loading infrastructure")
-    infrast_gdf = core.geodataframe("infrastructure", bounds_geom_wgs.bounds)  # type:ignore
-    infrast_gdf.set_crs(4326, inplace=True)
-    infrast_gdf.to_crs(crs, inplace=True)
-    infrast_gdf.set_index("id", inplace=True)
-    infrast_gdf.rename(columns={"geometry": "geom"}, inplace=True)
-    infrast_gdf.set_geometry("geom", inplace=True)
-    infrast_gdf = infrast_gdf[infrast_gdf.geom.geom_type == "Point"]  # returns line and polygons as well
-    infrast_gdf.drop(columns=["bbox"], inplace=True)
+    if infrast_gdf is None:
+        infrast_gdf = fetch_overture("infrastructure", bounds_geom_wgs, crs)
+    with tools.record_stage_stats("infrastructure.trim") as stage:
+        # returns line and polygons as well
+        points_gdf: gpd.GeoDataFrame = infrast_gdf[infrast_gdf.geom.geom_type == "Point"]  # type: ignore
+        bounds_geom_crs = tools.reproject_geometry(bounds_geom_wgs, 4326, crs)
+        infrast_gdf = tools.trim_to_bounds(points_gdf, bounds_geom_crs)
+        stage["rows"] = len(infrast_gdf)
 
     def extract_infrast_name(names: dict | None) -> str | None:
         if names is None:
@@ -128,15 +748,15 @@ def load_infrastructure(
             return names["primary"]
         return None
 
-    infrast_gdf["common_name"] = infrast_gdf["names"].apply(extract_infrast_name)  # type: ignore
-    for col in [
-        "sources",
-        "names",
-        "source_tags",
-    ]:
-        infrast_gdf[col] = infrast_gdf[col].apply(tools.col_to_json).astype(str)  # type: ignore
-    bounds_geom_crs = tools.reproject_geometry(bounds_geom_wgs, 4326, crs)
-    infrast_gdf = infrast_gdf[infrast_gdf.intersects(bounds_geom_crs)]
+    with tools.record_stage_stats("infrastructure.json") as stage:
+        infrast_gdf["common_name"] = infrast_gdf["names"].apply(extract_infrast_name)  # type: ignore
+        for col in [
+            "sources",
+            "names",
+            "source_tags",
+        ]:
+            infrast_gdf[col] = tools.series_to_json(infrast_gdf[col])  # type: ignore
+        stage["rows"] = len(infrast_gdf)
 
     return infrast_gdf  # type: ignore
 
@@ -144,63 +764,56 @@ def load_infrastructure(
 def load_places(
     bounds_geom_wgs: geometry.Polygon,
     crs: int,
+    places_gdf: gpd.GeoDataFrame | None = None,
 ) -> gpd.GeoDataFrame:
-    """ """
-    OVERTURE_SCHEMA = tools.generate_overture_schema()
+    """Loads the places for the bounds, from the places already fetched with fetch_overture if provided."""
+    category_lookup = tools.overture_category_lookup(tools.generate_overture_schema())
     # PLACES
-    logger.info("Loading places")
-    places_gdf = core.geodataframe("place", bounds_geom_wgs.bounds)  # type:ignore
-    places_gdf.set_crs(4326, inplace=True)
-    places_gdf.to_crs(crs, inplace=True)
-    places_gdf.set_index("id", inplace=True)
-    places_gdf.rename(columns={"geometry": "geom"}, inplace=True)
-    places_gdf.set_geometry("geom", inplace=True)
-    places_gdf.drop(columns=["bbox"], inplace=True)
-
-    def extract_main_cat(lu_classes: dict | None) -> str | None:
-        if lu_classes is None:
-            return None
-        return lu_classes["primary"]
+    if places_gdf is None:
+        places_gdf = fetch_overture("place", bounds_geom_wgs, crs)
+    with tools.record_stage_stats("places.trim") as stage:
+        bounds_geom_crs = tools.reproject_geometry(bounds_geom_wgs, 4326, crs)
+        places_gdf = tools.trim_to_bounds(places_gdf, bounds_geom_crs)
+        stage["rows"] = len(places_gdf)
 
-    def extract_alt_cats(lu_classes: dict | None):
-        if lu_classes is None:
-            return None
-        return tools.col_to_json(lu_classes["alternate"])
-
-    def extract_name(names: dict | None) -> str | None:
-        if names is None:
-            return None
-        if names["common"] is not None:
-            return names["common"]
-        if names["primary"] is not None:
-            return names["primary"]
-        return None
-
-    def assign_major_cat(lu_cat_desc: str) -> str | None:
-        for major_cat, major_cat_vals in OVERTURE_SCHEMA.items():
-            if lu_cat_desc in major_cat_vals:
-                return major_cat
-        if lu_cat_desc is not None:
-            logger.info(f"Category not found in landuse schema: {lu_cat_desc}")
-        return None
-
-    places_gdf["main_cat"] = places_gdf["categories"].apply(extract_main_cat)  # type: ignore
-    places_gdf["alt_cats"] = places_gdf["categories"].apply(extract_alt_cats)  # type: ignore
-    places_gdf["common_name"] = places_gdf["names"].apply(extract_name)  # type: ignore
-    places_gdf["major_lu_schema_class"] = places_gdf["main_cat"].apply(assign_major_cat)  # type: ignore
-    for col in [
-        "sources",
-        "names",
-        "categories",
-        "brand",
-        "addresses",
-        "websites",
-        "socials",
-        "emails",
-        "phones",
-    ]:
-        places_gdf[col] = places_gdf[col].apply(tools.col_to_json).astype(str)  # type: ignore
-    bounds_geom_crs = tools.reproject_geometry(bounds_geom_wgs, 4326, crs)
-    places_gdf = places_gdf[places_gdf.intersects(bounds_geom_crs)]
+    with tools.record_stage_stats("places.categories") as stage:
+        # nested fields are gathered per column and categories are looked up by dict instead of scanning the schema
+        categories = places_gdf["categories"].array  # type: ignore
+        names = places_gdf["names"].array  # type: ignore
+        main_cats = [None if lu_classes is None else lu_classes["primary"] for lu_classes in categories]
+        alt_cats = tools.series_to_json(
+            pd.Series([None if lu_classes is None else lu_classes["alternate"] for lu_classes in categories])
+        )
+        places_gdf["main_cat"] = main_cats
+        places_gdf["alt_cats"] = [
+            None if lu_classes is None else alt_cat for lu_classes, alt_cat in zip(categories, alt_cats, strict=True)
+        ]
+        places_gdf["common_name"] = [
+            None
+            if names_info is None
+            else names_info["primary"]
+            if names_info["common"] is None
+            else names_info["common"]
+            for names_info in names
+        ]
+        places_gdf["major_lu_schema_class"] = [category_lookup.get(main_cat) for main_cat in main_cats]  # type: ignore
+        unmatched_cats = {main_cat for main_cat in main_cats if main_cat is not None} - category_lookup.keys()
+        if unmatched_cats:
+            logger.info(f"Categories not found in landuse schema: {', '.join(sorted(unmatched_cats))}")
+        stage["rows"] = len(places_gdf)
+    with tools.record_stage_stats("places.json") as stage:
+        for col in [
+            "sources",
+            "names",
+            "categories",
+            "brand",
+            "addresses",
+            "websites",
+            "socials",
+            "emails",
+            "phones",
+        ]:
+            places_gdf[col] = tools.series_to_json(places_gdf[col])  # type: ignore
+        stage["rows"] = len(places_gdf)
 
     return places_gdf  # type: ignore
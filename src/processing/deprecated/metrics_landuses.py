@@ -10,8 +10,6 @@ from src import tools
 
 logger = tools.get_logger(__name__)
 
-OVERTURE_SCHEMA = tools.generate_overture_schema()
-
 
 def process_landuses(
     bounds_fid: int,
@@ -41,7 +39,7 @@ def process_landuses(
         geom_col="geom",
     )
     # prepare keys
-    landuse_keys = list(OVERTURE_SCHEMA.keys())
+    landuse_keys = list(tools.generate_overture_schema().keys())
     # remove structure and geography category
     landuse_keys.remove("structure_and_geography")
     places_gdf = places_gdf[places_gdf["main_cat"] != "structure_and_geography"]  # type: ignore
@@ -7,7 +7,6 @@ import momepy
 import numpy as np
 from cityseer.metrics import layers
 from rasterio.io import MemoryFile
-from rasterio.mask import mask
 from tqdm import tqdm
 
 from src import tools
@@ -69,19 +68,9 @@ def process_morphology(
         bldgs_gdf.reset_index(drop=True, inplace=True)
         bldgs_gdf.index = bldgs_gdf.index.astype(str)
         # sample heights
-        heights = []
-        with MemoryFile(raster_bytes) as memfile:
-            rast_data = memfile.open()
-            for _idx, bldg_row in bldgs_gdf.iterrows():
-                try:
-                    # raster values within building polygon
-                    out_image, _ = mask(rast_data, [bldg_row.geom.buffer(5)], crop=True)
-                    # mean height, excluding nodata values
-                    valid_pixels = out_image[0][out_image[0] != rast_data.nodata]
-                    mean_height = np.mean(valid_pixels) if len(valid_pixels) > 0 else np.nan
-                    heights.append(mean_height)
-                except ValueError:
-                    heights.append(np.nan)
+        with MemoryFile(raster_bytes) as memfile, memfile.open() as rast_data:
+            # mean height within the buffered footprints, excluding nodata values
+            heights, _pixel_counts = tools.raster_zonal_stats(bldgs_gdf.geometry.buffer(5), rast_data)
         bldgs_gdf["mean_height"] = heights
         # bldg metrics
         bldgs_gdf["area"] = momepy.Area(bldgs_gdf).series
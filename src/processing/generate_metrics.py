@@ -13,6 +13,137 @@ from src.processing import processors
 logger = tools.get_logger(__name__)
 
 
+def fetch_bounds_inputs(bounds_fid: int, bounds_fid_col: str, bounds_table: str) -> dict:
+    """Fetches the independent, bounds-scoped input layers concurrently."""
+    nodes_query, edges_query = tools.bounds_fid_network_queries(bounds_fid, buffer_col="geom_10000")
+    queries: dict[str, tools.QuerySpec] = {
+        "nodes": (nodes_query, "fid", "geom"),
+        "edges": (edges_query, "fid", "geom"),
+        # POI
+        "places": (
+            f"""
+            SELECT p.fid, p.main_cat, p.geom
+            FROM overture.overture_place p, eu.{bounds_table} b
+            WHERE b.{bounds_fid_col} = {bounds_fid}
+                AND ST_Intersects(b.geom_2000, p.geom)
+            """,
+            "fid",
+            "geom",
+        ),
+        "infrast": (
+            f"""
+            SELECT p.fid, p.class, p.geom
+            FROM overture.overture_infrast p, eu.{bounds_table} b
+            WHERE b.{bounds_fid_col} = {bounds_fid}
+                AND ST_Contains(b.geom_2000, p.geom)
+            """,
+            "fid",
+            "geom",
+        ),
+        # BUILDINGS
+        # raster
+        "raster": (
+            f"""
+            SELECT ST_AsGDALRaster(ST_Union(ST_Clip(rast, b.geom_2000)), 'GTiff') AS rast
+            FROM eu.bldg_hts, eu.{bounds_table} b
+            WHERE b.{bounds_fid_col} = {bounds_fid}
+                AND ST_Intersects(b.geom_2000, rast);
+            """,
+            None,
+            None,
+        ),
+        "bldgs": (
+            f"""
+            SELECT bldgs.fid, bldgs.geom
+            FROM overture.overture_buildings bldgs, eu.{bounds_table} b
+            WHERE b.{bounds_fid_col} = {bounds_fid}
+                AND ST_Intersects(b.geom_2000, bldgs.geom);
+            """,
+            "fid",
+            "geom",
+        ),
+        "blocks": (
+            f"""
+            SELECT bl.fid, bl.geom
+            FROM eu.blocks bl, eu.{bounds_table} b
+            WHERE b.{bounds_fid_col} = {bounds_fid}
+                AND ST_Contains(b.geom_2000, bl.geom);
+            """,
+            "fid",
+            "geom",
+        ),
+        # GREEN
+        # green spaces
+        "green": (
+            f"""
+            SELECT bl.fid, bl.geom
+            FROM eu.blocks bl, eu.{bounds_table} b
+            WHERE b.{bounds_fid_col} = {bounds_fid}
+                -- use intersects to catch overlapping geoms
+                AND ST_Intersects(b.geom_2000, bl.geom)
+                AND class_2018 in (
+                    'Arable land (annual crops)',
+                    'Complex and mixed cultivation patterns',
+                    'Forests',
+                    'Green urban areas',
+                    'Herbaceous vegetation associations (natural grassland, moors...)',
+                    'Open spaces with little or no vegetation (beaches, dunes, bare rocks, glaciers)',
+                    'Orchards at the fringe of urban classes',
+                    'Pastures',
+                    'Permanent crops (vineyards, fruit trees, olive groves)',
+                    'Sports and leisure facilities',
+                    'Water',
+                    'Wetlands'
+                )
+                AND ST_IsValid(bl.geom)
+            """,
+            "fid",
+            "geom",
+        ),
+        # trees - simplify
+        "trees": (
+            f"""
+            SELECT t.fid, t.geom
+            FROM eu.trees t, eu.{bounds_table} b
+            WHERE b.{bounds_fid_col} = {bounds_fid}
+                -- use intersects to catch overlapping geoms
+                AND ST_Intersects(b.geom_2000, t.geom)
+                AND ST_IsValid(t.geom)
+            """,
+            "fid",
+            "geom",
+        ),
+        # STATS
+        "stats": (
+            f"""
+            SELECT
+                s.fid,
+                s.t,
+                s.m,
+                s.f,
+                s.y_lt15,
+                s.y_1564,
+                s.y_ge65,
+                s.emp,
+                s.nat,
+                s.eu_oth,
+                s.oth,
+                s.same,
+                s.chg_in,
+                s.chg_out,
+                ST_Centroid(s.geom) as cent
+            FROM eu.stats s, eu.{bounds_table} b
+            WHERE b.{bounds_fid_col} = {bounds_fid}
+                    AND ST_Intersects(b.geom_2000, s.geom);
+            """,
+            "fid",
+            "cent",
+        ),
+    }
+    logger.info("Fetching inputs")
+    return tools.db_fetch_concurrently(queries)
+
+
 def generate_metrics(
     bounds_fid: int,
     bounds_fid_col: str,
@@ -21,167 +152,50 @@ def generate_metrics(
     target_nodes_table: str,
     target_blocks_table: str,
     target_bldgs_table: str,
+    partition: bool = False,
 ):
-    engine = tools.get_sqlalchemy_engine()
-    nodes_gdf, edges_gdf, network_structure = tools.load_bounds_fid_network_from_db(
-        engine, bounds_fid, buffer_col="geom_10000"
-    )
+    partition_by = "bounds_fid" if partition else None
+    inputs = fetch_bounds_inputs(bounds_fid, bounds_fid_col, bounds_table)
+    nodes_gdf: gpd.GeoDataFrame = inputs["nodes"]
+    network_structure = tools.network_structure_from_bounds_gdfs(bounds_fid, nodes_gdf, inputs["edges"])
     # CENTRALITY
     nodes_gdf = processors.process_centrality(nodes_gdf, network_structure)
     # POI
-    places_gdf: gpd.GeoDataFrame = gpd.read_postgis(  # type: ignore
-        f"""
-        SELECT p.fid, p.main_cat, p.geom
-        FROM overture.overture_place p, eu.{bounds_table} b
-        WHERE b.{bounds_fid_col} = {bounds_fid}
-            AND ST_Intersects(b.geom_2000, p.geom)
-        """,
-        engine,
-        index_col="fid",
-        geom_col="geom",
-    )
-    infrast_gdf: gpd.GeoDataFrame = gpd.read_postgis(  # type: ignore
-        f"""
-        SELECT p.fid, p.class, p.geom
-        FROM overture.overture_infrast p, eu.{bounds_table} b
-        WHERE b.{bounds_fid_col} = {bounds_fid}
-            AND ST_Contains(b.geom_2000, p.geom)
-        """,
-        engine,
-        index_col="fid",
-        geom_col="geom",
-    )
-    nodes_gdf = processors.process_places(nodes_gdf, places_gdf, infrast_gdf, network_structure)
+    nodes_gdf = processors.process_places(nodes_gdf, inputs["places"], inputs["infrast"], network_structure)
     # BUILDINGS
-    # load raster
-    raster_bytes = tools.db_fetch(f"""
-        SELECT ST_AsGDALRaster(ST_Union(ST_Clip(rast, b.geom_2000)), 'GTiff') AS rast
-        FROM eu.bldg_hts, eu.{bounds_table} b
-        WHERE b.{bounds_fid_col} = {bounds_fid}
-            AND ST_Intersects(b.geom_2000, rast);
-        """)[0][0]
-    # buildings
-    bldgs_gdf: gpd.GeoDataFrame = gpd.read_postgis(  # type: ignore
-        f"""
-        SELECT bldgs.fid, bldgs.geom
-        FROM overture.overture_buildings bldgs, eu.{bounds_table} b
-        WHERE b.{bounds_fid_col} = {bounds_fid}
-            AND ST_Intersects(b.geom_2000, bldgs.geom);
-        """,
-        engine,
-        index_col="fid",
-        geom_col="geom",
-    )
-    # blocks
-    blocks_gdf: gpd.GeoDataFrame = gpd.read_postgis(  # type: ignore
-        f"""
-        SELECT bl.fid, bl.geom
-        FROM eu.blocks bl, eu.{bounds_table} b
-        WHERE b.{bounds_fid_col} = {bounds_fid}
-            AND ST_Contains(b.geom_2000, bl.geom);
-        """,
-        engine,
-        index_col="fid",
-        geom_col="geom",
-    )
+    raster_bytes = inputs["raster"][0][0]
     nodes_gdf, bldgs_gdf, blocks_gdf = processors.process_blocks_buildings(
-        nodes_gdf, bldgs_gdf, blocks_gdf, raster_bytes, network_structure
+        nodes_gdf, inputs["bldgs"], inputs["blocks"], raster_bytes, network_structure
     )
     if not bldgs_gdf.empty:
         bldgs_gdf["bounds_key"] = "bounds"
         bldgs_gdf["bounds_fid"] = bounds_fid
-        bldgs_gdf.to_postgis(
+        tools.bulk_to_postgis(
+            bldgs_gdf,
             target_bldgs_table,
-            engine,
             if_exists="append",
             schema="metrics",
             index=True,
             index_label="fid",
+            partition_by=partition_by,
         )
     if not blocks_gdf.empty:
         blocks_gdf["bounds_key"] = "bounds"
         blocks_gdf["bounds_fid"] = bounds_fid
-        blocks_gdf.to_postgis(
+        tools.bulk_to_postgis(
+            blocks_gdf,
             target_blocks_table,
-            engine,
             if_exists="append",
             schema="metrics",
             index=True,
             index_label="fid",
+            partition_by=partition_by,
         )
     # GREEN
-    # green spaces
-    green_gdf: gpd.GeoDataFrame = gpd.read_postgis(  # type: ignore
-        f"""
-        SELECT bl.fid, bl.geom
-        FROM eu.blocks bl, eu.{bounds_table} b
-        WHERE b.{bounds_fid_col} = {bounds_fid}
-            -- use intersects to catch overlapping geoms
-            AND ST_Intersects(b.geom_2000, bl.geom)
-            AND class_2018 in (
-                'Arable land (annual crops)',
-                'Complex and mixed cultivation patterns',
-                'Forests',
-                'Green urban areas',
-                'Herbaceous vegetation associations (natural grassland, moors...)',
-                'Open spaces with little or no vegetation (beaches, dunes, bare rocks, glaciers)',
-                'Orchards at the fringe of urban classes',
-                'Pastures',
-                'Permanent crops (vineyards, fruit trees, olive groves)',
-                'Sports and leisure facilities',
-                'Water',
-                'Wetlands'
-            )
-            AND ST_IsValid(bl.geom)
-        """,
-        engine,
-        index_col="fid",
-        geom_col="geom",
-    )
-    # trees - simplify
-    trees_gdf: gpd.GeoDataFrame = gpd.read_postgis(  # type: ignore
-        f"""
-        SELECT t.fid, t.geom
-        FROM eu.trees t, eu.{bounds_table} b
-        WHERE b.{bounds_fid_col} = {bounds_fid}
-            -- use intersects to catch overlapping geoms
-            AND ST_Intersects(b.geom_2000, t.geom)
-            AND ST_IsValid(t.geom)
-        """,
-        engine,
-        index_col="fid",
-        geom_col="geom",
-    )
-    nodes_gdf = processors.process_green(nodes_gdf, green_gdf, trees_gdf, network_structure)
+    nodes_gdf = processors.process_green(nodes_gdf, inputs["green"], inputs["trees"], network_structure)
     # STATS
     logger.info("Computing stats")
-    # fetch stats
-    stats_gdf = gpd.read_postgis(
-        f"""
-        SELECT
-            s.fid,
-            s.t,
-            s.m,
-            s.f,
-            s.y_lt15,
-            s.y_1564,
-            s.y_ge65,
-            s.emp,
-            s.nat,
-            s.eu_oth,
-            s.oth,
-            s.same,
-            s.chg_in,
-            s.chg_out,
-            ST_Centroid(s.geom) as cent
-        FROM eu.stats s, eu.{bounds_table} b
-        WHERE b.{bounds_fid_col} = {bounds_fid}
-                AND ST_Intersects(b.geom_2000, s.geom);
-        """,
-        engine,
-        index_col="fid",
-        geom_col="cent",
-    )
+    stats_gdf: gpd.GeoDataFrame = inputs["stats"]
     grid_coords = np.array([(point.x, point.y) for point in stats_gdf.cent])  # type: ignore
     target_coords = np.column_stack((nodes_gdf.x, nodes_gdf.y))  # type: ignore
     cols = [
@@ -207,20 +221,22 @@ def generate_metrics(
     if not nodes_gdf.empty:
         nodes_gdf["bounds_key"] = "bounds"
         nodes_gdf["bounds_fid"] = bounds_fid
-        nodes_gdf = nodes_gdf.loc[nodes_gdf.live]
-        nodes_gdf.to_postgis(  # type: ignore
+        nodes_gdf = nodes_gdf.loc[nodes_gdf.live]  # type: ignore
+        tools.bulk_to_postgis(
+            nodes_gdf,
             target_nodes_table,
-            engine,
             if_exists="append",
             schema=target_schema,
             index=True,
             index_label="fid",
+            partition_by=partition_by,
         )
 
 
 def compute_metrics(
     target_bounds_fids: list[int] | str,
     drop: bool = False,
+    partition: bool = False,
 ):
     for schema, table in [
         ("overture", "dual_nodes"),
@@ -237,6 +253,7 @@ def compute_metrics(
         if not (tools.check_table_exists(schema, table)):
             raise OSError(f"The {schema}.{table} table needs to be created prior to proceeding.")
     logger.info("Computing metrics")
+    tools.start_query_stats_run()
     tools.prepare_schema("metrics")
     load_key = "metrics"
     bounds_schema = "eu"
@@ -270,6 +287,7 @@ def compute_metrics(
                 target_nodes_table,
                 target_blocks_table,
                 target_bldgs_table,
+                partition,
             ],
             content_schema=target_schema,
             content_tables=[
@@ -299,10 +317,16 @@ if __name__ == "__main__":
             help=("A bounds fid as int to load a specific bounds. Use 'all' to load all bounds."),
         )
         parser.add_argument("--drop", action="store_true", help="Whether to drop existing tables.")
+        parser.add_argument(
+            "--partition",
+            action="store_true",
+            help="Whether to list partition newly created tables by bounds_fid so that reloads drop partitions.",
+        )
         args = parser.parse_args()
         compute_metrics(
             args.bounds_fid,
             drop=args.drop,
+            partition=args.partition,
         )
     else:
         bounds_fids = [636]
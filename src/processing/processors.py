@@ -5,15 +5,11 @@ import momepy
 import numpy as np
 from cityseer.metrics import layers, networks
 from rasterio.io import MemoryFile
-from rasterio.mask import mask
-from tqdm import tqdm
 
 from src import tools
 
 logger = tools.get_logger(__name__)
 
-OVERTURE_SCHEMA = tools.generate_overture_schema()
-
 
 def process_centrality(nodes_gdf: gpd.GeoDataFrame, network_structure) -> gpd.GeoDataFrame:
     """ """
@@ -30,7 +26,7 @@ def process_places(
     """ """
     logger.info("Computing places")
     # prepare keys
-    landuse_keys = list(OVERTURE_SCHEMA.keys())
+    landuse_keys = list(tools.generate_overture_schema().keys())
     # remove structure and geography category
     landuse_keys.remove("structure_and_geography")
     places_gdf = places_gdf[places_gdf["main_cat"] != "structure_and_geography"]  # type: ignore
@@ -131,18 +127,9 @@ def process_blocks_buildings(
             bldgs_gdf["mean_height"] = np.nan
         else:
             logger.info("Sampling building heights")
-            heights = []
             with MemoryFile(raster_bytes) as memfile, memfile.open() as rast_data:
-                for _idx, bldg_row in tqdm(bldgs_gdf.iterrows(), total=len(bldgs_gdf)):
-                    try:
-                        # raster values within building polygon
-                        out_image, _ = mask(rast_data, [bldg_row.geom.buffer(5)], crop=True)
-                        # mean height, excluding nodata values
-                        valid_pixels = out_image[0][out_image[0] != rast_data.nodata]
-                        mean_height = np.mean(valid_pixels) if len(valid_pixels) > 0 else np.nan
-                        heights.append(mean_height)
-                    except ValueError:
-                        heights.append(np.nan)
+                # mean height within the buffered footprints, excluding nodata values
+                heights, _pixel_counts = tools.raster_zonal_stats(bldgs_gdf.geometry.buffer(5), rast_data)
             bldgs_gdf["mean_height"] = heights
         # bldg metrics
         area = bldgs_gdf.area
@@ -0,0 +1,111 @@
+""" """
+
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+from src import tools
+
+logger = tools.get_logger(__name__)
+
+
+def load_query_stats(sink: str, run_id: str | None = None, table: str = "query_stats") -> pd.DataFrame:
+    """Loads query or stage stats from the loads schema ("db") or a JSONL file, defaulting to the latest run."""
+    if sink == "db":
+        stats_df = pd.read_sql(f"SELECT * FROM loads.{table}", tools.get_sqlalchemy_engine())
+    else:
+        if not Path(sink).exists():
+            raise OSError(f"Stats file {sink} does not exist.")
+        stats_df = pd.read_json(sink, lines=True, dtype={"bounds_fid": str, "run_id": str})
+    if stats_df.empty:
+        return stats_df
+    for count_col in ["rows", "nodes", "edges"]:
+        if count_col in stats_df.columns:
+            stats_df[count_col] = stats_df[count_col].astype("Int64")
+    # records from scripts not starting a run
+    stats_df["run_id"] = stats_df["run_id"].fillna("none")
+    if run_id is None:
+        run_id = stats_df.sort_values("started_at")["run_id"].iloc[-1]
+        logger.info(f"Using latest run: {run_id}")
+    return stats_df[stats_df["run_id"] == run_id]  # type: ignore
+
+
+def summarise_query_stats(stats_df: pd.DataFrame, top: int = 20) -> pd.DataFrame:
+    """Aggregates query stats per label, sorted by total wall time."""
+    summary_df = stats_df.groupby("label").agg(
+        count=("seconds", "size"),
+        total_s=("seconds", "sum"),
+        mean_s=("seconds", "mean"),
+        p95_s=("seconds", lambda secs: secs.quantile(0.95)),
+        max_s=("seconds", "max"),
+        rows=("rows", "sum"),
+        mb=("bytes", lambda n_bytes: n_bytes.sum() / 1e6),
+    )
+    summary_df["share"] = summary_df["total_s"] / summary_df["total_s"].sum()
+    return summary_df.sort_values("total_s", ascending=False).head(top)
+
+
+def summarise_stage_stats(stats_df: pd.DataFrame) -> pd.DataFrame:
+    """Aggregates stage stats per stage, sorted by total wall time."""
+    summary_df = stats_df.groupby("stage").agg(
+        count=("seconds", "size"),
+        total_s=("seconds", "sum"),
+        mean_s=("seconds", "mean"),
+        max_s=("seconds", "max"),
+        peak_rss_mb=("peak_rss_mb", "max"),
+        nodes=("nodes", "sum"),
+        edges=("edges", "sum"),
+    )
+    summary_df["share"] = summary_df["total_s"] / summary_df["total_s"].sum()
+    return summary_df.sort_values("total_s", ascending=False)
+
+
+def report_stage_stats(sink: str, run_id: str | None = None, top: int = 20) -> None:
+    """ """
+    stats_df = load_query_stats(sink, run_id, table="stage_stats")
+    if stats_df.empty:
+        logger.warning("No stage stats found.")
+        return
+    print(f"{len(stats_df)} stages over {stats_df['bounds_fid'].nunique()} bounds")
+    print(summarise_stage_stats(stats_df).to_string(float_format=lambda val: f"{val:.3f}"))
+    slowest_df = stats_df.sort_values("seconds", ascending=False).head(top)
+    print("Slowest individual stages:")
+    print(slowest_df[["stage", "bounds_fid", "seconds", "peak_rss_mb", "nodes", "edges"]].to_string(index=False))
+
+
+def report_query_stats(sink: str, run_id: str | None = None, top: int = 20) -> None:
+    """ """
+    stats_df = load_query_stats(sink, run_id)
+    if stats_df.empty:
+        logger.warning("No query stats found.")
+        return
+    summary_df = summarise_query_stats(stats_df, top)
+    n_bounds = stats_df["bounds_fid"].nunique()
+    print(f"{len(stats_df)} queries over {n_bounds} bounds, {stats_df['seconds'].sum():.1f}s in total")
+    print(summary_df.to_string(float_format=lambda val: f"{val:.3f}"))
+    slowest_df = stats_df.sort_values("seconds", ascending=False).head(top)
+    print("Slowest individual queries:")
+    print(slowest_df[["label", "bounds_fid", "seconds", "rows"]].to_string(index=False))
+
+
+if __name__ == "__main__":
+    """
+    Examples are run from the project folder (the folder containing src)
+    QUERY_STATS_SINK=temp/query_stats.jsonl python -m src.processing.generate_metrics all
+    python -m src.processing.query_stats_report temp/query_stats.jsonl
+    STAGE_STATS_SINK=temp/stage_stats.jsonl python -m src.data.ingest_overture_networks all
+    python -m src.processing.query_stats_report temp/stage_stats.jsonl --stages
+    """
+    parser = argparse.ArgumentParser(description="Summarise the slowest query classes for a run.")
+    parser.add_argument(
+        "sink", type=str, help="Path to a query or stage stats JSONL file, or 'db' for the loads schema tables."
+    )
+    parser.add_argument("--run_id", type=str, default=None, help="The run to summarise. Defaults to the latest run.")
+    parser.add_argument("--top", type=int, default=20, help="The number of query classes to list.")
+    parser.add_argument("--stages", action="store_true", help="Summarise pipeline stage stats instead of queries.")
+    args = parser.parse_args()
+    if args.stages:
+        report_stage_stats(args.sink, args.run_id, args.top)
+    else:
+        report_query_stats(args.sink, args.run_id, args.top)
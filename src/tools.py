@@ -1,26 +1,47 @@
 """ """
 
 import argparse
+import asyncio
+import atexit
+import concurrent.futures
+import contextvars
+import datetime
+import functools
+import hashlib
+import itertools
 import json
 import logging
+import multiprocessing
 import os
-import random
+import re
+import resource
+import socket
+import sys
+import threading
 import time
+import traceback
 import warnings
-from collections.abc import Callable
-from typing import Any, cast
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
 
+import asyncpg
 import geopandas as gpd
 import networkx as nx
 import numpy as np
 import pandas as pd
 import psycopg
+import psycopg.sql
+import shapely
 import sqlalchemy
+import sqlalchemy.dialects.postgresql
 from cityseer.tools import io
 from dotenv import load_dotenv
+from geopandas.array import GeometryDtype
 from pyproj import Transformer
-from shapely import geometry, ops, wkb
-from shapely.ops import transform
+from rasterio import features
+from shapely import geometry, wkb
 from tqdm import tqdm
 
 warnings.simplefilter(action="ignore", category=pd.errors.PerformanceWarning)
@@ -48,31 +69,663 @@ def get_db_config() -> dict[str, str | None]:
     return db_config
 
 
+# process-local engine - its connection pool is shared by the psycopg helpers and geopandas
+_ENGINE: sqlalchemy.engine.Engine | None = None
+_ENGINE_PID: int | None = None
+_ENGINE_LOCK = threading.Lock()
+
+
+def _reset_engine_after_fork() -> None:
+    """ """
+    global _ENGINE, _ENGINE_PID
+    if _ENGINE is not None:
+        # don't close the parent's sockets from the child - only drop the references
+        _ENGINE.dispose(close=False)
+    _ENGINE = None
+    _ENGINE_PID = None
+
+
+os.register_at_fork(after_in_child=_reset_engine_after_fork)
+
+
 def get_sqlalchemy_engine() -> sqlalchemy.engine.Engine:
+    """Returns the process-local engine, creating it on first use or after a fork."""
+    global _ENGINE, _ENGINE_PID
+    with _ENGINE_LOCK:
+        if _ENGINE is not None and os.getpid() == _ENGINE_PID:
+            return _ENGINE
+        if _ENGINE is not None:
+            # e.g. spawned from a forked parent without the fork hook having run
+            _ENGINE.dispose(close=False)
+        db_config = get_db_config()
+        db_url = sqlalchemy.engine.URL.create(
+            "postgresql+psycopg",
+            username=db_config["user"],
+            password=db_config["password"],
+            host=db_config["host"],
+            port=int(db_config["port"]) if db_config["port"] is not None else None,
+            database=db_config["dbname"],
+        )
+        _ENGINE = sqlalchemy.create_engine(
+            db_url,
+            # keep a few warm connections per worker for its whole life
+            pool_size=int(os.getenv("DB_POOL_SIZE", "3")),
+            max_overflow=int(os.getenv("DB_POOL_MAX_OVERFLOW", "5")),
+            # health checks - test on checkout and recycle long-lived connections
+            pool_pre_ping=True,
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        )
+        _ENGINE_PID = os.getpid()
+        return _ENGINE
+
+
+@contextmanager
+def db_connection() -> Iterator[psycopg.Connection]:
+    """Checks out a psycopg connection from the process-local pool and returns it on exit."""
+    pooled_con = get_sqlalchemy_engine().raw_connection()
+    try:
+        yield pooled_con.driver_connection  # type: ignore
+    finally:
+        # returns to the pool - uncommitted transactions are rolled back on return
+        pooled_con.close()
+
+
+# query instrumentation - enabled by setting QUERY_STATS_SINK to "db" (loads.query_stats), "log", or a JSONL file path
+_QUERY_STATS_BUFFER: list[dict[str, Any]] = []
+_QUERY_STATS_BOUNDS_FID: contextvars.ContextVar[int | str | None] = contextvars.ContextVar(
+    "query_stats_bounds_fid", default=None
+)
+
+
+def query_stats_sink() -> str | None:
     """ """
-    db_config = get_db_config()
-    db_con_str = (
-        f"postgresql+psycopg://{db_config['user']}:{db_config['password']}"
-        f"@{db_config['host']}:{db_config['port']}/{db_config['dbname']}"
-    )
-    return sqlalchemy.create_engine(db_con_str, pool_pre_ping=True)
+    return os.getenv("QUERY_STATS_SINK")
+
+
+def start_query_stats_run() -> str:
+    """Starts a new run for the query stats. The id is set on the environment so that worker processes inherit it."""
+    run_id = f"{datetime.datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}"
+    os.environ["QUERY_STATS_RUN_ID"] = run_id
+    if query_stats_sink() is not None:
+        logger.info(f"Recording query stats for run {run_id} to {query_stats_sink()}")
+    if stage_stats_sink() is not None:
+        logger.info(f"Recording stage stats for run {run_id} to {stage_stats_sink()}")
+    return run_id
+
+
+@contextmanager
+def query_stats_bounds(bounds_fid: int | str | None) -> Iterator[None]:
+    """Attributes queries and stages recorded within the context to a bounds fid, flushing the records on exit."""
+    token = _QUERY_STATS_BOUNDS_FID.set(bounds_fid)
+    try:
+        yield
+    finally:
+        _QUERY_STATS_BOUNDS_FID.reset(token)
+        flush_query_stats()
+        flush_stage_stats()
+
+
+def query_stats_bounds_fid() -> int | str | None:
+    """The bounds fid that recorded queries and stages are currently attributed to, e.g. to pass to workers."""
+    return _QUERY_STATS_BOUNDS_FID.get()
+
+
+def _estimate_bytes(values: Iterable[Any]) -> int:
+    """Rough transfer size: lengths of text and binary values, 8 bytes for other scalars."""
+    n_bytes = 0
+    for value in values:
+        if isinstance(value, tuple | list):
+            n_bytes += _estimate_bytes(value)
+        elif isinstance(value, str | bytes | bytearray | memoryview):
+            n_bytes += len(value)
+        elif value is not None:
+            n_bytes += 8
+    return n_bytes
+
+
+@contextmanager
+def record_query_stats(label: str) -> Iterator[dict[str, Any]]:
+    """Times the enclosed query. Callers can set the rows and bytes keys on the yielded record."""
+    record: dict[str, Any] = {"label": label, "rows": None, "bytes": None}
+    started_at = datetime.datetime.now(datetime.timezone.utc)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        if query_stats_sink() is not None:
+            record["seconds"] = time.perf_counter() - start
+            record["started_at"] = started_at.isoformat()
+            record["run_id"] = os.getenv("QUERY_STATS_RUN_ID")
+            record["bounds_fid"] = _QUERY_STATS_BOUNDS_FID.get()
+            record["pid"] = os.getpid()
+            _QUERY_STATS_BUFFER.append(record)
+
+
+def _caller_label() -> str:
+    """Labels queries by the function calling the DB helper, e.g. check_table_exists."""
+    return sys._getframe(2).f_code.co_name
+
+
+def _write_stats(sink: str, table: str, cols: dict[str, str], records: list[dict[str, Any]]) -> None:
+    """Writes stats records to the loads schema ("db"), the logger ("log"), or else appends to a JSONL file."""
+    for rec in records:
+        # bounds fids can be int or str
+        rec["bounds_fid"] = str(rec["bounds_fid"]) if rec["bounds_fid"] is not None else None
+    if sink == "db":
+        # uses the connection directly so that writing the stats is not itself recorded
+        with db_connection() as db_con, db_con.cursor() as cursor:
+            create_query = f"""
+                CREATE SCHEMA IF NOT EXISTS loads;
+                CREATE TABLE IF NOT EXISTS loads.{table} (
+                    {", ".join(f"{col} {col_type}" for col, col_type in cols.items())}
+                );
+                """
+            insert_query = f"INSERT INTO loads.{table} ({', '.join(cols)}) VALUES ({', '.join(['%s'] * len(cols))});"
+            cursor.execute(create_query)  # type: ignore
+            cursor.executemany(insert_query, [tuple(rec[col] for col in cols) for rec in records])  # type: ignore
+            db_con.commit()
+    elif sink == "log":
+        for rec in records:
+            logger.info(f"{table}: {json.dumps({col: rec[col] for col in cols})}")
+    else:
+        lines = "".join(json.dumps({col: rec[col] for col in cols}) + "\n" for rec in records)
+        # single append per flush so that lines from concurrent workers don't interleave
+        with open(sink, "a") as stats_file:
+            stats_file.write(lines)
+
+
+QUERY_STATS_COLS = {
+    "run_id": "text",
+    "label": "text",
+    "bounds_fid": "text",
+    "pid": "integer",
+    "started_at": "timestamptz",
+    "seconds": "double precision",
+    "rows": "bigint",
+    "bytes": "bigint",
+}
+
+
+def flush_query_stats() -> None:
+    """ """
+    sink = query_stats_sink()
+    if sink is None or not _QUERY_STATS_BUFFER:
+        return
+    records = list(_QUERY_STATS_BUFFER)
+    _QUERY_STATS_BUFFER.clear()
+    _write_stats(sink, "query_stats", QUERY_STATS_COLS, records)
+
+
+atexit.register(flush_query_stats)
+
+# pipeline stage instrumentation - enabled by setting STAGE_STATS_SINK to "db" (loads.stage_stats), "log", or a JSONL
+_STAGE_STATS_BUFFER: list[dict[str, Any]] = []
+STAGE_STATS_SAMPLE_SECONDS = 0.1
+STAGE_STATS_COLS = {
+    "run_id": "text",
+    "stage": "text",
+    "bounds_fid": "text",
+    "pid": "integer",
+    "started_at": "timestamptz",
+    "seconds": "double precision",
+    "peak_rss_mb": "double precision",
+    "nodes": "bigint",
+    "edges": "bigint",
+    "rows": "bigint",
+}
+
+
+def stage_stats_sink() -> str | None:
+    """ """
+    return os.getenv("STAGE_STATS_SINK")
+
+
+def _current_rss_bytes() -> int:
+    """Resident set size, falling back to the process peak where /proc is unavailable, e.g. macOS."""
+    try:
+        with open("/proc/self/statm") as statm_file:
+            return int(statm_file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # bytes on macOS, kilobytes on linux
+        return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+@contextmanager
+def record_stage_stats(stage: str) -> Iterator[dict[str, Any]]:
+    """
+    Times the enclosed pipeline stage and samples the peak RSS from a background thread.
+    Callers can set the nodes, edges, and rows keys on the yielded record.
+    """
+    record: dict[str, Any] = {"stage": stage, "nodes": None, "edges": None, "rows": None}
+    if stage_stats_sink() is None:
+        yield record
+        return
+    started_at = datetime.datetime.now(datetime.timezone.utc)
+    start = time.perf_counter()
+    peak_rss = [_current_rss_bytes()]
+    stop_event = threading.Event()
+
+    def sample() -> None:
+        while not stop_event.wait(STAGE_STATS_SAMPLE_SECONDS):
+            peak_rss[0] = max(peak_rss[0], _current_rss_bytes())
+
+    sampler_thread = threading.Thread(target=sample, daemon=True)
+    sampler_thread.start()
+    try:
+        yield record
+    finally:
+        stop_event.set()
+        sampler_thread.join()
+        record["seconds"] = time.perf_counter() - start
+        record["peak_rss_mb"] = max(peak_rss[0], _current_rss_bytes()) / 1e6
+        record["started_at"] = started_at.isoformat()
+        record["run_id"] = os.getenv("QUERY_STATS_RUN_ID")
+        record["bounds_fid"] = _QUERY_STATS_BOUNDS_FID.get()
+        record["pid"] = os.getpid()
+        _STAGE_STATS_BUFFER.append(record)
 
 
-def db_execute(query: str, params: tuple[Any] | None = None) -> None:
+def flush_stage_stats() -> None:
     """ """
-    with psycopg.connect(**get_db_config()) as db_con, db_con.cursor() as cursor:  # type: ignore
+    sink = stage_stats_sink()
+    if sink is None or not _STAGE_STATS_BUFFER:
+        return
+    records = list(_STAGE_STATS_BUFFER)
+    _STAGE_STATS_BUFFER.clear()
+    _write_stats(sink, "stage_stats", STAGE_STATS_COLS, records)
+
+
+atexit.register(flush_stage_stats)
+
+
+def db_execute(query: str, params: tuple[Any] | None = None, label: str | None = None) -> None:
+    """ """
+    with record_query_stats(label or _caller_label()) as record, db_connection() as db_con, db_con.cursor() as cursor:
         cursor.execute(query, params)  # type: ignore
         db_con.commit()
+        # -1 where not applicable, e.g. DDL
+        record["rows"] = cursor.rowcount if cursor.rowcount >= 0 else None
 
 
-def db_fetch(query: str, params: tuple[Any] | None = None) -> Any:
+def db_fetch(query: str, params: tuple[Any] | None = None, label: str | None = None) -> Any:
     """ """
-    with psycopg.connect(**get_db_config()) as db_con, db_con.cursor() as cursor:  # type: ignore
-        cursor.execute(query, params)  # type: ignore
-        rows = cursor.fetchall()
+    with record_query_stats(label or _caller_label()) as record:
+        with db_connection() as db_con, db_con.cursor() as cursor:
+            cursor.execute(query, params)  # type: ignore
+            rows = cursor.fetchall()
+            db_con.commit()
+        record["rows"] = len(rows)
+        if query_stats_sink() is not None:
+            record["bytes"] = _estimate_bytes(rows)
     return rows
 
 
+# query spec for concurrent fetching: (query, index_col, geom_col) - geom_col None returns the raw records
+QuerySpec = tuple[str, str | None, str | None]
+
+
+async def _init_asyncpg_connection(db_con: asyncpg.Connection) -> None:
+    """ """
+    # pass EWKB through as bytes for vectorised decoding with shapely
+    await db_con.set_type_codec("geometry", encoder=bytes, decoder=bytes, format="binary")
+
+
+def _records_to_gdf(
+    columns: list[str], records: list[asyncpg.Record], index_col: str | None, geom_col: str
+) -> gpd.GeoDataFrame:
+    """Decodes asyncpg records with an EWKB geometry column into a GeoDataFrame, per gpd.read_postgis."""
+    data_df = pd.DataFrame([tuple(record) for record in records], columns=columns)
+    geoms = shapely.from_wkb(data_df[geom_col].to_numpy(dtype=object))
+    # take the CRS from the first geometry's SRID
+    srids = shapely.get_srid(geoms[~shapely.is_missing(geoms)])
+    crs = int(srids[0]) if len(srids) and srids[0] > 0 else None
+    data_df[geom_col] = geoms
+    data_gdf = gpd.GeoDataFrame(data_df, geometry=geom_col, crs=crs)  # type: ignore
+    if index_col is not None:
+        data_gdf = data_gdf.set_index(index_col)
+    return data_gdf  # type: ignore
+
+
+async def _db_fetch_concurrently(queries: dict[str, QuerySpec], max_connections: int) -> dict[str, Any]:
+    """ """
+    db_config = get_db_config()
+    async with asyncpg.create_pool(
+        host=db_config["host"],
+        port=db_config["port"],
+        user=db_config["user"],
+        database=db_config["dbname"],
+        password=db_config["password"],
+        min_size=1,
+        max_size=max_connections,
+        init=_init_asyncpg_connection,
+    ) as pool:
+
+        async def fetch(label: str, query: str, index_col: str | None, geom_col: str | None) -> tuple[str, Any]:
+            with record_query_stats(f"db_fetch_concurrently:{label}") as record:
+                async with pool.acquire() as db_con:
+                    statement = await db_con.prepare(query)
+                    columns = [attr.name for attr in statement.get_attributes()]
+                    records = await statement.fetch()
+                record["rows"] = len(records)
+                if query_stats_sink() is not None:
+                    record["bytes"] = _estimate_bytes(tuple(rec) for rec in records)
+            logger.info(f"Fetched {len(records)} rows for {label}")
+            # decode as results arrive
+            if geom_col is None:
+                return label, [tuple(record) for record in records]
+            return label, _records_to_gdf(columns, records, index_col, geom_col)
+
+        results = await asyncio.gather(*[fetch(label, *spec) for label, spec in queries.items()])
+    return dict(results)
+
+
+def db_fetch_concurrently(queries: dict[str, QuerySpec], max_connections: int = 4) -> dict[str, Any]:
+    """
+    Runs independent queries at the same time over a small asyncpg pool. Returns results keyed by label:
+    GeoDataFrames for queries with a geom column, otherwise the rows as tuples per db_fetch.
+    """
+    return asyncio.run(_db_fetch_concurrently(queries, max_connections))
+
+
+def _sql_type_for_column(series: pd.Series, dtype_override: Any = None) -> str:
+    """Postgres type for creating a column from a pandas / geopandas series."""
+    if dtype_override is not None:
+        if isinstance(dtype_override, str):
+            return dtype_override
+        # SQLAlchemy types, e.g. sqlalchemy.dialects.postgresql.JSON, per to_postgis
+        if isinstance(dtype_override, type):
+            dtype_override = dtype_override()
+        return dtype_override.compile(dialect=sqlalchemy.dialects.postgresql.dialect())
+    if isinstance(series.dtype, GeometryDtype):
+        crs = series.values.crs  # type: ignore
+        srid = crs.to_epsg() if crs is not None else None
+        # generic geometry type so that appends from other bounds don't clash on e.g. Polygon vs MultiPolygon
+        return f"geometry(GEOMETRY, {srid})" if srid is not None else "geometry"
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return "boolean"
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return {1: "smallint", 2: "smallint", 4: "integer"}.get(series.dtype.itemsize, "bigint")  # type: ignore
+    if pd.api.types.is_float_dtype(series.dtype):
+        return "real" if series.dtype.itemsize == 4 else "double precision"  # type: ignore
+    if isinstance(series.dtype, pd.DatetimeTZDtype):
+        return "timestamp with time zone"
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return "timestamp without time zone"
+    return "text"
+
+
+# target types converted for binary COPY - tables with other column types, e.g. numeric, are written with text COPY
+BINARY_COPY_TYPES = frozenset(
+    {
+        "geometry",
+        "int2",
+        "int4",
+        "int8",
+        "float4",
+        "float8",
+        "bool",
+        "text",
+        "varchar",
+        "bpchar",
+        "json",
+        "jsonb",
+        "timestamp",
+        "timestamptz",
+        "date",
+    }
+)
+
+
+def _copy_values_for_column(series: pd.Series, pg_type_name: str, binary: bool = True) -> tuple[str, list[Any]]:
+    """
+    Converts a column to python values and the psycopg type used to dump them in binary or text COPY format.
+    Text COPY sends types without a binary conversion as their text representation, parsed by the column type.
+    """
+    not_na = series.notna().to_numpy()
+    if pg_type_name == "geometry":
+        geoms = np.asarray(series.values, dtype=object)
+        crs = getattr(series.values, "crs", None)
+        srid = crs.to_epsg() if crs is not None else None
+        if srid is not None:
+            geoms = shapely.set_srid(geoms, srid)
+        # the geometry binary receive format is EWKB - sent as raw bytes, else as hex EWKB text
+        if not binary:
+            return "text", shapely.to_wkb(geoms, hex=True, include_srid=srid is not None).tolist()  # type: ignore
+        return "bytea", shapely.to_wkb(geoms, include_srid=srid is not None).tolist()  # type: ignore
+    if pg_type_name in ("int2", "int4", "int8"):
+        values = [int(v) if keep else None for v, keep in zip(series.tolist(), not_na, strict=True)]
+        return pg_type_name, values
+    if pg_type_name in ("float4", "float8"):
+        # NaN is written as NULL, as per to_postgis
+        values = [float(v) if keep else None for v, keep in zip(series.tolist(), not_na, strict=True)]
+        return pg_type_name, values
+    if pg_type_name == "bool":
+        values = [bool(v) if keep else None for v, keep in zip(series.tolist(), not_na, strict=True)]
+        return pg_type_name, values
+    if pg_type_name in ("text", "varchar", "bpchar", "json"):
+        # json binary receive format is the plain text representation
+        values = [str(v) if keep else None for v, keep in zip(series.tolist(), not_na, strict=True)]
+        return "text", values
+    if pg_type_name == "jsonb" and binary:
+        # jsonb binary receive format is a version byte followed by the text representation
+        values = [b"\x01" + str(v).encode() if keep else None for v, keep in zip(series.tolist(), not_na, strict=True)]
+        return "bytea", values
+    if pg_type_name in ("timestamp", "timestamptz", "date"):
+        values = [v.to_pydatetime() if keep else None for v, keep in zip(series.tolist(), not_na, strict=True)]
+        if pg_type_name == "date":
+            values = [v.date() if v is not None else None for v in values]
+        return pg_type_name, values
+    if binary:
+        raise ValueError(f"Unhandled Postgres type for binary COPY of column {series.name}: {pg_type_name}")
+    values = [str(v) if keep else None for v, keep in zip(series.tolist(), not_na, strict=True)]
+    return "text", values
+
+
+def bounds_partition_name(table: str, bounds_fid: int | str) -> str:
+    """Name of the list partition holding a bounds fid's rows in a table partitioned by bounds_fid."""
+    return f"{table}_bounds_{bounds_fid}"
+
+
+def _copy_rows(
+    cursor: psycopg.Cursor, table_ident: psycopg.sql.Identifier, data_df: pd.DataFrame, target_types: dict[str, str]
+) -> int | None:
+    """
+    Writes the rows and returns an estimate of the bytes transferred if query stats are enabled.
+    Uses binary COPY unless a target column type has no binary conversion, in which case text COPY is used.
+    """
+    binary = all(target_types[col] in BINARY_COPY_TYPES for col in data_df.columns)
+    copy_types = []
+    copy_cols = []
+    for col in data_df.columns:
+        copy_type, copy_values = _copy_values_for_column(data_df[col], target_types[col], binary)
+        copy_types.append(copy_type)
+        copy_cols.append(copy_values)
+    copy_format = psycopg.sql.SQL(" (FORMAT BINARY)" if binary else "")
+    copy_query = psycopg.sql.SQL("COPY {} ({}) FROM STDIN{}").format(
+        table_ident,
+        psycopg.sql.SQL(", ").join([psycopg.sql.Identifier(str(col)) for col in data_df.columns]),
+        copy_format,
+    )
+    with cursor.copy(copy_query) as copy:
+        copy.set_types(copy_types)
+        for row in zip(*copy_cols, strict=True):
+            copy.write_row(row)
+    if query_stats_sink() is None:
+        return None
+    return _estimate_bytes(copy_cols)
+
+
+def bulk_to_postgis(
+    gdf: gpd.GeoDataFrame | pd.DataFrame,
+    name: str,
+    schema: str | None = None,
+    if_exists: str = "fail",
+    index: bool = False,
+    index_label: str | None = None,
+    dtype: dict[str, Any] | None = None,
+    partition_by: str | None = None,
+) -> None:
+    """
+    Drop-in replacement for GeoDataFrame.to_postgis which streams rows over COPY ... FROM STDIN (FORMAT BINARY).
+    The table is created from the frame's dtypes on first use, with btree indices on the index columns if index=True.
+    All geometry columns are written as EWKB. Existing tables with column types outside BINARY_COPY_TYPES,
+    e.g. numeric, are written with text COPY instead.
+    If partition_by is set, a newly created table is list partitioned on that column (e.g. bounds_fid).
+    Rows for a partitioned table are written to a standalone table per key value which is then attached.
+    """
+    schema = "public" if schema is None else schema
+    if if_exists not in ("fail", "replace", "append"):
+        raise ValueError(f"Unexpected if_exists argument: {if_exists}")
+    data_df = pd.DataFrame(gdf, copy=False)
+    index_cols = []
+    if index:
+        data_df = data_df.reset_index(names=index_label)  # type: ignore
+        index_cols = list(data_df.columns[: gdf.index.nlevels])
+    if partition_by is not None and partition_by not in data_df.columns:
+        raise ValueError(f"Partition column {partition_by} is not present in the data.")
+    if dtype is None:
+        dtype = {}
+    table_ident = psycopg.sql.Identifier(schema, name)
+    with (
+        record_query_stats(f"bulk_to_postgis:{schema}.{name}") as record,
+        db_connection() as db_con,
+        db_con.cursor() as cursor,
+    ):
+        record["rows"] = len(data_df)
+        # serialise concurrent workers creating the same table - released on commit
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s));", (f"{schema}.{name}",))
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL;", (f"{schema}.{name}",))
+        exists = cursor.fetchone()[0]  # type: ignore
+        if exists and if_exists == "fail":
+            raise ValueError(f"Table {schema}.{name} already exists.")
+        if exists and if_exists == "replace":
+            cursor.execute(psycopg.sql.SQL("DROP TABLE {};").format(table_ident))
+            exists = False
+        if not exists:
+            col_defs = [
+                psycopg.sql.SQL("{} {}").format(
+                    psycopg.sql.Identifier(str(col)),
+                    psycopg.sql.SQL(_sql_type_for_column(data_df[col], dtype.get(str(col)))),  # type: ignore
+                )
+                for col in data_df.columns
+            ]
+            partition_clause = psycopg.sql.SQL("")
+            if partition_by is not None:
+                partition_clause = psycopg.sql.SQL(" PARTITION BY LIST ({})").format(
+                    psycopg.sql.Identifier(partition_by)
+                )
+            cursor.execute(
+                psycopg.sql.SQL("CREATE TABLE {} ({}){};").format(
+                    table_ident, psycopg.sql.SQL(", ").join(col_defs), partition_clause
+                )
+            )
+            for col in data_df.columns:
+                if isinstance(data_df[col].dtype, GeometryDtype):
+                    cursor.execute(
+                        psycopg.sql.SQL("CREATE INDEX {} ON {} USING gist ({});").format(
+                            psycopg.sql.Identifier(f"idx_{name}_{col}"), table_ident, psycopg.sql.Identifier(col)
+                        )
+                    )
+            # btree indices on the index columns, as per to_postgis with index=True
+            for col in index_cols:
+                cursor.execute(
+                    psycopg.sql.SQL("CREATE INDEX {} ON {} ({});").format(
+                        psycopg.sql.Identifier(f"ix_{name}_{col}"), table_ident, psycopg.sql.Identifier(str(col))
+                    )
+                )
+        # binary COPY requires the exact target types
+        cursor.execute(
+            """
+            SELECT a.attname, t.typname
+            FROM pg_attribute a
+            JOIN pg_type t ON t.oid = a.atttypid
+            WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped;
+            """,
+            (f"{schema}.{name}",),
+        )
+        target_types = dict(cursor.fetchall())
+        for col in data_df.columns:
+            if col not in target_types:
+                raise ValueError(f"Column {col} does not exist in target table {schema}.{name}")
+        # the partition column of existing tables takes precedence
+        cursor.execute(
+            """
+            SELECT a.attname
+            FROM pg_partitioned_table p
+            JOIN pg_attribute a ON a.attrelid = p.partrelid AND a.attnum = p.partattrs[0]
+            WHERE p.partrelid = %s::regclass;
+            """,
+            (f"{schema}.{name}",),
+        )
+        partition_rows = cursor.fetchall()
+        # commit creation so that the advisory lock doesn't serialise the writes of other workers
+        db_con.commit()
+        if data_df.empty:
+            return
+        if not partition_rows:
+            record["bytes"] = _copy_rows(cursor, table_ident, data_df, target_types)
+            db_con.commit()
+            return
+        partition_col = partition_rows[0][0]
+        if data_df[partition_col].isna().any():
+            raise ValueError(f"Encountered null values for partition column {partition_col}.")
+        for partition_val, partition_df in data_df.groupby(partition_col, sort=False):
+            # numpy scalars to python values for the partition bound literal
+            if isinstance(partition_val, np.generic):
+                partition_val = partition_val.item()
+            partition_name = bounds_partition_name(name, partition_val)  # type: ignore
+            partition_ident = psycopg.sql.Identifier(schema, partition_name)
+            cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(%s));",
+                (f"{schema}.{partition_name}",),
+            )
+            attached = cursor.fetchone()[0]  # type: ignore
+            # appends to an attached partition, otherwise loads a standalone table to attach
+            cursor.execute(
+                psycopg.sql.SQL("CREATE TABLE IF NOT EXISTS {} (LIKE {} INCLUDING DEFAULTS);").format(
+                    partition_ident, table_ident
+                )
+            )
+            n_bytes = _copy_rows(cursor, partition_ident, partition_df, target_types)  # type: ignore
+            if n_bytes is not None:
+                record["bytes"] = (record["bytes"] or 0) + n_bytes
+            if not attached:
+                # a matching constraint lets ATTACH skip the validation scan
+                constraint_ident = psycopg.sql.Identifier(f"{partition_name}_check")
+                cursor.execute(
+                    psycopg.sql.SQL(
+                        """
+                        ALTER TABLE {partition}
+                            DROP CONSTRAINT IF EXISTS {constraint},
+                            ADD CONSTRAINT {constraint} CHECK ({col} IS NOT NULL AND {col} = {val});
+                        ALTER TABLE {parent} ATTACH PARTITION {partition} FOR VALUES IN ({val});
+                        """
+                    ).format(
+                        partition=partition_ident,
+                        constraint=constraint_ident,
+                        col=psycopg.sql.Identifier(partition_col),
+                        val=psycopg.sql.Literal(partition_val),
+                        parent=table_ident,
+                    )
+                )
+        # the loaded partitions become visible on commit
+        db_con.commit()
+
+
+def check_table_partitioned(db_schema: str, db_table: str) -> bool:
+    """ """
+    partitioned = db_fetch(
+        """
+        SELECT EXISTS (
+            SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)
+        );
+        """,
+        (f"{db_schema}.{db_table}",),  # type: ignore
+    )[0][0]
+    return bool(partitioned)
+
+
 def convert_ndarrays(obj: Any) -> Any:
     if isinstance(obj, np.ndarray):
         return convert_ndarrays(obj.tolist())
@@ -95,44 +748,314 @@ def col_to_json(obj: Any) -> str | None:
     return json.dumps(obj)
 
 
+def _ndarray_to_list(obj: Any) -> Any:
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise ValueError(f"Unhandled type when converting: {type(obj).__name__}")
+
+
+# nested arrays are converted as the C encoder reaches them instead of walking each value in python
+_JSON_ENCODER = json.JSONEncoder(default=_ndarray_to_list)
+# empty string values - quotes within strings are always escaped, and keys are followed by a colon
+_JSON_EMPTY_STR = re.compile(r'(?<!\\)""(?!:)')
+
+
+def series_to_json(col: pd.Series) -> pd.Series:
+    """Serialises a nested geoparquet / geopandas column to JSON strings, matching col_to_json."""
+    encode = _JSON_ENCODER.encode
+    json_strs = []
+    for obj in col.array:
+        if obj is None or (isinstance(obj, str) and obj == ""):
+            json_strs.append("null")
+            continue
+        json_str = encode(obj)
+        # col_to_json converts nested empty strings to null
+        if '""' in json_str:
+            json_str = _JSON_EMPTY_STR.sub("null", json_str)
+        json_strs.append(json_str)
+    return pd.Series(json_strs, index=col.index, dtype=str)
+
+
+def geometry_signatures(geoms: Iterable[Any], attrs: Iterable[str] | None = None, decimals: int = 2) -> list[str]:
+    """
+    Hashes geometries, with coordinates rounded to the given decimals, together with optional attribute strings.
+    Rounding prevents reprojection noise from registering as changes.
+    """
+    rounded_geoms = shapely.transform(np.asarray(geoms), lambda coords: np.round(coords, decimals))
+    geoms_wkb = shapely.to_wkb(rounded_geoms, include_srid=False)
+    if attrs is None:
+        return [hashlib.md5(geom_wkb).hexdigest() for geom_wkb in geoms_wkb]
+    return [hashlib.md5(geom_wkb + attr.encode()).hexdigest() for geom_wkb, attr in zip(geoms_wkb, attrs, strict=True)]
+
+
+def diff_signatures(stored: pd.Series, fresh: pd.Series) -> dict[str, int]:
+    """Counts the ids added, removed, and changed between two series of signatures indexed by id."""
+    shared_ids = stored.index.intersection(fresh.index)  # type: ignore
+    return {
+        "added": len(fresh.index.difference(stored.index)),
+        "removed": len(stored.index.difference(fresh.index)),
+        "changed": int((stored.loc[shared_ids] != fresh.loc[shared_ids]).sum()),
+    }
+
+
 Connector = tuple[str, geometry.Point]
 
 
+def trim_to_bounds(gdf: gpd.GeoDataFrame, bounds_geom: geometry.base.BaseGeometry) -> gpd.GeoDataFrame:
+    """
+    Returns the rows intersecting the bounds, as per gdf[gdf.intersects(bounds_geom)].
+    The bounds are prepared and candidates are found by bbox from the frame's spatial index.
+    Candidates with envelopes inside the bounds are kept without an exact test, which only runs near the boundary.
+    """
+    shapely.prepare(bounds_geom)
+    keep_mask = np.zeros(len(gdf), dtype=bool)
+    candidate_idxs = gdf.sindex.query(bounds_geom)
+    candidate_geoms = np.asarray(gdf.geometry.array)[candidate_idxs]
+    inside_mask = shapely.contains_properly(bounds_geom, shapely.envelope(candidate_geoms))
+    keep_mask[candidate_idxs[inside_mask]] = True
+    boundary_idxs = candidate_idxs[~inside_mask]
+    keep_mask[boundary_idxs] = shapely.intersects(bounds_geom, candidate_geoms[~inside_mask])
+    return gdf[keep_mask]  # type: ignore
+
+
+def _overlap_free_passes(geoms: np.ndarray) -> np.ndarray:
+    """Greedily assigns each geometry to the first pass not containing an intersecting geometry."""
+    tree = shapely.STRtree(geoms)
+    geom_idxs, other_idxs = tree.query(geoms, predicate="intersects")
+    # only geometries earlier in the order have been assigned
+    earlier_mask = other_idxs < geom_idxs
+    geom_idxs, other_idxs = geom_idxs[earlier_mask], other_idxs[earlier_mask]
+    order = np.argsort(geom_idxs, kind="stable")
+    splits = np.searchsorted(geom_idxs[order], np.arange(1, len(geoms)))
+    passes = np.zeros(len(geoms), dtype=np.int64)
+    for geom_idx, earlier_idxs in enumerate(np.split(other_idxs[order], splits)):
+        if len(earlier_idxs):
+            used: set[int] = set(passes[earlier_idxs].tolist())  # type: ignore
+            passes[geom_idx] = next(pass_idx for pass_idx in itertools.count() if pass_idx not in used)
+    return passes
+
+
+def raster_zonal_stats(geoms, rast_data, band: int = 1) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the mean and count of the valid pixels within each geometry, as per a rasterio.mask with crop=True.
+    All geometries are burned into label arrays over the raster and aggregated with bincount.
+    Intersecting geometries are burned in separate passes so that shared pixels count towards each.
+    Geometries without valid pixels, including those outside the raster, have a mean of NaN.
+    """
+    geoms = np.asarray(geoms, dtype=object)
+    values = rast_data.read(band)
+    valid_mask = np.ones(values.shape, dtype=bool) if rast_data.nodata is None else values != rast_data.nodata
+    valid_values = values[valid_mask].astype(np.float64)
+    sums = np.zeros(len(geoms))
+    counts = np.zeros(len(geoms), dtype=np.int64)
+    geom_idxs = np.flatnonzero(~shapely.is_missing(geoms) & ~shapely.is_empty(geoms))
+    if len(geom_idxs):
+        passes = _overlap_free_passes(geoms[geom_idxs])
+        for pass_idx in range(passes.max() + 1):
+            pass_geom_idxs = geom_idxs[passes == pass_idx]
+            # labels are offset by one so that zero marks pixels outside the geometries
+            labels = features.rasterize(
+                zip(geoms[pass_geom_idxs], pass_geom_idxs + 1, strict=True),
+                out_shape=values.shape,
+                transform=rast_data.transform,
+                fill=0,
+                dtype="int32",
+            )[valid_mask]
+            sums += np.bincount(labels, weights=valid_values, minlength=len(geoms) + 1)[1:]
+            counts += np.bincount(labels, minlength=len(geoms) + 1)[1:]
+    means = np.full(len(geoms), np.nan)
+    np.divide(sums, counts, out=means, where=counts > 0)
+    return means, counts
+
+
 def split_street_segment(
     line_string: geometry.LineString, connector_infos: list[Connector]
 ) -> list[tuple[geometry.LineString, Connector, Connector]]:
     """ """
     # overture segments can span multiple intersections
-    # sort through and split until pairings are ready for insertion to the graph
-    node_segment_pairs: list[tuple[geometry.LineString, Connector, Connector]] = []
-    node_segment_lots: list[tuple[geometry.LineString, list[Connector]]] = [(line_string, connector_infos)]
-    # start iterating
-    while node_segment_lots:
-        old_line_string, old_connectors = node_segment_lots.pop()
-        # filter down connectors
-        new_connectors: list[tuple[str, geometry.Point]] = []
-        # if the point doesn't touch the line, discard
-        for _fid, _point in old_connectors:
-            if _point.distance(old_line_string) > 0:
-                continue
-            new_connectors.append((_fid, _point))
-        # if only two connectors
-        if len(new_connectors) == 2:
-            node_segment_pairs.append((old_line_string, new_connectors[0], new_connectors[1]))
+    # locate connectors along the line once then cut between consecutive connectors in a single pass
+    if len(connector_infos) < 2:
+        return []
+    # common case of two connectors at the line's ends
+    if len(connector_infos) == 2:
+        connector_a, connector_b = connector_infos
+        # line coords followed by the two connector coords
+        end_coords: list[list[float]] = shapely.get_coordinates([line_string, connector_a[1], connector_b[1]])[
+            [0, -3, -2, -1]
+        ].tolist()  # type: ignore
+        if end_coords[:2] == end_coords[2:]:
+            return [(line_string, connector_a, connector_b)]
+        if end_coords[:2] == end_coords[:1:-1]:
+            return [(line_string, connector_b, connector_a)]
+    points = np.array([_point for _fid, _point in connector_infos], dtype=object)
+    # if the point doesn't touch the line, discard
+    on_line_idxs = np.flatnonzero(shapely.intersects(line_string, points))
+    if len(on_line_idxs) < 2:
+        return []
+    coords = np.asarray(shapely.get_coordinates(line_string))
+    connector_coords = np.asarray(shapely.get_coordinates(points[on_line_idxs]))
+    dists = np.asarray(shapely.line_locate_point(line_string, points[on_line_idxs]))
+    # cumulative distance of each vertex along the line
+    vertex_dists = np.concatenate([[0], np.cumsum(np.hypot(*np.diff(coords, axis=0).T))])
+    # connectors at the start of closed loops also close the loop at the end
+    if line_string.is_closed:
+        start_mask = np.all(connector_coords == coords[0], axis=1)
+        on_line_idxs = np.concatenate([on_line_idxs, on_line_idxs[start_mask]])
+        connector_coords = np.vstack([connector_coords, connector_coords[start_mask]])
+        dists = np.concatenate([dists, np.full(start_mask.sum(), vertex_dists[-1])])
+    # stable sort so that ties retain the order of the connectors
+    sort_order = np.argsort(dists, kind="stable")
+    dists = dists[sort_order]
+    sorted_idxs = on_line_idxs[sort_order]
+    connector_coords = connector_coords[sort_order]
+    # vertices strictly between consecutive connectors
+    inner_starts = np.searchsorted(vertex_dists, dists[:-1], "right")
+    inner_ends = np.searchsorted(vertex_dists, dists[1:], "left")
+    seg_connectors: list[tuple[Connector, Connector]] = []
+    seg_coords: list[np.ndarray] = []
+    for start_pos in range(len(sorted_idxs) - 1):
+        # skip coincident connectors
+        if dists[start_pos + 1] <= dists[start_pos]:
             continue
-        # look for splits
-        for _fid, _point in new_connectors:
-            splits = ops.split(old_line_string, _point)
-            # continue if an endpoint
-            if len(splits.geoms) == 1:
-                continue
-            # otherwise unpack
-            line_string_a, line_string_b = splits.geoms
-            # otherwise split into two bundles and reset
-            node_segment_lots.append((cast(geometry.LineString, line_string_a), new_connectors))
-            node_segment_lots.append((cast(geometry.LineString, line_string_b), new_connectors))
-            break
-    return node_segment_pairs
+        seg_connectors.append((connector_infos[sorted_idxs[start_pos]], connector_infos[sorted_idxs[start_pos + 1]]))
+        # use the connector coordinates for the ends so that the connectors touch the segment exactly
+        seg_coords.append(
+            np.vstack(
+                [
+                    connector_coords[start_pos],
+                    coords[inner_starts[start_pos] : inner_ends[start_pos]],
+                    connector_coords[start_pos + 1],
+                ]
+            )
+        )
+    if not seg_coords:
+        return []
+    all_coords = np.vstack(seg_coords)
+    seg_indices = np.repeat(np.arange(len(seg_coords)), [len(seg) for seg in seg_coords])
+    # drop repeated coordinates, e.g. where a connector sits on a vertex
+    keep = np.concatenate([[True], np.any(np.diff(all_coords, axis=0) != 0, axis=1) | (np.diff(seg_indices) != 0)])
+    seg_geoms: np.ndarray = np.asarray(shapely.linestrings(all_coords[keep], indices=seg_indices[keep]))
+    return [
+        (seg_geom, connector_a, connector_b)
+        for seg_geom, (connector_a, connector_b) in zip(seg_geoms, seg_connectors, strict=True)
+    ]
+
+
+def dedupe_connectors(nodes_gdf: gpd.GeoDataFrame) -> tuple[pd.Series, pd.DataFrame]:
+    """
+    Deduplicates connectors by exact coordinates, e.g. in case of overture dupes by xy or database dupes.
+    Returns a map from connector ids to merged keys - the first connector id at each xy -
+    and the merged nodes with x and y columns in order of first appearance.
+    """
+    node_ids = nodes_gdf.index.to_numpy()
+    xs = shapely.get_x(nodes_gdf.geometry.values)  # type: ignore
+    ys = shapely.get_y(nodes_gdf.geometry.values)  # type: ignore
+    # codes are assigned in order of first appearance
+    xy_codes, _xy_uniques = pd.factorize(pd.MultiIndex.from_arrays([xs, ys]))
+    _codes, first_pos = np.unique(xy_codes, return_index=True)
+    merged_keys = node_ids[first_pos][xy_codes]
+    connector_map = pd.Series(merged_keys, index=node_ids)
+    connector_map = connector_map[~connector_map.index.duplicated(keep="first")]
+    merged_nodes = pd.DataFrame({"x": xs[first_pos], "y": ys[first_pos]}, index=node_ids[first_pos])
+    return connector_map, merged_nodes
+
+
+def _group_to_lists(values: pd.Series, n_rows: int) -> list[list]:
+    """Collects exploded values, indexed by row position, into unique values per row."""
+    row_lists: list[list] = [[] for _ in range(n_rows)]
+    values = values.dropna()
+    for row_pos, row_vals in values.groupby(level=0, sort=False):
+        row_lists[row_pos] = list(set(row_vals))  # type: ignore
+    return row_lists
+
+
+def explode_struct_key(col: pd.Series, key: str) -> pd.Series:
+    """Explodes a column of lists of structs and extracts a key, keeping the row position as index."""
+    exploded = col.reset_index(drop=True).explode().dropna()
+    return exploded.map(lambda struct: struct.get(key) if isinstance(struct, dict) else None)  # type: ignore
+
+
+def edge_attributes(edges_gdf: gpd.GeoDataFrame) -> pd.DataFrame:
+    """Extracts levels, names, routes, highways and tunnel / bridge flags for all edges at once."""
+    n_rows = len(edges_gdf)
+    levels = _group_to_lists(explode_struct_key(edges_gdf["level_rules"], "value"), n_rows)  # type: ignore
+    routes = _group_to_lists(explode_struct_key(edges_gdf["routes"], "ref"), n_rows)  # type: ignore
+    # names and highways take list form for nx
+    names = [
+        [names_info["primary"]] if names_info is not None and "primary" in names_info else []
+        for names_info in edges_gdf["names"]  # type: ignore
+    ]
+    highways = [
+        [road_class] if road_class is not None and road_class not in ["unknown"] else []
+        for road_class in edges_gdf["class"]  # type: ignore
+    ]
+    flags = explode_struct_key(edges_gdf["road_flags"], "values").explode()  # type: ignore
+    is_tunnel = np.zeros(n_rows, dtype=bool)
+    is_tunnel[flags.index[(flags == "is_tunnel").to_numpy()].unique()] = True
+    is_bridge = np.zeros(n_rows, dtype=bool)
+    is_bridge[flags.index[(flags == "is_bridge").to_numpy()].unique()] = True
+    return pd.DataFrame(
+        {
+            "levels": levels,
+            "names": names,
+            "routes": routes,
+            "highways": highways,
+            "is_tunnel": is_tunnel,
+            "is_bridge": is_bridge,
+        },
+        index=edges_gdf.index,
+    )
+
+
+def edge_connectors(edges_gdf: gpd.GeoDataFrame, connector_map: pd.Series) -> pd.Series:
+    """
+    Maps each edge's connector ids to merged keys, deduplicated in order.
+    Edges referencing connectors missing from the nodes, e.g. at boundary thresholds, map to None.
+    """
+    connector_ids = explode_struct_key(edges_gdf["connectors"], "connector_id")  # type: ignore
+    merged_keys = connector_ids.map(connector_map)
+    # skip malformed edges - this happens at boundary thresholds with missing nodes in relation to edges
+    missing_pos = merged_keys.index[merged_keys.isna().to_numpy()].unique()
+    merged_keys = merged_keys.drop(index=missing_pos)
+    # deduplicate merged keys within each edge
+    merged_df = merged_keys.rename("key").rename_axis("row_pos").reset_index().drop_duplicates()
+    edge_keys: list[list | None] = [[] for _ in range(len(edges_gdf))]
+    for row_pos, row_keys in merged_df.groupby("row_pos", sort=False)["key"]:
+        edge_keys[row_pos] = row_keys.tolist()  # type: ignore
+    for row_pos in missing_pos:
+        edge_keys[row_pos] = None
+    return pd.Series(edge_keys, index=edges_gdf.index, dtype=object)
+
+
+# added edges per node pair: the edge geom and its prepared buffer, computed once needed
+EdgeIndex = dict[tuple[str, str], list[tuple[geometry.LineString, geometry.Polygon | None]]]
+
+
+def has_duplicate_edge(
+    edge_index: EdgeIndex,
+    node_key_a: str,
+    node_key_b: str,
+    seg_geom: geometry.LineString,
+    tolerance: float = 1,
+) -> bool:
+    """
+    Checks whether an edge already added between the nodes contains the segment within its buffer by the tolerance.
+    The buffers are only computed for edges with a parallel candidate and are prepared and reused for later checks.
+    """
+    edge_entries = edge_index.get((min(node_key_a, node_key_b), max(node_key_a, node_key_b)), [])
+    for entry_pos, (edge_geom, edge_buffer) in enumerate(edge_entries):
+        if edge_buffer is None:
+            edge_buffer = edge_geom.buffer(tolerance)
+            shapely.prepare(edge_buffer)
+            edge_entries[entry_pos] = (edge_geom, edge_buffer)
+        if edge_buffer.contains(seg_geom):
+            return True
+    return False
+
+
+def add_edge_to_index(edge_index: EdgeIndex, node_key_a: str, node_key_b: str, seg_geom: geometry.LineString) -> None:
+    """ """
+    edge_index.setdefault((min(node_key_a, node_key_b), max(node_key_a, node_key_b)), []).append((seg_geom, None))
 
 
 def generate_graph(
@@ -146,86 +1069,48 @@ def generate_graph(
     logger.info("Preparing GeoDataFrames")
     # create graph
     multigraph = nx.MultiGraph()
-    # filter by boundary and build nx
     logger.info("Adding nodes to graph")
-    # dedupe nodes
-    node_map = {}
-    for node_row in tqdm(nodes_gdf.itertuples(), total=len(nodes_gdf)):
-        # catch duplicates in case of overture dupes by xy or database dupes
-        x = node_row.geom.x  # type: ignore
-        y = node_row.geom.y  # type: ignore
-        xy_key = f"{x}-{y}"
-        if xy_key not in node_map:
-            node_map[xy_key] = node_row.Index
-        # merged key
-        merged_key = node_map[xy_key]
-        # only insert if new
-        if not multigraph.has_node(node_row.Index):
-            multigraph.add_node(
-                merged_key,
-                x=x,
-                y=y,
-            )
+    connector_map, merged_nodes = dedupe_connectors(nodes_gdf)
+    multigraph.add_nodes_from(
+        (merged_key, {"x": x, "y": y})
+        for merged_key, x, y in zip(merged_nodes.index, merged_nodes["x"], merged_nodes["y"], strict=True)
+    )
+    node_points: dict[str, geometry.Point] = dict(
+        zip(merged_nodes.index, np.asarray(shapely.points(merged_nodes["x"], merged_nodes["y"])), strict=True)
+    )
+    logger.info("Preparing edges")
+    road_classes: pd.Series = edges_gdf["class"]  # type: ignore
+    drop_mask = road_classes.isin(drop_road_types).to_numpy()
+    dropped_road_types: set[str] = set(road_classes[drop_mask])
+    kept_road_types: set[str] = set(road_classes[~drop_mask])
+    edges_gdf = edges_gdf[~drop_mask]  # type: ignore
+    # extract connectors, levels, names, routes, highways column-wise
+    # do this once instead of for each new split segment
+    edge_keys = edge_connectors(edges_gdf, connector_map)
+    edge_attrs = edge_attributes(edges_gdf)
     logger.info("Adding edges to graph")
-    dropped_road_types = set()
-    kept_road_types = set()
-    for edge_idx, edges_data in tqdm(edges_gdf.iterrows(), total=len(edges_gdf)):
-        road_class = edges_data["class"]
-        if road_class in drop_road_types:
-            dropped_road_types.add(road_class)
+    # index of added edge geoms by node pair for duplicate checks
+    edge_index: EdgeIndex = {}
+    for edge_idx, edge_geom, merged_keys, levels, names, routes, highways, is_tunnel, is_bridge in tqdm(
+        zip(
+            edges_gdf.index,
+            edges_gdf.geometry,
+            edge_keys,
+            edge_attrs["levels"],
+            edge_attrs["names"],
+            edge_attrs["routes"],
+            edge_attrs["highways"],
+            edge_attrs["is_tunnel"],
+            edge_attrs["is_bridge"],
+            strict=True,
+        ),
+        total=len(edges_gdf),
+    ):
+        if merged_keys is None or len(merged_keys) < 2:
             continue
-        kept_road_types.add(road_class)
-        uniq_fids = set()
-        connector_fids: list[str] = [connector["connector_id"] for connector in edges_data["connectors"]]
-        connector_infos: list[tuple[str, geometry.Point]] = []
-        missing_connectors = False
-        for connector_fid in connector_fids:
-            # skip malformed edges - this happens at boundary thresholds with missing nodes in relation to edges
-            if connector_fid not in multigraph:
-                missing_connectors = True
-                break
-            # deduplicate
-            x, y = multigraph.nodes[connector_fid]["x"], multigraph.nodes[connector_fid]["y"]
-            xy_key = f"{x}-{y}"
-            merged_key = node_map[xy_key]
-            if merged_key in uniq_fids:
-                continue
-            uniq_fids.add(merged_key)
-            # track
-            connector_point = geometry.Point(x, y)
-            connector_infos.append((merged_key, connector_point))
-        if missing_connectors is True:
-            continue
-        if len(connector_infos) < 2:
-            # logger.warning("Only one connector pair for edge")
-            continue
-        # extract levels, names, routes, highways
-        # do this once instead of for each new split segment
-        levels = set([])
-        if edges_data["level_rules"] is not None:
-            for level_info in edges_data["level_rules"]:
-                levels.add(level_info["value"])
-        names = []  # takes list form for nx
-        if edges_data["names"] is not None and "primary" in edges_data["names"]:
-            names.append(edges_data["names"]["primary"])
-        routes = set([])
-        if edges_data["routes"] is not None:
-            for routes_info in edges_data["routes"]:
-                if "ref" in routes_info:
-                    routes.add(routes_info["ref"])
-        is_tunnel = False
-        is_bridge = False
-        if edges_data["road_flags"] is not None:
-            for flags_info in edges_data["road_flags"]:
-                if "is_tunnel" in flags_info["values"]:
-                    is_tunnel = True
-                if "is_bridge" in flags_info["values"]:
-                    is_bridge = True
-        highways = []  # takes list form for nx
-        if road_class is not None and road_class not in ["unknown"]:
-            highways.append(road_class)
+        connector_infos: list[Connector] = [(merged_key, node_points[merged_key]) for merged_key in merged_keys]
         # split segments and build
-        street_segs = split_street_segment(edges_data.geom, connector_infos)
+        street_segs = split_street_segment(edge_geom, connector_infos)
         for seg_geom, node_info_a, node_info_b in street_segs:
             if not node_info_a[1].touches(seg_geom) or not node_info_b[1].touches(seg_geom):
                 raise ValueError(
@@ -233,25 +1118,19 @@ def generate_graph(
                     f"See connectors: {node_info_a[0]} and {node_info_b[0]}"
                 )
             # don't add duplicates
-            dupe = False
-            if multigraph.has_edge(node_info_a[0], node_info_b[0]):
-                edges = multigraph[node_info_a[0]][node_info_b[0]]
-                for _edge_idx, edge_val in dict(edges).items():
-                    if edge_val["geom"].buffer(1).contains(seg_geom):
-                        dupe = True
-                        break
-            if dupe is False:
+            if not has_duplicate_edge(edge_index, node_info_a[0], node_info_b[0], seg_geom):
+                add_edge_to_index(edge_index, node_info_a[0], node_info_b[0], seg_geom)
                 multigraph.add_edge(
                     node_info_a[0],
                     node_info_b[0],
                     edge_idx=edge_idx,
                     geom=seg_geom,
-                    levels=list(levels),
+                    levels=levels,
                     names=names,
-                    routes=list(routes),
+                    routes=routes,
                     highways=highways,
-                    is_bridge=is_bridge,
-                    is_tunnel=is_tunnel,
+                    is_bridge=bool(is_bridge),
+                    is_tunnel=bool(is_tunnel),
                 )
     logger.info(f"Dropped road types: {', '.join(dropped_road_types)}")
     logger.info(f"Kept road types: {', '.join(kept_road_types)}")
@@ -259,55 +1138,369 @@ def generate_graph(
     return multigraph
 
 
+def _ragged_arange(lengths: np.ndarray) -> np.ndarray:
+    """Concatenated aranges for each length, e.g. [2, 3] -> [0, 1, 0, 1, 2]."""
+    starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.arange(lengths.sum()) - starts
+
+
+def _line_bearings(coords: np.ndarray, line_idxs: np.ndarray, n_lines: int) -> dict[str, np.ndarray]:
+    """Lengths, in / out / total bearings and angle sums per line from flat coords and their line indices."""
+    deltas = np.diff(coords, axis=0)
+    # segments are consecutive coords belonging to the same line - skipping repeated coords
+    is_seg = (line_idxs[1:] == line_idxs[:-1]) & np.any(deltas != 0, axis=1)
+    seg_deltas = deltas[is_seg]
+    seg_line_idxs = line_idxs[1:][is_seg]
+    seg_bearings = np.rad2deg(np.arctan2(seg_deltas[:, 1], seg_deltas[:, 0]))
+    first_seg = np.searchsorted(seg_line_idxs, np.arange(n_lines))
+    last_seg = np.searchsorted(seg_line_idxs, np.arange(n_lines), "right") - 1
+    # absolute turning angles between consecutive segments of the same line
+    turns = np.abs((np.diff(seg_bearings) + 180) % 360 - 180)
+    is_turn = seg_line_idxs[1:] == seg_line_idxs[:-1]
+    first_coord = np.searchsorted(line_idxs, np.arange(n_lines))
+    last_coord = np.searchsorted(line_idxs, np.arange(n_lines), "right") - 1
+    total_deltas = coords[last_coord] - coords[first_coord]
+    return {
+        "length": np.bincount(seg_line_idxs, weights=np.hypot(seg_deltas[:, 0], seg_deltas[:, 1]), minlength=n_lines),
+        "angle_sum": np.bincount(seg_line_idxs[1:][is_turn], weights=turns[is_turn], minlength=n_lines),
+        "in_bearing": seg_bearings[first_seg],
+        "out_bearing": seg_bearings[last_seg],
+        "total_bearing": np.rad2deg(np.arctan2(total_deltas[:, 1], total_deltas[:, 0])),
+    }
+
+
+def _parallel_midline(shortest_geom: geometry.LineString, longer_geoms: np.ndarray) -> geometry.LineString:
+    """
+    Welds parallel edges into a midline as per graphs.nx_merge_parallel_edges with merge_edges_by_midline:
+    each coord of the shortest edge is averaged with the nearest points on the longer edges, except near their ends.
+    """
+    short_coords = np.asarray(shapely.get_coordinates(shortest_geom))
+    short_points = shapely.points(short_coords)
+    coord_sums = short_coords.copy()
+    coord_counts = np.ones(len(short_coords))
+    for longer_geom in longer_geoms:
+        # the second coord of each shortest line is the nearest point on the longer edge
+        nearest_coords = np.asarray(shapely.get_coordinates(shapely.shortest_line(short_points, longer_geom)))[1::2]
+        longer_ends = np.asarray(shapely.get_coordinates(longer_geom))[[0, -1]]
+        end_dists = np.hypot(*(nearest_coords[:, None] - longer_ends[None]).transpose(2, 0, 1))
+        is_mid = np.all(end_dists >= 1, axis=1)
+        coord_sums[is_mid] += nearest_coords[is_mid]
+        coord_counts[is_mid] += 1
+    return geometry.LineString(coord_sums / coord_counts[:, None])
+
+
+def dual_network_from_edges_gdf(
+    edges_gdf: gpd.GeoDataFrame, drop_self_loops_dist: float = 50
+) -> tuple[gpd.GeoDataFrame, gpd.GeoDataFrame]:
+    """
+    Builds the dual nodes and edges tables directly from primal edge geoms.
+    Equivalent to io.nx_from_generic_geopandas -> graphs.nx_to_dual -> io.network_structure_from_nx
+    but uses CSR style node to edge incidence arrays instead of networkX graphs.
+    Use io.network_structure_from_gpd for the NetworkStructure, as per the metrics.
+    Parallel edges contained within a 1m buffer of the shortest are merged into a midline with the shortest,
+    as per io.nx_from_generic_geopandas. Use dual_network_to_nx for a networkX graph for debugging.
+    """
+    crs = edges_gdf.crs
+    geoms = edges_gdf.geometry.values
+    imp_factors = np.asarray(edges_gdf["imp_factor"], dtype=float) if "imp_factor" in edges_gdf else np.ones(len(geoms))
+    keep = ~shapely.is_empty(geoms) & (shapely.length(geoms) > 0)  # type: ignore
+    geoms, imp_factors = geoms[keep], imp_factors[keep]
+    # round to 1cm - assumes 1m units
+    coords, line_idxs = shapely.get_coordinates(geoms, return_index=True)
+    geoms = np.asarray(shapely.linestrings(np.round(coords, 1), indices=line_idxs))
+    # node keys from end coords in order of first appearance
+    end_coords = np.stack([shapely.get_coordinates(shapely.get_point(geoms, pos)) for pos in (0, -1)], axis=1)
+    end_keys = [f"x{x}-y{y}" for x, y in end_coords.reshape(-1, 2).tolist()]
+    end_node_idxs, node_keys = pd.factorize(pd.Series(end_keys))
+    start_nodes, end_nodes = end_node_idxs[0::2], end_node_idxs[1::2]
+    lengths = np.asarray(shapely.length(geoms))
+    # drop short self-loops
+    keep = (start_nodes != end_nodes) | (lengths >= drop_self_loops_dist)
+    # merge parallel edges contained by the buffered shortest edge into the shortest edge's midline
+    pair_df = pd.DataFrame(
+        {"node_a": np.minimum(start_nodes, end_nodes), "node_b": np.maximum(start_nodes, end_nodes), "length": lengths}
+    )[keep]
+    for _pair, pair_group in pair_df[pair_df.duplicated(subset=["node_a", "node_b"], keep=False)].groupby(
+        ["node_a", "node_b"]
+    ):
+        shortest_pos = pair_group["length"].idxmin()
+        shortest_buffer = geoms[shortest_pos].buffer(1)  # type: ignore
+        contained_pos = [
+            other_pos
+            for other_pos in pair_group.index
+            if other_pos != shortest_pos and shortest_buffer.contains(geoms[other_pos])
+        ]
+        if not contained_pos:
+            continue
+        keep[contained_pos] = False
+        midline = _parallel_midline(geoms[shortest_pos], geoms[contained_pos])  # type: ignore
+        # networkX iterates the merged edge from the first added node
+        if start_nodes[shortest_pos] != pair_group["node_a"].iloc[0]:
+            midline = midline.reverse()
+            start_nodes[shortest_pos], end_nodes[shortest_pos] = end_nodes[shortest_pos], start_nodes[shortest_pos]
+        geoms[shortest_pos] = midline
+        lengths[shortest_pos] = midline.length
+    geoms, imp_factors, lengths = geoms[keep], imp_factors[keep], lengths[keep]
+    start_nodes, end_nodes = start_nodes[keep], end_nodes[keep]
+    n_edges = len(geoms)
+    node_a, node_b = np.minimum(start_nodes, end_nodes), np.maximum(start_nodes, end_nodes)
+    # multigraph edge keys - i.e. count of prior edges between the same nodes
+    # per networkX parallel edge merging, the shortest of parallel edges is keyed last
+    keys_df = pd.DataFrame({"node_a": node_a, "node_b": node_b, "length": lengths})
+    pair_groups = keys_df.groupby(["node_a", "node_b"])
+    is_parallel = pair_groups["length"].transform("size").to_numpy() > 1
+    shortest_pos = pair_groups["length"].idxmin().to_numpy()
+    keys_df["last"] = False
+    keys_df.loc[shortest_pos[is_parallel[shortest_pos]], "last"] = True
+    keys_df = keys_df.sort_values("last", kind="stable")
+    edge_keys = keys_df.groupby(["node_a", "node_b"]).cumcount().sort_index().to_numpy()
+    key_a, key_b = node_keys[node_a], node_keys[node_b]
+    dual_keys = np.array(
+        [f"{min(a, b)}_{max(a, b)}_k{k}" for a, b, k in zip(key_a, key_b, edge_keys, strict=True)], dtype=object
+    )
+    mid_points = shapely.line_interpolate_point(geoms, 0.5, normalized=True)
+    mid_coords = shapely.get_coordinates(mid_points)
+    # DUAL NODES
+    nodes_dual_gdf = gpd.GeoDataFrame(  # type: ignore
+        {
+            "ns_node_idx": np.arange(n_edges),
+            "x": mid_coords[:, 0],
+            "y": mid_coords[:, 1],
+            "live": True,
+            "weight": 1,
+            "primal_edge": geoms,
+            "primal_edge_node_a": key_a,
+            "primal_edge_node_b": key_b,
+            "primal_edge_idx": edge_keys,
+            "dual_node": shapely.to_wkt(mid_points, rounding_precision=-1),
+        },
+        index=pd.Index(dual_keys),
+        geometry="primal_edge",
+        crs=crs,
+    )
+    # HALF GEOMS - flat coords per half oriented from the midpoint towards the start (even) or end (odd) node
+    coords, line_idxs = shapely.get_coordinates(geoms, return_index=True)
+    vert_dists = np.concatenate([[0], np.cumsum(np.hypot(*np.diff(coords, axis=0).T))])
+    line_starts = np.searchsorted(line_idxs, np.arange(n_edges))
+    vert_dists = vert_dists - vert_dists[line_starts][line_idxs]
+    mid_dists = (lengths / 2)[line_idxs]
+    # start halves are reversed so that each half runs from the midpoint to its node
+    start_verts = np.flatnonzero(vert_dists < mid_dists)[::-1]
+    end_verts = np.flatnonzero(vert_dists > mid_dists)
+    half_idxs = np.concatenate([line_idxs[start_verts] * 2, line_idxs[end_verts] * 2 + 1, np.arange(n_edges * 2)])
+    half_coords = np.concatenate([coords[start_verts], coords[end_verts], np.repeat(mid_coords, 2, axis=0)])
+    # midpoints sort first within each half
+    half_order = np.lexsort(
+        (np.concatenate([np.ones(len(start_verts) + len(end_verts)), np.zeros(n_edges * 2)]), half_idxs)
+    )
+    half_idxs, half_coords = half_idxs[half_order], half_coords[half_order]
+    half_lens = np.bincount(half_idxs, minlength=n_edges * 2)
+    half_offsets = np.cumsum(half_lens) - half_lens
+    # CSR incidence of halves per primal node - loops only join via their start half
+    inc_nodes = np.concatenate([start_nodes, end_nodes])
+    inc_halves = np.concatenate([np.arange(n_edges) * 2, np.arange(n_edges) * 2 + 1])
+    inc_others = np.concatenate([end_nodes, start_nodes])
+    is_inc = np.concatenate([np.ones(n_edges, dtype=bool), start_nodes != end_nodes])
+    inc_nodes, inc_halves, inc_others = inc_nodes[is_inc], inc_halves[is_inc], inc_others[is_inc]
+    inc_order = np.argsort(inc_nodes, kind="stable")
+    inc_nodes, inc_halves, inc_others = inc_nodes[inc_order], inc_halves[inc_order], inc_others[inc_order]
+    node_degrees = np.bincount(inc_nodes, minlength=len(node_keys))
+    node_indptr = np.concatenate([[0], np.cumsum(node_degrees)])
+    # pair each half with the other halves at the same node
+    pairs_a, pairs_b = [], []
+    for degree in np.unique(node_degrees[node_degrees > 1]):
+        block_starts = node_indptr[:-1][node_degrees == degree]
+        tri_a, tri_b = np.triu_indices(degree, 1)
+        pairs_a.append((block_starts[:, None] + tri_a).ravel())
+        pairs_b.append((block_starts[:, None] + tri_b).ravel())
+    pairs_a = np.concatenate(pairs_a) if pairs_a else np.array([], dtype=int)
+    pairs_b = np.concatenate(pairs_b) if pairs_b else np.array([], dtype=int)
+    # parallel edges, including loops at the same node, are not adjacent in the dual
+    is_pair = inc_others[pairs_a] != inc_others[pairs_b]
+    pairs_a, pairs_b = pairs_a[is_pair], pairs_b[is_pair]
+    hub_halves, spoke_halves = inc_halves[pairs_a], inc_halves[pairs_b]
+    hub_edges, spoke_edges = hub_halves // 2, spoke_halves // 2
+    primal_nodes = inc_nodes[pairs_a]
+    # DUAL EDGE GEOMS - hub midpoint to the shared node then reversed spoke half to the spoke midpoint
+    hub_lens, spoke_lens = half_lens[hub_halves], half_lens[spoke_halves] - 1
+    dual_lens = hub_lens + spoke_lens
+    dual_idxs = np.repeat(np.arange(len(hub_halves)), dual_lens)
+    seq_pos = _ragged_arange(dual_lens)
+    is_hub = seq_pos < hub_lens[dual_idxs]
+    coord_pos = np.where(
+        is_hub,
+        half_offsets[hub_halves][dual_idxs] + seq_pos,
+        half_offsets[spoke_halves][dual_idxs] + dual_lens[dual_idxs] - seq_pos - 1,
+    )
+    dual_geoms = np.asarray(shapely.linestrings(half_coords[coord_pos], indices=dual_idxs))
+    # length weighted impedances of the two primal halves
+    hub_weight, spoke_weight = lengths[hub_edges], lengths[spoke_edges]
+    total_weight = hub_weight + spoke_weight
+    dual_imps = np.divide(
+        hub_weight * imp_factors[hub_edges] + spoke_weight * imp_factors[spoke_edges],
+        total_weight,
+        out=np.ones(len(total_weight)),
+        where=total_weight > 0,
+    )
+    # DUAL EDGES - in both directions, ordered by start node per networkX adjacency
+    start_idxs = np.concatenate([hub_edges, spoke_edges])
+    end_idxs = np.concatenate([spoke_edges, hub_edges])
+    edge_geoms = np.concatenate([dual_geoms, shapely.reverse(dual_geoms)])
+    edge_order = np.lexsort((end_idxs, start_idxs))
+    start_idxs, end_idxs, edge_geoms = start_idxs[edge_order], end_idxs[edge_order], edge_geoms[edge_order]
+    edge_imps = np.concatenate([dual_imps, dual_imps])[edge_order]
+    edge_primal_nodes = node_keys[np.concatenate([primal_nodes, primal_nodes])[edge_order]]
+    edge_coords, edge_line_idxs = shapely.get_coordinates(edge_geoms, return_index=True)
+    edge_measures = _line_bearings(edge_coords, edge_line_idxs, len(edge_geoms))
+    start_keys, end_keys = dual_keys[start_idxs], dual_keys[end_idxs]
+    edges_dual_gdf = gpd.GeoDataFrame(  # type: ignore
+        {
+            "ns_edge_idx": np.arange(len(edge_geoms)),
+            "start_ns_node_idx": start_idxs,
+            "end_ns_node_idx": end_idxs,
+            "edge_idx": 0,
+            "nx_start_node_key": start_keys,
+            "nx_end_node_key": end_keys,
+            "length": edge_measures["length"],
+            "angle_sum": edge_measures["angle_sum"],
+            "imp_factor": edge_imps,
+            "in_bearing": edge_measures["in_bearing"],
+            "out_bearing": edge_measures["out_bearing"],
+            "total_bearing": edge_measures["total_bearing"],
+            "geom": edge_geoms,
+            "primal_node_id": edge_primal_nodes,
+        },
+        index=pd.Index([f"{start_key}-{end_key}" for start_key, end_key in zip(start_keys, end_keys, strict=True)]),
+        geometry="geom",
+        crs=crs,
+    )
+    return nodes_dual_gdf, edges_dual_gdf
+
+
+def dual_network_to_nx(nodes_dual_gdf: gpd.GeoDataFrame, edges_dual_gdf: gpd.GeoDataFrame) -> nx.MultiGraph:
+    """Exports dual nodes and edges tables to a cityseer compatible networkX dual graph for debugging."""
+    nx_dual = nx.MultiGraph()
+    nx_dual.graph["is_dual"] = True
+    nx_dual.graph["crs"] = nodes_dual_gdf.crs
+    node_cols = [
+        "x",
+        "y",
+        "live",
+        "weight",
+        "primal_edge",
+        "primal_edge_node_a",
+        "primal_edge_node_b",
+        "primal_edge_idx",
+    ]
+    node_records: list[dict] = nodes_dual_gdf[node_cols].to_dict("records")  # type: ignore
+    nx_dual.add_nodes_from(
+        (dual_key, node_data) for dual_key, node_data in zip(nodes_dual_gdf.index, node_records, strict=True)
+    )
+    # edges tables hold both directions
+    fwd_mask = edges_dual_gdf["start_ns_node_idx"] < edges_dual_gdf["end_ns_node_idx"]  # type: ignore
+    fwd_edges: gpd.GeoDataFrame = edges_dual_gdf[fwd_mask]  # type: ignore
+    nx_dual.add_edges_from(
+        (start_key, end_key, {"primal_node_id": primal_node_id, "geom": geom, "imp_factor": imp_factor})
+        for start_key, end_key, primal_node_id, geom, imp_factor in zip(
+            fwd_edges["nx_start_node_key"],  # type: ignore
+            fwd_edges["nx_end_node_key"],  # type: ignore
+            fwd_edges["primal_node_id"],  # type: ignore
+            fwd_edges.geometry,
+            fwd_edges["imp_factor"],  # type: ignore
+            strict=True,
+        )
+    )
+    return nx_dual
+
+
+OVERTURE_SCHEMA_CSV_PATH = Path(__file__).parent / "raw_landuse_schema.csv"
+OVERTURE_SCHEMA_CACHE_PATH = Path(__file__).parent / "raw_landuse_schema.json"
+OVERTURE_MAJOR_CATEGORIES = [
+    # "eat_and_drink", - don't use because places overriden by more specific categories
+    "restaurant",
+    "bar",
+    "cafe",
+    "accommodation",
+    "automotive",
+    "arts_and_entertainment",
+    "attractions_and_activities",
+    "active_life",
+    "beauty_and_spa",
+    "education",
+    "financial_service",
+    "private_establishments_and_corporates",
+    "retail",
+    "health_and_medical",
+    "pets",
+    "business_to_business",
+    "public_service_and_government",
+    "religious_organization",
+    "real_estate",
+    "travel",
+    "mass_media",
+    "home_service",
+    "professional_services",
+    # "structure_and_geography",
+]
+
+
+def _parse_overture_schema(schema_csv: str) -> dict[str, list[str]]:
+    """Parses the landuse schema CSV in a single pass."""
+    schema: dict[str, list[str]] = {major_cat: [] for major_cat in OVERTURE_MAJOR_CATEGORIES}
+    n_skipped = 0
+    for line in schema_csv.splitlines():
+        # remove header line
+        if "Overture Taxonomy" in line:
+            continue
+        splits = line.split(";")
+        if "[" not in splits[1]:
+            n_skipped += 1
+            continue
+        cats = splits[1].strip("\n[]")
+        cats = cats.split(",")
+        for major_cat in schema:
+            if major_cat in cats:
+                schema[major_cat].append(splits[0])
+    logger.info(f"Parsed Overture schema, skipping {n_skipped} lines without a taxonomy")
+    return schema
+
+
+@functools.cache
 def generate_overture_schema() -> dict[str, list[str]]:
-    """ """
+    """
+    Maps the major landuse categories to their Overture categories from the landuse schema CSV.
+    The parsed schema is cached as JSON next to the CSV and is rebuilt if the CSV or major categories change.
+    Loaded once per process on first use - the returned dict is shared so shouldn't be modified.
+    """
+    schema_csv = OVERTURE_SCHEMA_CSV_PATH.read_text()
+    schema_hash = hashlib.sha256(json.dumps([schema_csv, OVERTURE_MAJOR_CATEGORIES]).encode()).hexdigest()
+    try:
+        cached = json.loads(OVERTURE_SCHEMA_CACHE_PATH.read_text())
+        if cached["hash"] == schema_hash:
+            return cached["schema"]
+    except (OSError, ValueError, KeyError):
+        pass
     logger.info("Preparing Overture schema")
-    overture_csv_file_path = "./src/raw_landuse_schema.csv"
-    schema = {
-        # "eat_and_drink": [], - don't use because places overriden by more specific categories
-        "restaurant": [],
-        "bar": [],
-        "cafe": [],
-        "accommodation": [],
-        "automotive": [],
-        "arts_and_entertainment": [],
-        "attractions_and_activities": [],
-        "active_life": [],
-        "beauty_and_spa": [],
-        "education": [],
-        "financial_service": [],
-        "private_establishments_and_corporates": [],
-        "retail": [],
-        "health_and_medical": [],
-        "pets": [],
-        "business_to_business": [],
-        "public_service_and_government": [],
-        "religious_organization": [],
-        "real_estate": [],
-        "travel": [],
-        "mass_media": [],
-        "home_service": [],
-        "professional_services": [],
-        # "structure_and_geography": [],
-    }
-    for category, _list_val in schema.items():
-        with open(overture_csv_file_path) as schema_csv:
-            logger.info(f"Gathering category: {category}")
-            for line in schema_csv:
-                # remove header line
-                if "Overture Taxonomy" in line:
-                    continue
-                splits = line.split(";")
-                if "[" not in splits[1]:
-                    logger.info(f"Skipping line {line}")
-                    continue
-                cats = splits[1].strip("\n[]")
-                cats = cats.split(",")
-                if category in cats:
-                    schema[category].append(splits[0])
+    schema = _parse_overture_schema(schema_csv)
+    # written to a temporary file first so that concurrent workers don't read a partial artefact
+    tmp_path = OVERTURE_SCHEMA_CACHE_PATH.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        tmp_path.write_text(json.dumps({"hash": schema_hash, "schema": schema}))
+        tmp_path.replace(OVERTURE_SCHEMA_CACHE_PATH)
+    except OSError as err:
+        logger.warning(f"Unable to cache the Overture schema: {err}")
     return schema
 
 
+def overture_category_lookup(overture_schema: dict[str, list[str]]) -> dict[str, str]:
+    """Maps each Overture category to the first major category listing it, in the schema's order."""
+    category_lookup = {}
+    for major_cat, major_cat_vals in overture_schema.items():
+        for lu_cat_desc in major_cat_vals:
+            category_lookup.setdefault(lu_cat_desc, major_cat)
+    return category_lookup
+
+
 def iter_boundaries(
     db_schema: str, db_table: str, fid_col: int | str, geom_col: str, wgs84: bool
 ) -> list[tuple[int | str, geometry.Polygon]]:
@@ -359,61 +1552,214 @@ def check_table_exists(db_schema: str, db_table: str) -> bool:
     return bool(exists)
 
 
+# a claimed bounds fid is reclaimable by other workers if its heartbeat stops for this long
+TRACKING_LEASE_SECONDS = 900
+TRACKING_HEARTBEAT_SECONDS = 60
+# tracking tables already initialised by this process
+_INITIALISED_TRACKING_TABLES: set[str] = set()
+
+
 def init_tracking_table(
     load_key: str, template_bounds_schema: str, template_bounds_table: str, fid_col: int | str, geom_col: str
 ) -> None:
     """ """
-    if not check_table_exists("loads", load_key):
-        db_execute(
-            f"""
-            CREATE SCHEMA IF NOT EXISTS loads;
-            CREATE TABLE IF NOT EXISTS loads.{load_key}
-            AS SELECT
-                {fid_col} as fid,
-                False as loaded,
-                {geom_col} as geom
-            FROM {template_bounds_schema}.{template_bounds_table};
-            """
+    if load_key in _INITIALISED_TRACKING_TABLES:
+        return
+    # the advisory lock serialises concurrent workers - released on commit
+    db_execute(
+        f"""
+        SELECT pg_advisory_xact_lock(hashtext('loads.{load_key}'));
+        CREATE SCHEMA IF NOT EXISTS loads;
+        CREATE TABLE IF NOT EXISTS loads.{load_key}
+        AS SELECT
+            {fid_col} as fid,
+            False as loaded,
+            {geom_col} as geom
+        FROM {template_bounds_schema}.{template_bounds_table};
+        -- work queue state: pending, running, done, failed
+        ALTER TABLE loads.{load_key}
+            ADD COLUMN IF NOT EXISTS state text NOT NULL DEFAULT 'pending',
+            ADD COLUMN IF NOT EXISTS worker text,
+            ADD COLUMN IF NOT EXISTS attempts integer NOT NULL DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS heartbeat_at timestamptz,
+            ADD COLUMN IF NOT EXISTS lease_expires_at timestamptz,
+            ADD COLUMN IF NOT EXISTS error text;
+        -- carry over tracking tables created prior to the state column
+        UPDATE loads.{load_key} SET state = 'done' WHERE loaded AND state = 'pending';
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_loads_{load_key}_fid ON loads.{load_key} (fid);
+        CREATE INDEX IF NOT EXISTS idx_loads_{load_key}_state ON loads.{load_key} (state);
+        """
+    )
+    logger.info(
+        f"Prepared loading extents tracking table loads.{load_key} "
+        f"using bounds {template_bounds_schema}.{template_bounds_table} as template"
+    )
+    _INITIALISED_TRACKING_TABLES.add(load_key)
+
+
+def tracking_worker_id() -> str:
+    """ """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def tracking_worker_orphaned(worker: str) -> bool:
+    """Whether the worker's process is on this host but has stopped, e.g. when killed for running out of memory."""
+    host, _sep, pid = worker.rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+def tracking_claim(load_key: str, worker: str, bounds_fid: int | str, reclaim_done: bool = False) -> int | str | None:
+    """
+    Atomically claims a bounds fid for processing, returning the fid or None if it could not be claimed.
+    The fid is skipped if locked by a concurrent claim, or if running unless its lease has expired.
+    Running fids are reclaimed straight away if their worker process on this host has died.
+    Failed fids are retried, whereas done fids are only reclaimed if reclaim_done is True.
+    """
+    holder = db_fetch(
+        f"""
+        SELECT worker
+        FROM loads.{load_key}
+        WHERE fid = %s AND state = 'running' AND lease_expires_at >= now();
+        """,
+        (bounds_fid,),  # type: ignore
+    )
+    orphaned_worker = None
+    if holder and holder[0][0] is not None and tracking_worker_orphaned(holder[0][0]):
+        orphaned_worker = holder[0][0]
+        logger.warning(
+            f"Reclaiming bounds fid {bounds_fid} for loads.{load_key} from stopped worker {orphaned_worker}."
         )
-        logger.info(
-            f"Created loading extents tracking table loads.{load_key} "
-            f"using bounds {template_bounds_schema}.{template_bounds_table} as template"
+    claimed = db_fetch(
+        f"""
+        UPDATE loads.{load_key} t
+        SET state = 'running',
+            loaded = false,
+            worker = %(worker)s,
+            attempts = t.attempts + 1,
+            heartbeat_at = now(),
+            lease_expires_at = now() + make_interval(secs => %(lease)s),
+            error = NULL
+        WHERE t.fid = (
+            SELECT fid
+            FROM loads.{load_key}
+            WHERE fid = %(fid)s
+                AND (
+                    state IN ('pending', 'failed')
+                    OR (state = 'done' AND %(reclaim_done)s)
+                    OR (state = 'running' AND (lease_expires_at < now() OR worker = %(orphaned_worker)s))
+                )
+            FOR UPDATE SKIP LOCKED
         )
+        RETURNING t.fid;
+        """,
+        {  # type: ignore
+            "fid": bounds_fid,
+            "reclaim_done": reclaim_done,
+            "worker": worker,
+            "orphaned_worker": orphaned_worker,
+            "lease": TRACKING_LEASE_SECONDS,
+        },
+    )
+    if not claimed:
+        logger.info(f"Could not claim bounds fid {bounds_fid} for loads.{load_key}.")
+        return None
+    logger.info(f"Claimed bounds fid {claimed[0][0]} for loads.{load_key} as worker {worker}.")
+    return claimed[0][0]
 
 
-def tracking_state_reset_loaded(load_key: str, bounds_fid: int | str) -> None:
+def tracking_heartbeat_extend(load_key: str, bounds_fid: int | str, worker: str) -> None:
     """ """
-    logger.info(f"Setting loaded state to False for bounds fid {bounds_fid}.")
     db_execute(
         f"""
         UPDATE loads.{load_key}
-        SET loaded = false
-        WHERE fid = {bounds_fid} 
-        """
+        SET heartbeat_at = now(), lease_expires_at = now() + make_interval(secs => %s)
+        WHERE fid = %s AND worker = %s AND state = 'running';
+        """,
+        (TRACKING_LEASE_SECONDS, bounds_fid, worker),  # type: ignore
     )
 
 
+@contextmanager
+def tracking_heartbeat(load_key: str, bounds_fid: int | str, worker: str) -> Iterator[None]:
+    """Keeps extending the lease on a claimed bounds fid from a background thread while the context is open."""
+    stop_event = threading.Event()
+
+    def beat() -> None:
+        while not stop_event.wait(TRACKING_HEARTBEAT_SECONDS):
+            try:
+                tracking_heartbeat_extend(load_key, bounds_fid, worker)
+            except Exception as err:
+                logger.warning(f"Heartbeat failed for bounds fid {bounds_fid}: {err}")
+
+    heartbeat_thread = threading.Thread(target=beat, daemon=True)
+    heartbeat_thread.start()
+    try:
+        yield
+    finally:
+        stop_event.set()
+        heartbeat_thread.join()
+
+
 def tracking_state_check_loaded(load_key: str, bounds_fid: int | str) -> bool:
-    loaded = db_fetch(
+    """ """
+    state = db_fetch(
         f"""
-        SELECT loaded
+        SELECT state
         FROM loads.{load_key}
-        WHERE fid = {bounds_fid};
-    """
+        WHERE fid = %s;
+        """,
+        (bounds_fid,),  # type: ignore
     )[0][0]
-    logger.info(f"Checking if bounds fid {bounds_fid} is loaded: {loaded}.")
-    return bool(loaded)
+    logger.info(f"Checking if bounds fid {bounds_fid} is loaded: {state == 'done'}.")
+    return state == "done"
 
 
-def tracking_state_set_loaded(load_key: str, bounds_fid: int | str):
+def tracking_state_set_done(load_key: str, bounds_fid: int | str, worker: str) -> None:
     """ """
-    logger.info(f"Setting loaded state to True for bounds fid {bounds_fid}.")
+    logger.info(f"Setting state to done for bounds fid {bounds_fid}.")
     db_execute(
         f"""
         UPDATE loads.{load_key}
-        SET loaded = true
-        WHERE fid = {bounds_fid}
-        """
+        SET state = 'done', loaded = true, heartbeat_at = now(), lease_expires_at = NULL
+        WHERE fid = %s AND worker = %s;
+        """,
+        (bounds_fid, worker),  # type: ignore
+    )
+
+
+def tracking_state_set_failed(load_key: str, bounds_fid: int | str, worker: str, error: str) -> None:
+    """ """
+    logger.warning(f"Setting state to failed for bounds fid {bounds_fid}.")
+    db_execute(
+        f"""
+        UPDATE loads.{load_key}
+        SET state = 'failed', loaded = false, heartbeat_at = now(), lease_expires_at = NULL, error = %s
+        WHERE fid = %s AND worker = %s;
+        """,
+        (error, bounds_fid, worker),  # type: ignore
+    )
+
+
+def tracking_state_set_dirty(load_key: str, bounds_fids: list[int]) -> None:
+    """Returns done or failed bounds fids to pending so that the next run reprocesses them."""
+    if not check_table_exists("loads", load_key):
+        return
+    logger.info(f"Marking {len(bounds_fids)} bounds fids as dirty for loads.{load_key}.")
+    db_execute(
+        f"""
+        UPDATE loads.{load_key}
+        SET state = 'pending', loaded = false, attempts = 0, error = NULL
+        WHERE fid = ANY(%s) AND state IN ('done', 'failed');
+        """,
+        (bounds_fids,),  # type: ignore
     )
 
 
@@ -443,8 +1789,21 @@ def drop_content(
         )
         # drop_content has an expectation that a bounds_fid column exists
         # how to make this more explicit in future regarding upstream workflows
+        if check_table_partitioned(target_db_schema, target_db_table):
+            # truncating the bounds partition avoids the dead tuples left by DELETE
+            # and only locks the partition, whereas dropping it locks the parent table against readers and attaches
+            partition_name = bounds_partition_name(target_db_table, bounds_fid)
+            if check_table_exists(target_db_schema, partition_name):
+                db_execute(
+                    f"""
+                    TRUNCATE {target_db_schema}.{partition_name};
+                    """
+                )
+            return
+        # the advisory lock serialises concurrent workers - released on commit
         db_execute(
             f"""
+            SELECT pg_advisory_xact_lock(hashtext('idx_{target_db_schema}_{target_db_table}_bounds_fid'));
             CREATE INDEX IF NOT EXISTS idx_{target_db_schema}_{target_db_table}_bounds_fid 
                 ON {target_db_schema}.{target_db_table} (bounds_fid);
             """
@@ -469,35 +1828,211 @@ def process_func_with_bound_tracking(
     bounds_geom_col: str,
     bounds_fid_col: str,
     drop=False,
-):
-    """ """
-    # random sleep to prevent races / locks when running in multiprocessing
-    time.sleep(random.uniform(0.5, 1.0))
-    # check if bounds table exists
-    if not check_table_exists(bounds_schema, bounds_table):
-        raise OSError(f"Cannot proceed because the {bounds_schema}.{bounds_table} table does not exist.")
-    # check that tracking table is initiated
-    init_tracking_table(load_key, bounds_schema, bounds_table, bounds_fid_col, bounds_geom_col)
-    # check if loaded
-    loaded = tracking_state_check_loaded(load_key, bound_fid)
-    if drop is True or not loaded:
-        # clear out even if drop is not True so that partially loaded content is cleared
-        for content_table in content_tables:
-            drop_content(content_schema, content_table, bounds_schema, bounds_table, bound_fid)
-        tracking_state_reset_loaded(load_key, bound_fid)
-        logger.info(f"Loading {bounds_schema}.{bounds_table} bounds fid {bound_fid}")
-        core_function(*func_args)
-        tracking_state_set_loaded(load_key, bound_fid)
+) -> bool:
+    """
+    Claims the bounds fid and runs the core function, recording the fid as done or failed.
+    Returns False if the fid is held by another worker and so was not processed, otherwise True.
+    """
+    # attribute recorded queries to the bounds fid
+    with query_stats_bounds(bound_fid):
+        # check if bounds table exists
+        if not check_table_exists(bounds_schema, bounds_table):
+            raise OSError(f"Cannot proceed because the {bounds_schema}.{bounds_table} table does not exist.")
+        # check that tracking table is initiated
+        init_tracking_table(load_key, bounds_schema, bounds_table, bounds_fid_col, bounds_geom_col)
+        # claim - skips if loaded (unless dropping) or if running in another worker
+        worker = tracking_worker_id()
+        if tracking_claim(load_key, worker, bounds_fid=bound_fid, reclaim_done=drop) is None:
+            if not drop and tracking_state_check_loaded(load_key, bound_fid):
+                return True
+            logger.warning(f"Skipping bounds fid {bound_fid} for loads.{load_key} as held by another worker.")
+            return False
+        try:
+            with tracking_heartbeat(load_key, bound_fid, worker):
+                # clear out even if drop is not True so that partially loaded content is cleared
+                for content_table in content_tables:
+                    drop_content(content_schema, content_table, bounds_schema, bounds_table, bound_fid)
+                logger.info(f"Loading {bounds_schema}.{bounds_table} bounds fid {bound_fid}")
+                core_function(*func_args)
+        except Exception as err:
+            tracking_state_set_failed(load_key, bound_fid, worker, repr(err))
+            raise
+        tracking_state_set_done(load_key, bound_fid, worker)
+    return True
 
 
-def load_bounds_fid_network_from_db(
-    engine: sqlalchemy.Engine, bounds_fid: int, buffer_col: str
-) -> tuple[gpd.GeoDataFrame, gpd.GeoDataFrame, Any]:
+def process_extent_with_bound_tracking(
+    bound_fid: int | str,
+    bound_geom: geometry.Polygon,
+    process_extent: Callable,
+    load_key: str,
+    target_schema: str,
+    bounds_schema: str,
+    bounds_table: str,
+    bounds_geom_col: str,
+    bounds_fid_col: str,
+    drop: bool = False,
+    partition: bool = False,
+    **extent_kwargs,
+) -> bool:
+    """
+    Runs an Overture process_extent function for the bounds with tracking, writing to the table named per the load key.
+    The extent keyword args, e.g. prefetched rows, are passed through to process_extent.
+    Returns False if the bounds fid is held by another worker, as per process_func_with_bound_tracking.
+    """
+    return process_func_with_bound_tracking(
+        bound_fid=bound_fid,
+        load_key=load_key,
+        core_function=functools.partial(
+            process_extent, bound_fid, bound_geom, bounds_table, target_schema, load_key, partition, **extent_kwargs
+        ),
+        func_args=[],
+        content_schema=target_schema,
+        content_tables=[load_key],
+        bounds_schema=bounds_schema,
+        bounds_table=bounds_table,
+        bounds_geom_col=bounds_geom_col,
+        bounds_fid_col=bounds_fid_col,
+        drop=drop,
+    )
+
+
+_BOUNDS_STARTED: dict[str, Any] = {}
+
+
+def _init_bounds_worker(started_queue) -> None:
+    """Pool worker initializer for reporting which bounds fids have started."""
+    _BOUNDS_STARTED["queue"] = started_queue
+
+
+def _run_bounds_in_worker(bound_fid: int | str, func: Callable, args: list) -> Any:
     """ """
-    logger.info("Loading nodes")
+    _BOUNDS_STARTED["queue"].put(bound_fid)
+    return func(*args)
+
+
+def _run_bounds_isolated(bound_fid: int | str, func: Callable, args: list) -> None:
+    """Runs func in a single worker pool of its own, so that a crash only fails this bounds."""
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+        result = executor.submit(func, *args).result()
+    # the rerun has to process the bounds - a refused claim would otherwise pass as a success
+    if result is False:
+        raise RuntimeError(f"Could not reclaim bounds fid {bound_fid} after its worker crashed.")
+
+
+def process_bounds_in_pool(
+    func: Callable,
+    bounds_args: Iterable[tuple[int | str, list]],
+    parallel_workers: int = 1,
+    max_in_flight: int | None = None,
+) -> list[int | str]:
+    """
+    Runs func with the args for each bounds fid across a process pool, returning the fids that failed.
+    No more than max_in_flight bounds (defaults to twice the workers) are submitted ahead of the workers.
+    A failing bounds is logged and the remaining bounds continue - tracked bounds are left in the failed state.
+    A func returning False, i.e. a tracked bounds held by another worker, is logged as skipped.
+    If a worker crashes, e.g. when out of memory, the pool is rebuilt and the bounds that had not started are
+    resubmitted. The bounds that had started are rerun one at a time in isolation to find the crashed bounds,
+    reclaiming their tracking from the crashed workers. A rerun that cannot reclaim its bounds is failed.
+    Runs in process if there is a single worker.
+    """
+    failed_fids = []
+
+    def collect(bound_fid: int | str, result_func: Callable) -> None:
+        try:
+            if result_func() is False:
+                logger.warning(f"Skipped bounds fid {bound_fid} as held by another worker.")
+        except Exception:
+            logger.error(f"Failed to process bounds fid {bound_fid}:\n{traceback.format_exc()}")
+            failed_fids.append(bound_fid)
+
+    if parallel_workers == 1:
+        for bound_fid, args in bounds_args:
+            collect(bound_fid, functools.partial(func, *args))
+    else:
+        if max_in_flight is None:
+            max_in_flight = 2 * parallel_workers
+        mp_context = multiprocessing.get_context()
+        # written to directly by the workers, so that starts are reported even if a worker then crashes
+        started_queue = mp_context.SimpleQueue()
+        started_fids: set[int | str] = set()
+        in_flight: dict[concurrent.futures.Future, tuple[int | str, list]] = {}
+
+        def new_executor() -> concurrent.futures.ProcessPoolExecutor:
+            return concurrent.futures.ProcessPoolExecutor(
+                max_workers=parallel_workers,
+                mp_context=mp_context,
+                initializer=_init_bounds_worker,
+                initargs=(started_queue,),
+            )
+
+        executor = new_executor()
+
+        def submit(bound_fid: int | str, args: list) -> None:
+            try:
+                in_flight[executor.submit(_run_bounds_in_worker, bound_fid, func, args)] = (bound_fid, args)
+            except concurrent.futures.process.BrokenProcessPool:
+                recover([(bound_fid, args)])
+
+        def collect_done(done_futures: Iterable[concurrent.futures.Future]) -> list[tuple[int | str, list]]:
+            # drain the reported starts so that the workers never block on a full pipe
+            while not started_queue.empty():
+                started_fids.add(started_queue.get())
+            broken = []
+            for future in done_futures:
+                bound_fid, args = in_flight.pop(future)
+                if isinstance(future.exception(), concurrent.futures.process.BrokenProcessPool):
+                    broken.append((bound_fid, args))
+                else:
+                    started_fids.discard(bound_fid)
+                    collect(bound_fid, future.result)
+            return broken
+
+        def recover(broken: list[tuple[int | str, list]]) -> None:
+            nonlocal executor
+            # the remaining futures fail along with the pool
+            broken += collect_done(concurrent.futures.wait(in_flight).done)
+            executor.shutdown(wait=True)
+            executor = new_executor()
+            rerun = [(bound_fid, args) for bound_fid, args in broken if bound_fid in started_fids]
+            logger.warning(
+                f"Process pool broke - rerunning {len(rerun)} started bounds fids in isolation "
+                f"and resubmitting {len(broken) - len(rerun)} bounds fids"
+            )
+            for bound_fid, args in broken:
+                if bound_fid not in started_fids:
+                    submit(bound_fid, args)
+            for bound_fid, args in rerun:
+                started_fids.discard(bound_fid)
+                collect(bound_fid, functools.partial(_run_bounds_isolated, bound_fid, func, args))
+
+        def wait_and_collect() -> None:
+            done_futures, _pending = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+            broken = collect_done(done_futures)
+            if broken:
+                recover(broken)
+
+        try:
+            for bound_fid, args in bounds_args:
+                # backpressure - wait for a worker to finish before submitting more
+                while len(in_flight) >= max_in_flight:
+                    wait_and_collect()
+                submit(bound_fid, args)
+            while in_flight:
+                wait_and_collect()
+        except KeyboardInterrupt:
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+        executor.shutdown(wait=True)
+    if failed_fids:
+        logger.warning(f"Failed to process {len(failed_fids)} bounds fids: {sorted(failed_fids)}")
+    return failed_fids
+
+
+def bounds_fid_network_queries(bounds_fid: int, buffer_col: str) -> tuple[str, str]:
+    """Queries for the dual nodes and edges of a bounds fid, buffered per the buffer column."""
     # load nodes - i.e. where primal node (centroid of dual segment) is contained
-    nodes_gdf: gpd.GeoDataFrame = gpd.read_postgis(  # type: ignore
-        f"""
+    nodes_query = f"""
         SELECT
             c.fid,
             c.x,
@@ -509,15 +2044,9 @@ def load_bounds_fid_network_from_db(
             WHERE b.fid = {bounds_fid}
                 AND ST_Intersects(b.{buffer_col}, c.primal_edge)
                 AND ST_Contains(b.{buffer_col}, ST_Centroid(c.primal_edge))
-        """,
-        engine,
-        index_col="fid",
-        geom_col="geom",
-    )
-    logger.info("Loading edges")
+        """
     # load edges where contained - i.e. to connect loaded nodes
-    edges_gdf: gpd.GeoDataFrame = gpd.read_postgis(  # type: ignore
-        f"""
+    edges_query = f"""
         SELECT
             c.fid,
             c.start_ns_node_idx,
@@ -534,17 +2063,46 @@ def load_bounds_fid_network_from_db(
         FROM overture.dual_edges c, eu.bounds b
             WHERE b.fid = {bounds_fid}
                 AND ST_Contains(b.{buffer_col}, c.geom)
-        """,
-        engine,
-        index_col="fid",
-        geom_col="geom",
-    )
+        """
+    return nodes_query, edges_query
+
+
+def load_bounds_fid_network_from_db(
+    engine: sqlalchemy.Engine, bounds_fid: int, buffer_col: str
+) -> tuple[gpd.GeoDataFrame, gpd.GeoDataFrame, Any]:
+    """ """
+    nodes_query, edges_query = bounds_fid_network_queries(bounds_fid, buffer_col)
+    logger.info("Loading nodes")
+    with record_query_stats("load_bounds_fid_network_from_db:nodes") as record:
+        nodes_gdf: gpd.GeoDataFrame = gpd.read_postgis(  # type: ignore
+            nodes_query,
+            engine,
+            index_col="fid",
+            geom_col="geom",
+        )
+        record["rows"] = len(nodes_gdf)
+    logger.info("Loading edges")
+    with record_query_stats("load_bounds_fid_network_from_db:edges") as record:
+        edges_gdf: gpd.GeoDataFrame = gpd.read_postgis(  # type: ignore
+            edges_query,
+            engine,
+            index_col="fid",
+            geom_col="geom",
+        )
+        record["rows"] = len(edges_gdf)
+    network_structure = network_structure_from_bounds_gdfs(bounds_fid, nodes_gdf, edges_gdf)
+
+    return nodes_gdf, edges_gdf, network_structure
+
+
+def network_structure_from_bounds_gdfs(
+    bounds_fid: int, nodes_gdf: gpd.GeoDataFrame, edges_gdf: gpd.GeoDataFrame
+) -> Any:
+    """ """
     if len(nodes_gdf) == 0:
         raise OSError(f"No network data for bounds FID: {bounds_fid}")
     logger.info("Building network structure")
-    network_structure = io.network_structure_from_gpd(nodes_gdf, edges_gdf)
-
-    return nodes_gdf, edges_gdf, network_structure
+    return io.network_structure_from_gpd(nodes_gdf, edges_gdf)
 
 
 def bounds_fid_type(value):
@@ -556,9 +2114,25 @@ def bounds_fid_type(value):
         raise argparse.ArgumentTypeError(f"{value} is not a valid bounds_fid. It must be an integer or 'all'.") from e
 
 
+_TRANSFORMERS = threading.local()
+
+
+def get_transformer(from_crs: Any, to_crs: Any) -> Transformer:
+    """Returns a memoised always_xy transformer. Transformers are not thread safe, so are memoised per thread."""
+    transformers = _TRANSFORMERS.__dict__.setdefault("transformers", {})
+    if (from_crs, to_crs) not in transformers:
+        transformers[(from_crs, to_crs)] = Transformer.from_crs(from_crs, to_crs, always_xy=True)
+    return transformers[(from_crs, to_crs)]
+
+
 def reproject_geometry(geom, from_crs, to_crs):
-    """ """
-    transformer = Transformer.from_crs(from_crs, to_crs, always_xy=True)
-    reprojected_geom = transform(transformer.transform, geom)
+    """
+    Reprojects a geometry, or an array of geometries, with all coordinates transformed in a single vectorised call.
+    Returns 2D geometries.
+    """
+    transformer = get_transformer(from_crs, to_crs)
+
+    def transform_coords(coords: np.ndarray) -> np.ndarray:
+        return np.column_stack(transformer.transform(coords[:, 0], coords[:, 1]))
 
-    return reprojected_geom
+    return shapely.transform(geom, transform_coords)
@@ -1,20 +1,18 @@
 """ """
 
+import concurrent.futures
+import contextvars
 import logging
 from pathlib import Path
 
 import geopandas as gpd
-from cityseer.tools import graphs, io
 from shapely import geometry
 
-from src import tools
 from src.data import loaders
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-OVERTURE_SCHEMA = tools.generate_overture_schema()
-
 
 def download_location(
     bounds_geom_wgs: geometry.Polygon,
@@ -27,28 +25,30 @@ def download_location(
     logger.info(f"Downloading overture data to {out_path}")
     out_path.mkdir(exist_ok=True, parents=True)
 
-    # NETWORK
-    _nodes_gdf, _edges_gdf, clean_edges_gdf = loaders.load_network(bounds_geom_wgs, crs)
+    # the network is loaded while the other themes download
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        # NETWORK
+        # hydrated from the on-disk network cache if NETWORK_CACHE_DIR is set
+        network_future = executor.submit(
+            contextvars.copy_context().run, loaders.load_network_cached, bounds_geom_wgs, crs
+        )
+        theme_gdfs = loaders.fetch_overture_types(bounds_geom_wgs, crs, ["building", "infrastructure", "place"])
+        _nodes_gdf, _edges_gdf, clean_edges_gdf, nodes_dual_gdf, edges_dual_gdf = network_future.result()
     clean_edges_gdf.to_file(out_path / f"{location_key}_network_edges_primal.gpkg")
     # DUAL CLEAN NETWORK
-    nx_clean = io.nx_from_generic_geopandas(clean_edges_gdf)
-    # cast to dual
-    nx_dual = graphs.nx_to_dual(nx_clean)
-    # back to GDF
-    nodes_dual_gdf, edges_dual_gdf, _network_structure = io.network_structure_from_nx(nx_dual, crs=3035)
     nodes_dual_gdf.to_file(out_path / f"{location_key}_network_nodes_dual.gpkg")
     edges_dual_gdf.to_file(out_path / f"{location_key}_network_edges_dual.gpkg")
 
     # BUILDINGS
-    buildings_gdf = loaders.load_buildings(bounds_geom_wgs, crs)
+    buildings_gdf = loaders.load_buildings(bounds_geom_wgs, crs, theme_gdfs["building"])
     buildings_gdf.to_file(out_path / f"{location_key}_buildings.gpkg")
 
     # INFRASTRUCTURE
-    infrast_gdf = loaders.load_infrastructure(bounds_geom_wgs, crs)
+    infrast_gdf = loaders.load_infrastructure(bounds_geom_wgs, crs, theme_gdfs["infrastructure"])
     infrast_gdf.to_file(out_path / f"{location_key}_infrastructure.gpkg")
 
     # PLACES
-    places_gdf = loaders.load_places(bounds_geom_wgs, crs)
+    places_gdf = loaders.load_places(bounds_geom_wgs, crs, theme_gdfs["place"])
     places_gdf.to_file(out_path / f"{location_key}_places.gpkg")
 
 
@@ -6,8 +6,6 @@ import geopandas as gpd
 
 from src import tools
 
-OVERTURE_SCHEMA = tools.generate_overture_schema()
-
 engine = tools.get_sqlalchemy_engine()
 logger = tools.get_logger(__name__)
 
@@ -98,7 +96,7 @@ def prepare_metrics_parquet(bounds_fids: list[int], out_path: str):
         "cc_hill_q0_1500_nw",
         "cc_hill_q0_1500_wt",
     ]
-    for c in list(OVERTURE_SCHEMA.keys()) + ["street_furn", "parking", "transport"]:
+    for c in list(tools.generate_overture_schema().keys()) + ["street_furn", "parking", "transport"]:
         if c in ["structure_and_geography", "mass_media"]:
             continue
         cols.extend(
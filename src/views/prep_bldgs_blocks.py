@@ -2,11 +2,8 @@ import logging
 
 import geopandas as gpd
 import momepy
-import numpy as np
 from rasterio.io import MemoryFile
-from rasterio.mask import mask
 from shapely import geometry
-from tqdm import tqdm
 
 from src import tools
 
@@ -53,18 +50,9 @@ def buildings(
     bldgs_gdf.index = bldgs_gdf.index.astype(str)
     # sample heights
     logger.info("Sampling building heights")
-    heights = []
     with MemoryFile(raster_bytes) as memfile, memfile.open() as rast_data:
-        for _idx, bldg_row in tqdm(bldgs_gdf.iterrows(), total=len(bldgs_gdf)):
-            try:
-                # raster values within building polygon
-                out_image, _ = mask(rast_data, [bldg_row.geom.buffer(5)], crop=True)
-                # mean height, excluding nodata values
-                valid_pixels = out_image[0][out_image[0] != rast_data.nodata]
-                mean_height = np.mean(valid_pixels) if len(valid_pixels) > 0 else np.nan
-                heights.append(mean_height)
-            except ValueError:
-                heights.append(np.nan)
+        # mean height within the buffered footprints, excluding nodata values
+        heights, _pixel_counts = tools.raster_zonal_stats(bldgs_gdf.geometry.buffer(5), rast_data)
     bldgs_gdf["mean_height"] = heights
     # bldg metrics
     area = bldgs_gdf.area
@@ -0,0 +1,160 @@
+"""
+Benchmarks the network construction path on synthetic grid, organic, and arterial networks at several sizes:
+street segment splitting, graph generation, dual conversion, and network structure construction.
+Timings, throughput, and peak traced memory can be saved as a JSON baseline and compared on later runs.
+Run from the project folder (the folder containing src):
+python -m tests.benchmarks.bench_network --out temp/bench_network.json
+python -m tests.benchmarks.bench_network --baseline temp/bench_network.json
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import sys
+import timeit
+import tracemalloc
+from collections.abc import Callable
+from functools import partial
+from importlib import metadata
+from typing import Any
+
+from cityseer.tools import io
+
+from src import tools
+from tests.benchmarks import synthetic
+
+os.environ["CITYSEER_QUIET_MODE"] = "true"
+logging.disable(logging.INFO)
+
+
+def split_segments(connector_infos: list) -> None:
+    """ """
+    for edge_geom, seg_connectors in connector_infos:
+        tools.split_street_segment(edge_geom, seg_connectors)
+
+
+def measure(func: Callable, repeats: int) -> tuple[float, float]:
+    """Returns the best wall time over the repeats and the peak traced memory in MB from a separate run."""
+    seconds = min(timeit.repeat(func, number=1, repeat=repeats))
+    tracemalloc.start()
+    func()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak / 1e6
+
+
+def bench_network(kind: str, size: int, repeats: int) -> list[dict[str, Any]]:
+    """ """
+    nodes_gdf, edges_gdf = synthetic.NETWORK_KINDS[kind](size)
+    node_points = dict(zip(nodes_gdf.index, nodes_gdf.geometry, strict=True))
+    connector_infos = [
+        (edge_geom, [(conn["connector_id"], node_points[conn["connector_id"]]) for conn in connectors])
+        for edge_geom, connectors in zip(edges_gdf.geometry, edges_gdf["connectors"], strict=True)
+    ]
+    multigraph = tools.generate_graph(nodes_gdf, edges_gdf)
+    multigraph.graph["crs"] = 3035
+    clean_edges_gdf = io.geopandas_from_nx(multigraph, crs=3035)
+    nodes_dual_gdf, edges_dual_gdf = tools.dual_network_from_edges_gdf(clean_edges_gdf)
+    # stage: function, item count for throughput, item name
+    stages = {
+        "split_street_segment": (partial(split_segments, connector_infos), len(edges_gdf), "segments"),
+        "generate_graph": (partial(tools.generate_graph, nodes_gdf, edges_gdf), len(edges_gdf), "segments"),
+        "dual_network": (
+            partial(tools.dual_network_from_edges_gdf, clean_edges_gdf),
+            len(clean_edges_gdf),
+            "edges",
+        ),
+        "network_structure_from_gpd": (
+            partial(io.network_structure_from_gpd, nodes_dual_gdf, edges_dual_gdf),
+            len(edges_dual_gdf),
+            "dual edges",
+        ),
+    }
+    results = []
+    for stage, (func, n_items, items) in stages.items():
+        seconds, peak_mb = measure(func, repeats)
+        results.append(
+            {
+                "kind": kind,
+                "size": size,
+                "stage": stage,
+                "seconds": seconds,
+                "items": items,
+                "n_items": n_items,
+                "throughput": n_items / seconds,
+                "peak_traced_mb": peak_mb,
+            }
+        )
+        print(
+            f"{kind:>9} {size:>7} {stage:>27} {seconds * 1000:>10.1f}ms "
+            f"{n_items / seconds:>10.0f} {items}/s {peak_mb:>8.1f}MB"
+        )
+    return results
+
+
+def compare_baseline(results: list[dict[str, Any]], baseline_path: str, tolerance: float) -> bool:
+    """Prints the time ratios against the baseline, returning False if any stage regressed beyond the tolerance."""
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+    baseline_secs = {(rec["kind"], rec["size"], rec["stage"]): rec["seconds"] for rec in baseline["results"]}
+    passed = True
+    print(f"Compared to baseline {baseline_path} from {baseline['meta']['created']}")
+    for rec in results:
+        key = (rec["kind"], rec["size"], rec["stage"])
+        if key not in baseline_secs:
+            continue
+        ratio = rec["seconds"] / baseline_secs[key]
+        status = "REGRESSED" if ratio > tolerance else "ok"
+        passed = passed and ratio <= tolerance
+        print(f"{rec['kind']:>9} {rec['size']:>7} {rec['stage']:>27} {ratio:>6.2f}x {status}")
+    return passed
+
+
+def run_benchmark(
+    kinds: list[str],
+    sizes: list[int],
+    repeats: int,
+    out_path: str | None = None,
+    baseline_path: str | None = None,
+    tolerance: float = 1.25,
+) -> bool:
+    """ """
+    results = []
+    for kind in kinds:
+        for size in sizes:
+            results.extend(bench_network(kind, size, repeats))
+    if out_path is not None:
+        meta = {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "versions": {pkg: metadata.version(pkg) for pkg in ["shapely", "geopandas", "networkx", "cityseer"]},
+            "repeats": repeats,
+        }
+        with open(out_path, "w") as out_file:
+            json.dump({"meta": meta, "results": results}, out_file, indent=2)
+        print(f"Saved baseline to {out_path}")
+    if baseline_path is not None:
+        return compare_baseline(results, baseline_path, tolerance)
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark network construction on synthetic networks.")
+    parser.add_argument("--kinds", type=str, nargs="+", default=list(synthetic.NETWORK_KINDS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--out", type=str, default=None, help="Path to save the results as a JSON baseline.")
+    parser.add_argument("--baseline", type=str, default=None, help="Path to a JSON baseline to compare against.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.25,
+        help="Time ratio against the baseline beyond which a stage counts as regressed. Defaults to 1.25.",
+    )
+    args = parser.parse_args()
+    if not run_benchmark(args.kinds, args.sizes, args.repeats, args.out, args.baseline, args.tolerance):
+        sys.exit(1)
@@ -0,0 +1,78 @@
+"""
+Benchmarks split_street_segment on long multi-connector segments against the former iterative ops.split approach.
+Run from the project folder (the folder containing src):
+python -m tests.benchmarks.bench_split_street_segment
+"""
+
+import argparse
+import timeit
+from functools import partial
+
+import numpy as np
+from shapely import geometry, ops
+
+from src import tools
+
+
+def split_street_segment_iterative(
+    line_string: geometry.LineString, connector_infos: list[tools.Connector]
+) -> list[tuple[geometry.LineString, tools.Connector, tools.Connector]]:
+    """Former splitter - repeatedly splits and re-filters connectors against each sub-line."""
+    node_segment_pairs = []
+    node_segment_lots = [(line_string, connector_infos)]
+    while node_segment_lots:
+        old_line_string, old_connectors = node_segment_lots.pop()
+        new_connectors = [(_fid, _point) for _fid, _point in old_connectors if _point.distance(old_line_string) == 0]
+        if len(new_connectors) == 2:
+            node_segment_pairs.append((old_line_string, new_connectors[0], new_connectors[1]))
+            continue
+        for _fid, _point in new_connectors:
+            splits = ops.split(old_line_string, _point)
+            if len(splits.geoms) == 1:
+                continue
+            line_string_a, line_string_b = splits.geoms
+            node_segment_lots.append((line_string_a, new_connectors))
+            node_segment_lots.append((line_string_b, new_connectors))
+            break
+    return node_segment_pairs
+
+
+def long_segment(n_connectors: int, verts_per_span: int = 5, seed: int = 0):
+    """Generates a wiggly line with connectors at every n-th vertex, shuffled as per unordered input."""
+    rng = np.random.default_rng(seed)
+    n_verts = (n_connectors - 1) * verts_per_span + 1
+    xs = np.arange(n_verts, dtype=float) * 10
+    ys = rng.uniform(-2, 2, n_verts)
+    line_string = geometry.LineString(np.column_stack([xs, ys]))
+    connector_infos = [(f"c{idx}", geometry.Point(xs[idx], ys[idx])) for idx in range(0, n_verts, verts_per_span)]
+    rng.shuffle(connector_infos)  # type: ignore
+    return line_string, connector_infos
+
+
+def run_benchmark(connector_counts: list[int], repeats: int):
+    """ """
+    print(f"{'connectors':>10} {'iterative (ms)':>15} {'linear ref (ms)':>16} {'speedup':>8}")
+    for n_connectors in connector_counts:
+        line_string, connector_infos = long_segment(n_connectors)
+        # sanity check that both approaches agree on the segments
+        expected = {seg.normalize().wkb for seg, _, _ in split_street_segment_iterative(line_string, connector_infos)}
+        actual = {seg.normalize().wkb for seg, _, _ in tools.split_street_segment(line_string, connector_infos)}
+        if expected != actual:
+            raise ValueError(f"Splitters disagree for {n_connectors} connectors.")
+        iter_time = min(
+            timeit.repeat(
+                partial(split_street_segment_iterative, line_string, connector_infos), number=1, repeat=repeats
+            )
+        )
+        lin_time = min(
+            timeit.repeat(partial(tools.split_street_segment, line_string, connector_infos), number=1, repeat=repeats)
+        )
+        print(f"{n_connectors:>10} {iter_time * 1000:>15.3f} {lin_time * 1000:>16.3f} {iter_time / lin_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark street segment splitting.")
+    parser.add_argument("--connectors", type=int, nargs="+", default=[2, 5, 10, 25, 50, 100, 200])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    run_benchmark(args.connectors, args.repeats)
@@ -0,0 +1,106 @@
+"""
+Synthetic Overture-shaped connector and segment frames for benchmarking the network construction path.
+Sizes are the approximate number of connectors.
+"""
+
+import geopandas as gpd
+import numpy as np
+from scipy.spatial import Delaunay
+from shapely import geometry
+
+
+def overture_frames(
+    node_xys: np.ndarray, segments: list[list[int]], classes: list[str], seed: int = 0
+) -> tuple[gpd.GeoDataFrame, gpd.GeoDataFrame]:
+    """
+    Builds connectors and segments frames as per the Overture schema from connector coordinates.
+    Each segment runs through its connectors in order, with a wiggle vertex between consecutive connectors.
+    """
+    rng = np.random.default_rng(seed)
+    node_ids = [f"c{idx}" for idx in range(len(node_xys))]
+    nodes_gdf = gpd.GeoDataFrame(
+        {"sources": [None] * len(node_xys)},
+        geometry=[geometry.Point(xy) for xy in node_xys],
+        index=node_ids,
+        crs=3035,
+    ).rename_geometry("geom")
+    rows = []
+    for seg_idxs, road_class in zip(segments, classes, strict=True):
+        seg_xys = node_xys[seg_idxs]
+        mid_xys = (seg_xys[:-1] + seg_xys[1:]) / 2 + rng.uniform(-2, 2, (len(seg_xys) - 1, 2))
+        coords = np.empty((2 * len(seg_xys) - 1, 2))
+        coords[::2] = seg_xys
+        coords[1::2] = mid_xys
+        seg_lens = np.cumsum(np.hypot(*np.diff(coords, axis=0).T))
+        ats = np.concatenate([[0], seg_lens[1::2]]) / seg_lens[-1]
+        rows.append(
+            {
+                "class": road_class,
+                "subtype": "road",
+                "connectors": np.array(
+                    [{"connector_id": node_ids[idx], "at": at} for idx, at in zip(seg_idxs, ats, strict=True)],
+                    dtype=object,
+                ),
+                "level_rules": None,
+                "names": None,
+                "routes": None,
+                "road_flags": None,
+                "geom": geometry.LineString(coords),
+            }
+        )
+    edges_gdf = gpd.GeoDataFrame(rows, geometry="geom", crs=3035)
+    edges_gdf.index = [f"s{idx}" for idx in range(len(edges_gdf))]  # type: ignore
+    return nodes_gdf, edges_gdf
+
+
+def grid_network(size: int, spacing: float = 100, span: int = 4, seed: int = 0):
+    """Jittered grid with streets running across several blocks per segment."""
+    rng = np.random.default_rng(seed)
+    side = max(int(np.sqrt(size)), 2)
+    cols, rows = np.meshgrid(np.arange(side), np.arange(side), indexing="ij")
+    node_xys = np.column_stack([cols.ravel(), rows.ravel()]) * spacing + rng.uniform(-5, 5, (side * side, 2))
+    node_idxs = np.arange(side * side).reshape(side, side)
+    segments, classes = [], []
+    for line_idx in range(side):
+        for line_idxs in [node_idxs[line_idx, :], node_idxs[:, line_idx]]:
+            for start in range(0, side - 1, span):
+                segments.append(line_idxs[start : start + span + 1].tolist())
+                classes.append("secondary" if line_idx % 5 == 0 else "residential")
+    return overture_frames(node_xys, segments, classes, seed)
+
+
+def organic_network(size: int, spacing: float = 100, seed: int = 0):
+    """Irregular mesh from a Delaunay triangulation of random connectors, with two connectors per segment."""
+    rng = np.random.default_rng(seed)
+    extent = np.sqrt(size) * spacing
+    node_xys = rng.uniform(0, extent, (size, 2))
+    simplices = Delaunay(node_xys).simplices
+    tri_edges = np.vstack([simplices[:, [0, 1]], simplices[:, [1, 2]], simplices[:, [0, 2]]])
+    tri_edges = np.unique(np.sort(tri_edges, axis=1), axis=0)
+    # thin out the triangulation to resemble street blocks
+    tri_edges = tri_edges[rng.uniform(size=len(tri_edges)) < 0.6]
+    return overture_frames(node_xys, tri_edges.tolist(), ["residential"] * len(tri_edges), seed)
+
+
+def arterial_network(size: int, spacing: float = 100, n_arterials: int = 10, seed: int = 0):
+    """Long arterials each spanning many connectors in a single segment, linked by cross streets."""
+    rng = np.random.default_rng(seed)
+    per_arterial = max(size // n_arterials, 2)
+    xs = np.tile(np.arange(per_arterial) * spacing, n_arterials)
+    ys = np.repeat(np.arange(n_arterials) * spacing * 5, per_arterial)
+    node_xys = np.column_stack([xs, ys]) + rng.uniform(-5, 5, (per_arterial * n_arterials, 2))
+    node_idxs = np.arange(per_arterial * n_arterials).reshape(n_arterials, per_arterial)
+    segments = [node_idxs[art_idx].tolist() for art_idx in range(n_arterials)]
+    classes = ["primary"] * n_arterials
+    for art_idx in range(n_arterials - 1):
+        for node_idx in range(0, per_arterial, 2):
+            segments.append([node_idxs[art_idx, node_idx], node_idxs[art_idx + 1, node_idx]])
+            classes.append("residential")
+    return overture_frames(node_xys, segments, classes, seed)
+
+
+NETWORK_KINDS = {
+    "grid": grid_network,
+    "organic": organic_network,
+    "arterial": arterial_network,
+}
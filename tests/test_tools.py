@@ -1,7 +1,27 @@
 # pyright: basic
+import os
+import socket
+import time
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+import shapely
+from affine import Affine
+from cityseer.tools import graphs, io, util
+from overturemaps import core
+from pyproj import Transformer
+from rasterio.io import MemoryFile
 from shapely import geometry
+from sqlalchemy.dialects.postgresql import JSON, JSONB
 
 from src import tools
+from src.data import loaders
+from src.processing import query_stats_report
+from tests.benchmarks import synthetic
 
 
 def test_split_street_segments():
@@ -62,5 +82,799 @@ def test_split_street_segments():
     assert seg_lines[2] not in [seg_lines[1], seg_lines[1].reverse(), seg_lines[0], seg_lines[0].reverse()]
 
 
+def test_split_street_segment_unordered():
+    line = geometry.LineString([(0, 0), (1, 0), (2, 0), (3, 0), (4, 0)])
+    # connectors out of order, one on a vertex, one between vertices, and line overhangs at both ends
+    connector_infos = [("c", geometry.Point(3.5, 0)), ("a", geometry.Point(0.5, 0)), ("b", geometry.Point(2, 0))]
+    seg_pairs = tools.split_street_segment(line, connector_infos)
+    assert [(seg_con_a[0], seg_con_b[0]) for _, seg_con_a, seg_con_b in seg_pairs] == [("a", "b"), ("b", "c")]
+    assert seg_pairs[0][0] == geometry.LineString([(0.5, 0), (1, 0), (2, 0)])
+    assert seg_pairs[1][0] == geometry.LineString([(2, 0), (3, 0), (3.5, 0)])
+    for seg_line, seg_con_a, seg_con_b in seg_pairs:
+        assert seg_con_a[1].touches(seg_line)
+        assert seg_con_b[1].touches(seg_line)
+    # reversed endpoint connectors are returned in line order
+    seg_pairs = tools.split_street_segment(line, [("b", geometry.Point(4, 0)), ("a", geometry.Point(0, 0))])
+    assert len(seg_pairs) == 1
+    assert seg_pairs[0][0] == line
+    assert seg_pairs[0][1][0] == "a"
+    # closed loops are split back to the connector at the start
+    ring = geometry.LineString([(0, 0), (10, 0), (10, 10), (0, 10), (0, 0)])
+    start, mid_a, mid_b = ("s", geometry.Point(0, 0)), ("m1", geometry.Point(10, 5)), ("m2", geometry.Point(0, 5))
+    seg_pairs = tools.split_street_segment(ring, [start, mid_a, mid_b])
+    assert [(seg_con_a[0], seg_con_b[0]) for _, seg_con_a, seg_con_b in seg_pairs] == [
+        ("s", "m1"),
+        ("m1", "m2"),
+        ("m2", "s"),
+    ]
+    assert sum(seg_line.length for seg_line, _, _ in seg_pairs) == ring.length
+    assert seg_pairs[2][0] == geometry.LineString([(0, 5), (0, 0)])
+    seg_pairs = tools.split_street_segment(ring, [start, mid_a])
+    assert [seg_line.length for seg_line, _, _ in seg_pairs] == [15, 25]
+
+
+def test_generate_graph():
+    # 4 x 4 grid with streets spanning three blocks per segment
+    nodes_gdf, edges_gdf = synthetic.grid_network(16, span=3)
+    assert edges_gdf["connectors"].map(len).max() == 4
+    multigraph = tools.generate_graph(nodes_gdf, edges_gdf)
+    # segments are split at each connector
+    assert multigraph.number_of_nodes() == 16
+    assert multigraph.number_of_edges() == 2 * 4 * 3
+    for start_key, end_key, edge_data in multigraph.edges(data=True):
+        start_xy = (multigraph.nodes[start_key]["x"], multigraph.nodes[start_key]["y"])
+        end_xy = (multigraph.nodes[end_key]["x"], multigraph.nodes[end_key]["y"])
+        assert {edge_data["geom"].coords[0], edge_data["geom"].coords[-1]} == {start_xy, end_xy}
+    # dropped road types
+    multigraph = tools.generate_graph(nodes_gdf, edges_gdf, drop_road_types=["secondary"])
+    assert multigraph.number_of_edges() == 2 * 4 * 3 - 2 * 3
+
+
+def test_dedupe_connectors():
+    nodes_gdf = gpd.GeoDataFrame(
+        {"sources": [None] * 4},
+        geometry=[geometry.Point(0, 0), geometry.Point(1, 1), geometry.Point(0, 0), geometry.Point(2, 2)],
+        index=["a", "b", "c", "d"],
+        crs=3035,
+    )
+    connector_map, merged_nodes = tools.dedupe_connectors(nodes_gdf)
+    assert connector_map.to_dict() == {"a": "a", "b": "b", "c": "a", "d": "d"}
+    assert merged_nodes.index.tolist() == ["a", "b", "d"]
+    assert merged_nodes.x.tolist() == [0, 1, 2]
+    edges_gdf = gpd.GeoDataFrame(
+        {
+            "connectors": [
+                [{"connector_id": "a", "at": 0}, {"connector_id": "b", "at": 1}],
+                [{"connector_id": "c", "at": 0}, {"connector_id": "a", "at": 0.5}, {"connector_id": "d", "at": 1}],
+                [{"connector_id": "b", "at": 0}, {"connector_id": "missing", "at": 1}],
+            ]
+        },
+        geometry=[
+            geometry.LineString([(0, 0), (1, 1)]),
+            geometry.LineString([(0, 0), (2, 2)]),
+            geometry.LineString([(1, 1), (3, 3)]),
+        ],
+        crs=3035,
+    )
+    edge_keys = tools.edge_connectors(edges_gdf, connector_map)
+    assert edge_keys.tolist() == [["a", "b"], ["a", "d"], None]
+
+
+def test_has_duplicate_edge():
+    seg_geom = geometry.LineString([(0, 0), (50, 0.4), (100, 0)])
+    edge_index: tools.EdgeIndex = {}
+    assert not tools.has_duplicate_edge(edge_index, "a", "b", seg_geom)
+    tools.add_edge_to_index(edge_index, "a", "b", seg_geom)
+    # a near copy in either direction is a duplicate
+    near_geom = geometry.LineString([(0, 0), (50, -0.4), (100, 0)])
+    assert tools.has_duplicate_edge(edge_index, "b", "a", near_geom)
+    # a parallel route between the same nodes is not a duplicate
+    far_geom = geometry.LineString([(0, 0), (50, 5), (100, 0)])
+    assert not tools.has_duplicate_edge(edge_index, "a", "b", far_geom)
+    # nor is the same geom between different nodes
+    assert not tools.has_duplicate_edge(edge_index, "a", "c", seg_geom)
+    # containment is one directional - a segment within an added edge's buffer is a duplicate
+    spur_geom = geometry.LineString([(0, 0), (50, 0), (50, 5), (50, 0), (100, 0)])
+    tools.add_edge_to_index(edge_index, "c", "d", spur_geom)
+    assert tools.has_duplicate_edge(edge_index, "c", "d", geometry.LineString([(0, 0), (100, 0)]))
+
+
+def test_dual_network_from_edges_gdf():
+    lines = [
+        [(0, 0), (100, 0)],
+        [(100, 0), (100, 50), (100, 100)],
+        [(0, 100), (100, 100)],
+        [(0, 0), (0, 100)],
+        # parallel, loop and dangling edges
+        [(0, 0), (50, 40), (100, 0)],
+        [(100, 100), (160, 140), (170, 80), (100, 100)],
+        [(100, 0), (180, -20)],
+        # sub-metre near-parallel edges merged by midline, the shortest running from the later node
+        [(-100, 100), (-50, 100.4), (0, 100)],
+        [(0, 100), (-50, 99.5), (-100, 100)],
+    ]
+    edges_gdf = gpd.GeoDataFrame({"geom": [geometry.LineString(line) for line in lines]}, geometry="geom", crs=3035)
+    nodes_dual_gdf, edges_dual_gdf = tools.dual_network_from_edges_gdf(edges_gdf)
+    nx_dual = graphs.nx_to_dual(io.nx_from_generic_geopandas(edges_gdf))
+    nx_nodes_gdf, nx_edges_gdf, _nx_network_structure = io.network_structure_from_nx(nx_dual, crs=3035)
+    assert set(nodes_dual_gdf.index) == set(nx_nodes_gdf.index)
+    assert set(edges_dual_gdf.index) == set(nx_edges_gdf.index)
+    nx_nodes_gdf = nx_nodes_gdf.loc[nodes_dual_gdf.index]
+    assert np.allclose(nodes_dual_gdf.x, nx_nodes_gdf.x)
+    assert np.allclose(nodes_dual_gdf.y, nx_nodes_gdf.y)
+    assert np.allclose(
+        shapely.hausdorff_distance(nodes_dual_gdf.primal_edge.values, nx_nodes_gdf.primal_edge.values), 0
+    )
+    assert np.allclose(
+        shapely.get_coordinates(nodes_dual_gdf.primal_edge.values),
+        shapely.get_coordinates(nx_nodes_gdf.primal_edge.values),
+    )
+    nx_edges_gdf = nx_edges_gdf.loc[edges_dual_gdf.index]
+    assert (edges_dual_gdf.primal_node_id == nx_edges_gdf.primal_node_id).all()
+    assert np.allclose(shapely.hausdorff_distance(edges_dual_gdf.geom.values, nx_edges_gdf.geom.values), 0)
+    assert np.allclose(edges_dual_gdf.total_bearing, nx_edges_gdf.total_bearing)
+    assert np.allclose(edges_dual_gdf.length, shapely.length(edges_dual_gdf.geom.values))
+    angle_sums = [util.measure_cumulative_angle(list(edge_geom.coords)) for edge_geom in edges_dual_gdf.geom]
+    assert np.allclose(edges_dual_gdf.angle_sum, angle_sums, atol=1e-4)
+    # the tables reassemble into a NetworkStructure as per the metrics
+    network_structure = io.network_structure_from_gpd(nodes_dual_gdf, edges_dual_gdf)
+    assert network_structure.node_count() == len(nodes_dual_gdf)
+    nx_export = tools.dual_network_to_nx(nodes_dual_gdf, edges_dual_gdf)
+    assert nx_export.number_of_nodes() == nx_dual.number_of_nodes()
+    assert nx_export.number_of_edges() == nx_dual.number_of_edges()
+
+
+def test_stitch_network_tiles():
+    def tile_gdf(rows):
+        return gpd.GeoDataFrame(
+            {
+                "start_nd_key": [row[0] for row in rows],
+                "end_nd_key": [row[1] for row in rows],
+                "geom": [geometry.LineString(row[2]) for row in rows],
+            },
+            geometry="geom",
+            crs=3035,
+        )
+
+    # tile (0, 0) spans x 0-100 and tile (1, 0) spans x 100-200
+    tile_a = tile_gdf(
+        [
+            ("a", "b", [(10, 50), (90, 50)]),
+            # crosses the seam with its midpoint in tile a
+            ("b", "c", [(90, 50), (105, 50)]),
+            # overlap copy owned by tile b
+            ("c", "d", [(105, 50), (190, 50)]),
+        ]
+    )
+    tile_b = tile_gdf(
+        [
+            # overlap copy owned by tile a
+            ("b", "c", [(90, 50), (105.5, 50)]),
+            # node c is placed slightly differently in tile b, and node d was consolidated under a new key
+            ("c", "e", [(105.5, 50), (180, 50)]),
+            ("e", "f", [(180, 50), (180, 90)]),
+            # crosses back into tile a with no node within the snap distance
+            ("g", "x", [(150, 10), (60, 50)]),
+            # node q is only reached from tile b and is not snapped to tile b's nearby node r
+            ("r", "q", [(103, 20), (105, 30), (96, 20)]),
+            # midpoint in cell (1, 1), which has no tile because its core doesn't intersect the bounds
+            ("f", "h", [(180, 90), (180, 130)]),
+        ]
+    )
+    stitched_gdf = loaders.stitch_network_tiles([((0, 0), tile_a), ((1, 0), tile_b)], (0, 0), 100)
+    assert len(stitched_gdf) == 7
+    assert "tile_key" not in stitched_gdf.columns
+    geoms = {
+        (start_key, end_key): geom
+        for start_key, end_key, geom in stitched_gdf[["start_nd_key", "end_nd_key", "geom"]].values
+    }
+    # seam ends snap to the owning tile's node by key
+    assert geoms[("b", "c")].coords[-1] == (105.5, 50)
+    assert geoms[("c", "e")].coords[0] == (105.5, 50)
+    # unmatched keys beyond the snap distance are left as is
+    assert geoms[("g", "x")].coords[-1] == (60, 50)
+    assert geoms[("r", "q")].coords[-1] == (96, 20)
+    # owned by the nearest tile
+    assert geoms[("f", "h")].coords[-1] == (180, 130)
+
+
+def _write_overture_mirror(
+    mirror_path, release: str, overture_type: str, geoms: list, row_group_size: int, **columns
+) -> None:
+    """Writes the geoms with id and bbox columns, and any other columns, per the Overture release layout."""
+    type_path = mirror_path / "release" / release / f"theme={core.type_theme_map[overture_type]}"
+    type_path = type_path / f"type={overture_type}"
+    type_path.mkdir(parents=True)
+    bounds = shapely.bounds(geoms)
+    table = pa.table(
+        {
+            "id": [f"{overture_type}_{idx}" for idx in range(len(geoms))],
+            "geometry": shapely.to_wkb(geoms),
+            "bbox": pa.StructArray.from_arrays(
+                [pa.array(bounds[:, col_idx], pa.float32()) for col_idx in range(4)],
+                ["xmin", "ymin", "xmax", "ymax"],
+            ),
+            **columns,
+        }
+    )
+    pq.write_table(table, type_path / "part-0.parquet", row_group_size=row_group_size)
+
+
+def test_iter_buildings(tmp_path, monkeypatch):
+    monkeypatch.setenv("OVERTURE_MIRROR", str(tmp_path))
+    monkeypatch.setenv("OVERTURE_RELEASE", "2024-01-01.0")
+    geoms = [geometry.Point(5 + idx * 0.001, 50).buffer(0.0001) for idx in range(30)]
+    _write_overture_mirror(
+        tmp_path,
+        "2024-01-01.0",
+        "building",
+        geoms,
+        row_group_size=10,
+        sources=[[{"dataset": "OpenStreetMap", "property": ""}]] * len(geoms),
+        names=[None, {"primary": "hall"}] * (len(geoms) // 2),
+        height=np.arange(len(geoms), dtype=float),
+    )
+    # the bounds trim the last buildings
+    bounds_geom = geometry.box(4.99, 49.99, 5.0245, 50.01)
+    buildings_gdf = loaders.load_buildings(bounds_geom, 3035)
+    batch_gdfs = list(loaders.iter_buildings(bounds_geom, 3035, batch_rows=4))
+    assert max(len(batch_gdf) for batch_gdf in batch_gdfs) == 4
+    streamed_gdf = pd.concat(batch_gdfs)
+    assert len(buildings_gdf) == 25
+    assert streamed_gdf.equals(buildings_gdf)
+    assert streamed_gdf.crs == buildings_gdf.crs
+    # remote batches follow the row groups, so are sliced to the batch rows
+    monkeypatch.delenv("OVERTURE_MIRROR")
+    remote_table = pq.read_table(tmp_path / "release" / "2024-01-01.0" / "theme=buildings" / "type=building")
+    monkeypatch.setattr(
+        loaders.core,
+        "record_batch_reader",
+        lambda *_args, **_kwargs: pa.RecordBatchReader.from_batches(
+            remote_table.schema, remote_table.to_batches(max_chunksize=10)
+        ),
+    )
+    batch_gdfs = list(loaders.iter_overture("building", (4.99, 49.99, 5.0245, 50.01), batch_rows=4))
+    assert [len(batch_gdf) for batch_gdf in batch_gdfs] == [4, 4, 2] * 3
+
+
+def test_series_to_json():
+    values = [
+        None,
+        "",
+        "name",
+        float("nan"),
+        {"primary": "café", "common": None, "rules": np.array([{"value": 1, "between": np.array([0.0, 0.5])}])},
+        np.array([{"dataset": "OpenStreetMap", "record_id": "", "confidence": None}], dtype=object),
+        np.array([], dtype=object),
+        {"primary": 'quote"', "alternate": np.array(["a", ""], dtype=object)},
+        [("a", 1), {"": True}],
+        ["back\\", "", 'mid""quote', {"": ""}],
+    ]
+    col = pd.Series(values, index=[f"id_{idx}" for idx in range(len(values))], dtype=object)
+    json_col = tools.series_to_json(col)
+    assert json_col.index.equals(col.index)
+    assert list(json_col) == [tools.col_to_json(value) for value in values]
+    assert json_col.iloc[5] == '[{"dataset": "OpenStreetMap", "record_id": null, "confidence": null}]'
+
+
+def test_reproject_geometry():
+    transformer = Transformer.from_crs(4326, 3035, always_xy=True)
+    point = tools.reproject_geometry(geometry.Point(13.4, 52.5), 4326, 3035)
+    assert np.allclose(point.coords[0], transformer.transform(13.4, 52.5))
+    assert tools.get_transformer(4326, 3035) is tools.get_transformer(4326, 3035)
+    # arrays of geometries are reprojected in one call
+    bounds_geom = geometry.box(13.3, 52.4, 13.5, 52.6).buffer(0.01)
+    geoms = np.array([bounds_geom, geometry.LineString([(13.4, 52.5), (13.5, 52.6)]), None])
+    reprojected_geoms = tools.reproject_geometry(geoms, 4326, 3035)
+    assert reprojected_geoms[0].equals(tools.reproject_geometry(bounds_geom, 4326, 3035))
+    assert np.allclose(reprojected_geoms[1].coords[1], transformer.transform(13.5, 52.6))
+    assert reprojected_geoms[2] is None
+    round_trip_geom = tools.reproject_geometry(reprojected_geoms[0], 3035, 4326)
+    assert round_trip_geom.equals_exact(bounds_geom, 1e-7)
+
+
+def test_trim_to_bounds():
+    rng = np.random.default_rng(0)
+    xys = rng.uniform(0, 1000, (2000, 2))
+    geoms = [geometry.Point(xy) for xy in xys[:500]]
+    geoms += [geometry.LineString([xy, xy + rng.uniform(-50, 50, 2)]) for xy in xys[500:1500]]
+    geoms += [geometry.Point(xy).buffer(20) for xy in xys[1500:]] + [None, geometry.Polygon()]
+    gdf = gpd.GeoDataFrame({"idx": range(len(geoms))}, geometry=geoms, crs=3035)
+    # a bounds with a hole and a boundary running through features
+    bounds_geom = geometry.Point(500, 500).buffer(400).difference(geometry.Point(450, 550).buffer(100))
+    bounds_geom = bounds_geom.union(geometry.box(0, 0, 200, 200))
+    trimmed_gdf = tools.trim_to_bounds(gdf, bounds_geom)
+    assert trimmed_gdf.equals(gdf[gdf.intersects(bounds_geom)])
+    assert 0 < len(trimmed_gdf) < len(gdf)
+    assert tools.trim_to_bounds(gdf.iloc[:0], bounds_geom).empty
+
+
+def test_raster_zonal_stats():
+    rng = np.random.default_rng(0)
+    values = rng.uniform(0, 30, (200, 300)).astype(np.float32)
+    values[rng.uniform(size=values.shape) < 0.2] = -9999
+    values[:40, :40] = -9999
+    profile = {"driver": "GTiff", "height": 200, "width": 300, "count": 1, "dtype": "float32", "nodata": -9999}
+    # overlapping buffered footprints, including some beyond the raster and over nodata only
+    xys = rng.uniform(-50, 3050, (400, 2))
+    geoms = [geometry.box(x, y, x + rng.uniform(2, 40), y + rng.uniform(2, 40)).buffer(5) for x, y in xys]
+    geoms += [geometry.Point(100, 1900).buffer(30), geometry.Point(5000, 5000).buffer(5), geometry.Point(1, 1)]
+    with MemoryFile() as memfile:
+        with memfile.open(**profile, transform=Affine(10, 0, 0, 0, -10, 2000)) as rast_data:
+            rast_data.write(values, 1)
+        with memfile.open() as rast_data:
+            means, counts = tools.raster_zonal_stats(geoms, rast_data)
+    # reference as per rasterio.mask, which keeps the pixels with centres inside each geometry
+    rows, cols = np.indices(values.shape)
+    xs, ys = (cols + 0.5) * 10, 2000 - (rows + 0.5) * 10
+    ref_means = []
+    for geom in geoms:
+        pixels = values[shapely.contains_xy(geom, xs, ys)]
+        valid_pixels = pixels[pixels != -9999]
+        ref_means.append(np.mean(valid_pixels) if len(valid_pixels) > 0 else np.nan)
+    assert np.allclose(means, ref_means, rtol=1e-6, equal_nan=True)
+    assert np.isnan(means[-3:]).all() and (counts[-3:] == 0).all()
+    assert (counts[:-3] > 0).any()
+
+
+def test_geometry_signatures():
+    line = geometry.LineString([(0, 0), (10, 10)])
+    jittered = geometry.LineString([(0, 1e-6), (10, 10 + 1e-6)])
+    moved = geometry.LineString([(0, 0), (10, 11)])
+    signatures = tools.geometry_signatures([line, jittered, moved])
+    # reprojection noise is ignored but real changes are not
+    assert signatures[0] == signatures[1]
+    assert signatures[0] != signatures[2]
+    attr_signatures = tools.geometry_signatures([line, line], attrs=["primary|a,b", "primary|a,c"])
+    assert attr_signatures[0] != attr_signatures[1]
+    stored = pd.Series(["x", "y", "z"], index=["a", "b", "c"])
+    fresh = pd.Series(["x", "y2", "w", "v"], index=["a", "b", "d", "e"])
+    assert tools.diff_signatures(stored, fresh) == {"added": 2, "removed": 1, "changed": 1}
+    assert tools.diff_signatures(stored, stored) == {"added": 0, "removed": 0, "changed": 0}
+
+
+def test_network_cache(tmp_path):
+    bounds_geom = geometry.box(0, 0, 1, 1)
+    cache_key = loaders.network_cache_key(bounds_geom, 3035, "2024-01-01.0")
+    # keys are stable and change with the inputs
+    assert cache_key == loaders.network_cache_key(bounds_geom, 3035, "2024-01-01.0")
+    assert cache_key != loaders.network_cache_key(bounds_geom, 3035, "2024-02-01.0")
+    assert cache_key != loaders.network_cache_key(bounds_geom, 27700, "2024-01-01.0")
+    assert cache_key != loaders.network_cache_key(geometry.box(0, 0, 1, 2), 3035, "2024-01-01.0")
+    assert cache_key != loaders.network_cache_key(bounds_geom, 3035, "2024-01-01.0", tile_size=1000)
+    assert loaders.read_network_cache(tmp_path, cache_key) is None
+    gdfs = tuple(
+        gpd.GeoDataFrame(
+            {"names": [["a"], []], "geom": [geometry.Point(idx, 0), geometry.Point(idx, 1)]},
+            index=["x", "y"],
+            geometry="geom",
+            crs=3035,
+        )
+        for idx in range(len(loaders.NETWORK_CACHE_LAYERS))
+    )
+    loaders.write_network_cache(tmp_path, cache_key, gdfs, max_bytes=10**9)
+    cached_gdfs = loaders.read_network_cache(tmp_path, cache_key)
+    assert cached_gdfs is not None
+    for gdf, cached_gdf in zip(gdfs, cached_gdfs, strict=True):
+        assert gdf.equals(cached_gdf)
+        assert cached_gdf.crs == gdf.crs
+    # least recently used entries are evicted first but never the entry just written
+    other_key = loaders.network_cache_key(bounds_geom, 3035, "2024-02-01.0")
+    loaders.write_network_cache(tmp_path, other_key, gdfs, max_bytes=10**9)
+    os.utime(tmp_path / other_key, (0, 0))
+    entry_bytes = sum(file_path.stat().st_size for file_path in (tmp_path / cache_key).iterdir())
+    third_key = loaders.network_cache_key(bounds_geom, 3035, "2024-03-01.0")
+    loaders.write_network_cache(tmp_path, third_key, gdfs, max_bytes=2 * entry_bytes)
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted([cache_key, third_key])
+    loaders.write_network_cache(tmp_path, other_key, gdfs, max_bytes=1)
+    assert [path.name for path in tmp_path.iterdir()] == [other_key]
+
+
+def test_overture_mirror(tmp_path, monkeypatch):
+    monkeypatch.setenv("OVERTURE_MIRROR", str(tmp_path))
+    monkeypatch.delenv("OVERTURE_RELEASE", raising=False)
+    (tmp_path / "release" / "2024-01-01.0").mkdir(parents=True)
+    assert loaders.overture_release() == "2024-01-01.0"
+    # connectors along a line, written in row groups of five
+    for overture_type, geoms in [
+        ("connector", [geometry.Point(idx, 0) for idx in range(20)]),
+        ("segment", [geometry.LineString([(idx, 0), (idx + 1, 0)]) for idx in range(19)]),
+    ]:
+        _write_overture_mirror(
+            tmp_path,
+            "2024-02-01.0",
+            overture_type,
+            geoms,
+            row_group_size=5,
+            version=[0] * len(geoms),
+            subtype=["road"] * len(geoms),
+            unused=["x"] * len(geoms),
+        )
+    assert loaders.overture_release() == "2024-02-01.0"
+    nodes_gdf = loaders.read_overture("connector", (4.5, -1, 8.5, 1), columns=loaders.OVERTURE_COLUMNS["connector"])
+    assert list(nodes_gdf["id"]) == ["connector_5", "connector_6", "connector_7", "connector_8"]
+    assert list(nodes_gdf.columns) == ["id", "geometry", "bbox", "version"]
+    assert nodes_gdf.geometry.iloc[0].equals(geometry.Point(5, 0))
+    assert len(loaders.read_overture("connector", (4.5, -1, 8.5, 1)).columns) == 6
+    # same shape as from the remote release
+    nodes_gdf, edges_gdf = loaders.fetch_network(geometry.box(4.5, -1, 8.5, 1), 3035)
+    assert nodes_gdf.index.name == "id" and nodes_gdf.geometry.name == "geom" and nodes_gdf.crs == 3035
+    assert list(edges_gdf.columns) == ["geom", "version", "subtype"]
+    assert len(edges_gdf) == 5
+
+
+def _fail_on_odd(bound_fid: int, out_path: str) -> None:
+    if bound_fid % 2:
+        raise ValueError(f"odd bounds fid {bound_fid}")
+    with open(out_path, "a") as out_file:
+        out_file.write(f"{bound_fid}\n")
+
+
+def _crash_on_three(bound_fid: int, out_path: str) -> None:
+    if bound_fid == 3:
+        os._exit(1)
+    time.sleep(0.05)
+    with open(out_path, "a") as out_file:
+        out_file.write(f"{bound_fid}\n")
+
+
+def test_process_bounds_in_pool(tmp_path):
+    for parallel_workers in [1, 2]:
+        out_path = tmp_path / f"{parallel_workers}.txt"
+        bounds_args = ((bound_fid, [bound_fid, str(out_path)]) for bound_fid in range(9))
+        # failures don't stop the remaining bounds
+        failed_fids = tools.process_bounds_in_pool(_fail_on_odd, bounds_args, parallel_workers, max_in_flight=2)
+        assert sorted(failed_fids) == [1, 3, 5, 7]
+        assert sorted(int(line) for line in out_path.read_text().split()) == [0, 2, 4, 6, 8]
+    # a crashed worker only fails its own bounds and the pool carries on
+    out_path = tmp_path / "crash.txt"
+    bounds_args = ((bound_fid, [bound_fid, str(out_path)]) for bound_fid in range(12))
+    failed_fids = tools.process_bounds_in_pool(_crash_on_three, bounds_args, 2, max_in_flight=4)
+    assert failed_fids == [3]
+    assert sorted(int(line) for line in out_path.read_text().split()) == [idx for idx in range(12) if idx != 3]
+
+
+def _write_or_crash_once(bound_fid: int, marker_path: str) -> None:
+    time.sleep(0.2)
+    if bound_fid == 3 and not os.path.exists(marker_path):
+        open(marker_path, "w").close()
+        os._exit(1)
+    tools.db_execute("INSERT INTO test_pool.out VALUES (%s);", (bound_fid,))  # type: ignore
+
+
+def _tracked_crash_once(bound_fid: int, marker_path: str) -> bool:
+    return tools.process_func_with_bound_tracking(
+        bound_fid,
+        "test_pool",
+        _write_or_crash_once,
+        [bound_fid, marker_path],
+        "test_pool",
+        ["out"],
+        "test_pool",
+        "bounds",
+        "geom",
+        "fid",
+    )
+
+
+def test_process_bounds_in_pool_tracked(tmp_path):
+    try:
+        tools.db_execute("DROP SCHEMA IF EXISTS test_pool CASCADE; DROP TABLE IF EXISTS loads.test_pool;")
+    except Exception:
+        pytest.skip("Requires a database per DB_CONFIG.")
+    tools.db_execute(
+        """
+        CREATE SCHEMA test_pool;
+        CREATE TABLE test_pool.bounds AS SELECT idx AS fid, NULL::bytea AS geom FROM generate_series(0, 7) idx;
+        CREATE TABLE test_pool.out (bounds_fid integer);
+        """
+    )
+    try:
+        # the crashed bounds and the bounds killed alongside it are reclaimed from the dead workers and rerun
+        marker_path = str(tmp_path / "crashed")
+        bounds_args = ((bound_fid, [bound_fid, marker_path]) for bound_fid in range(8))
+        assert tools.process_bounds_in_pool(_tracked_crash_once, bounds_args, 2, max_in_flight=4) == []
+        assert os.path.exists(marker_path)
+        assert sorted(row[0] for row in tools.db_fetch("SELECT bounds_fid FROM test_pool.out;")) == list(range(8))
+        assert tools.db_fetch("SELECT DISTINCT state FROM loads.test_pool;") == [("done",)]
+        # a bounds held by a live worker is skipped, but fails a crash rerun
+        tools.db_execute(
+            """
+            UPDATE loads.test_pool
+            SET state = 'running', worker = %s, lease_expires_at = now() + interval '1 hour'
+            WHERE fid = 5;
+            """,
+            (tools.tracking_worker_id(),),  # type: ignore
+        )
+        assert tools.process_bounds_in_pool(_tracked_crash_once, [(5, [5, marker_path])]) == []
+        with pytest.raises(RuntimeError, match="Could not reclaim bounds fid 5"):
+            tools._run_bounds_isolated(5, _tracked_crash_once, [5, marker_path])
+        # unless the worker holding it has stopped
+        stopped_worker = f"{socket.gethostname()}:99999999"
+        tools.db_execute("UPDATE loads.test_pool SET worker = %s WHERE fid = 5;", (stopped_worker,))  # type: ignore
+        assert tools.process_bounds_in_pool(_tracked_crash_once, [(5, [5, marker_path])]) == []
+        assert tools.db_fetch("SELECT state, worker FROM loads.test_pool WHERE fid = 5;") == [
+            ("done", tools.tracking_worker_id())
+        ]
+    finally:
+        tools.db_execute("DROP SCHEMA IF EXISTS test_pool CASCADE; DROP TABLE IF EXISTS loads.test_pool;")
+
+
 def test_prepare_schema():
-    tools.generate_overture_schema()
+    overture_schema = tools.generate_overture_schema()
+    category_lookup = tools.overture_category_lookup(overture_schema)
+    # matches scanning the major categories in order
+    for lu_cat_desc in {lu_cat for major_cat_vals in overture_schema.values() for lu_cat in major_cat_vals}:
+        assert category_lookup[lu_cat_desc] == next(
+            major_cat for major_cat, major_cat_vals in overture_schema.items() if lu_cat_desc in major_cat_vals
+        )
+    assert "not_a_category" not in category_lookup
+
+
+def test_get_sqlalchemy_engine_process_local(monkeypatch):
+    """ """
+    monkeypatch.setenv(
+        "DB_CONFIG", '{"host": "localhost", "port": 5432, "user": "u", "dbname": "db", "password": "p@ss"}'
+    )
+    monkeypatch.setattr(tools, "_ENGINE", None)
+    monkeypatch.setattr(tools, "_ENGINE_PID", None)
+    engine = tools.get_sqlalchemy_engine()
+    # reused within the same process
+    assert tools.get_sqlalchemy_engine() is engine
+    assert engine.url.password == "p@ss"
+    assert engine.pool.size() == 3  # type: ignore
+    # rebuilt if the process changes, e.g. forked workers
+    monkeypatch.setattr(tools, "_ENGINE_PID", -1)
+    assert tools.get_sqlalchemy_engine() is not engine
+    tools._reset_engine_after_fork()
+    assert tools._ENGINE is None
+
+
+def test_bulk_to_postgis_column_types():
+    """ """
+    gdf = gpd.GeoDataFrame(
+        {
+            "class": ["a", None],
+            "sources": ['{"a": 1}', "null"],
+            "n": np.array([1, 2], dtype="int64"),
+            "n32": np.array([1, 2], dtype="int32"),
+            "v": [1.5, np.nan],
+            "b": [True, False],
+            "geom": [geometry.Point(0, 0), geometry.LineString([(0, 0), (1, 1)])],
+        },
+        geometry="geom",
+        crs=3035,
+    )
+    assert tools._sql_type_for_column(gdf["class"]) == "text"
+    assert tools._sql_type_for_column(gdf["sources"], JSON) == "JSON"
+    assert tools._sql_type_for_column(gdf["sources"], "jsonb") == "jsonb"
+    assert tools._sql_type_for_column(gdf["n"]) == "bigint"
+    assert tools._sql_type_for_column(gdf["n32"]) == "integer"
+    assert tools._sql_type_for_column(gdf["v"]) == "double precision"
+    assert tools._sql_type_for_column(gdf["b"]) == "boolean"
+    assert tools._sql_type_for_column(gdf["geom"]) == "geometry(GEOMETRY, 3035)"
+    # values are converted for the target column types
+    assert tools._copy_values_for_column(gdf["v"], "float8") == ("float8", [1.5, None])
+    assert tools._copy_values_for_column(gdf["n"], "text") == ("text", ["1", "2"])
+    assert tools._copy_values_for_column(gdf["class"], "json") == ("text", ["a", None])
+    copy_type, ewkbs = tools._copy_values_for_column(gdf["geom"], "geometry")
+    assert copy_type == "bytea"
+    assert shapely.get_srid(shapely.from_wkb(ewkbs[0])) == 3035
+    assert shapely.from_wkb(ewkbs[1]).equals(gdf.geom.iloc[1])
+
+
+def test_bulk_to_postgis_round_trip():
+    try:
+        tools.db_execute("DROP SCHEMA IF EXISTS test_bulk CASCADE;")
+    except Exception:
+        pytest.skip("Requires a database per DB_CONFIG.")
+    tools.db_execute("CREATE SCHEMA test_bulk;")
+    try:
+        data_df = pd.DataFrame(
+            {
+                "class": ["a", None],
+                "sources": ['{"a": 1}', "null"],
+                "n": np.array([1, 2], dtype="int64"),
+                "v": [1.5, np.nan],
+                "b": [True, False],
+                "ts": pd.to_datetime(["2024-01-01 12:00", None]),
+            },
+            index=pd.Index(["x", "y"]),
+        )
+        rows = [
+            ("x", "a", {"a": 1}, 1, 1.5, True, pd.Timestamp("2024-01-01 12:00").to_pydatetime()),
+            ("y", None, None, 2, None, False, None),
+        ]
+        # new tables are created from the dtypes and written with binary COPY
+        tools.bulk_to_postgis(
+            data_df, "new", schema="test_bulk", index=True, index_label="fid", dtype={"sources": JSONB}
+        )
+        assert tools.db_fetch("SELECT fid, class, sources, n, v, b, ts FROM test_bulk.new ORDER BY fid;") == rows
+        # with a btree index on the index column, as per to_postgis
+        assert tools.db_fetch("SELECT indexname FROM pg_indexes WHERE schemaname = 'test_bulk';") == [("ix_new_fid",)]
+        # appends to pre-existing tables follow the target column types
+        tools.bulk_to_postgis(data_df, "new", schema="test_bulk", if_exists="append", index=True, index_label="fid")
+        assert tools.db_fetch("SELECT count(*) FROM test_bulk.new;") == [(4,)]
+        # including types without a binary conversion, which are written with text COPY
+        tools.db_execute(
+            """
+            CREATE TABLE test_bulk.existing (
+                fid varchar, class text, sources json, n numeric, v double precision, b boolean, ts timestamp
+            );
+            """
+        )
+        tools.bulk_to_postgis(
+            data_df, "existing", schema="test_bulk", if_exists="append", index=True, index_label="fid"
+        )
+        assert tools.db_fetch("SELECT fid, class, sources, n, v, b, ts FROM test_bulk.existing ORDER BY fid;") == rows
+        assert tools.db_fetch("SELECT pg_typeof(n)::text FROM test_bulk.existing LIMIT 1;") == [("numeric",)]
+    finally:
+        tools.db_execute("DROP SCHEMA IF EXISTS test_bulk CASCADE;")
+
+
+def test_bulk_to_postgis_geometry_round_trip():
+    try:
+        tools.db_execute("DROP SCHEMA IF EXISTS test_bulk_geom CASCADE;")
+    except Exception:
+        pytest.skip("Requires a database per DB_CONFIG.")
+    if not tools.db_fetch("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'postgis');")[0][0]:
+        pytest.skip("Requires PostGIS.")
+    tools.db_execute("CREATE SCHEMA test_bulk_geom;")
+    try:
+        gdf = gpd.GeoDataFrame(
+            {"n": [1, 2], "geom": [geometry.Point(0, 0), geometry.LineString([(0, 0), (1, 1)])]},
+            index=pd.Index(["x", "y"]),
+            geometry="geom",
+            crs=3035,
+        )
+        rows = [("x", 1, "POINT(0 0)", 3035), ("y", 2, "LINESTRING(0 0,1 1)", 3035)]
+        query = "SELECT fid, n, ST_AsText(geom), ST_SRID(geom) FROM test_bulk_geom.{} ORDER BY fid;"
+        # geoms are written as EWKB with binary COPY into new tables
+        tools.bulk_to_postgis(gdf, "new", schema="test_bulk_geom", index=True, index_label="fid")
+        assert tools.db_fetch(query.format("new")) == rows
+        assert sorted(
+            row[0] for row in tools.db_fetch("SELECT indexname FROM pg_indexes WHERE schemaname = 'test_bulk_geom';")
+        ) == ["idx_new_geom", "ix_new_fid"]
+        # and as hex EWKB with text COPY into pre-existing tables with types without a binary conversion
+        tools.db_execute("CREATE TABLE test_bulk_geom.existing (fid text, n numeric, geom geometry(GEOMETRY, 3035));")
+        tools.bulk_to_postgis(
+            gdf, "existing", schema="test_bulk_geom", if_exists="append", index=True, index_label="fid"
+        )
+        assert tools.db_fetch(query.format("existing")) == rows
+    finally:
+        tools.db_execute("DROP SCHEMA IF EXISTS test_bulk_geom CASCADE;")
+
+
+def test_bulk_to_postgis_partitions():
+    try:
+        tools.db_execute("DROP SCHEMA IF EXISTS test_partitions CASCADE;")
+    except Exception:
+        pytest.skip("Requires a database per DB_CONFIG.")
+    tools.db_execute("CREATE SCHEMA test_partitions;")
+
+    def attached_partitions() -> list[str]:
+        rows = tools.db_fetch(
+            "SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = 'test_partitions.out'::regclass;"
+        )
+        return sorted(row[0] for row in rows)
+
+    def bounds_rows() -> list[tuple]:
+        return tools.db_fetch("SELECT bounds_fid, fid, val FROM test_partitions.out ORDER BY fid;")
+
+    try:
+        data_df = pd.DataFrame({"bounds_fid": [1, 1, 2], "val": [0.5, 1.5, 2.5]}, index=pd.Index(["a", "b", "c"]))
+        tools.bulk_to_postgis(
+            data_df,
+            "out",
+            schema="test_partitions",
+            if_exists="append",
+            index=True,
+            index_label="fid",
+            partition_by="bounds_fid",
+        )
+        assert tools.check_table_partitioned("test_partitions", "out")
+        # each bounds is loaded into a standalone table with a matching CHECK and then attached
+        assert attached_partitions() == ["test_partitions.out_bounds_1", "test_partitions.out_bounds_2"]
+        assert tools.db_fetch(
+            "SELECT conname FROM pg_constraint WHERE conrelid = 'test_partitions.out_bounds_1'::regclass;"
+        ) == [("out_bounds_1_check",)]
+        assert bounds_rows() == [(1, "a", 0.5), (1, "b", 1.5), (2, "c", 2.5)]
+        # appends to an attached partition, the partition column is taken from the existing table
+        tools.bulk_to_postgis(
+            pd.DataFrame({"bounds_fid": [2], "val": [3.5]}, index=pd.Index(["d"])),
+            "out",
+            schema="test_partitions",
+            if_exists="append",
+            index=True,
+            index_label="fid",
+        )
+        assert tools.db_fetch("SELECT fid FROM test_partitions.out_bounds_2 ORDER BY fid;") == [("c",), ("d",)]
+        # dropping content truncates the bounds partition only, which stays attached for the reload
+        tools.drop_content("test_partitions", "out", "test_partitions", "bounds", 2)
+        assert bounds_rows() == [(1, "a", 0.5), (1, "b", 1.5)]
+        assert attached_partitions() == ["test_partitions.out_bounds_1", "test_partitions.out_bounds_2"]
+        tools.bulk_to_postgis(
+            pd.DataFrame({"bounds_fid": [2], "val": [4.5]}, index=pd.Index(["e"])),
+            "out",
+            schema="test_partitions",
+            if_exists="append",
+            index=True,
+            index_label="fid",
+        )
+        assert bounds_rows() == [(1, "a", 0.5), (1, "b", 1.5), (2, "e", 4.5)]
+        # bounds without a partition are skipped
+        tools.drop_content("test_partitions", "out", "test_partitions", "bounds", 3)
+        assert len(bounds_rows()) == 3
+    finally:
+        tools.db_execute("DROP SCHEMA IF EXISTS test_partitions CASCADE;")
+
+
+def test_records_to_gdf():
+    """ """
+    ewkbs = shapely.to_wkb(shapely.set_srid(shapely.points([[0, 0], [1, 1]]), 3035), include_srid=True)
+    records = [("a", 1.0, ewkbs[0]), ("b", None, ewkbs[1])]
+    gdf = tools._records_to_gdf(["fid", "v", "geom"], records, "fid", "geom")  # type: ignore
+    assert list(gdf.index) == ["a", "b"]
+    assert gdf.geometry.name == "geom"
+    assert gdf.crs.to_epsg() == 3035
+    assert gdf.geom.iloc[1].equals(geometry.Point(1, 1))
+    # empty results keep their columns
+    gdf = tools._records_to_gdf(["fid", "v", "geom"], [], "fid", "geom")
+    assert gdf.empty
+    assert list(gdf.columns) == ["v", "geom"]
+
+
+def test_query_stats_jsonl(monkeypatch, tmp_path):
+    """ """
+    sink_path = tmp_path / "query_stats.jsonl"
+    monkeypatch.setenv("QUERY_STATS_SINK", str(sink_path))
+    # restored on teardown once overwritten by start_query_stats_run
+    monkeypatch.setenv("QUERY_STATS_RUN_ID", "")
+    tools.start_query_stats_run()
+    with tools.query_stats_bounds(12):
+        for _ in range(3):
+            with tools.record_query_stats("slow_query") as record:
+                record["rows"] = 10
+                record["bytes"] = tools._estimate_bytes([("abc", b"de", 1, None)])
+        with tools.record_query_stats("fast_query"):
+            pass
+    # records are flushed when leaving the bounds context
+    assert not tools._QUERY_STATS_BUFFER
+    stats_df = query_stats_report.load_query_stats(str(sink_path))
+    assert len(stats_df) == 4
+    assert set(stats_df["bounds_fid"]) == {"12"}
+    summary_df = query_stats_report.summarise_query_stats(stats_df)
+    assert summary_df.loc["slow_query", "count"] == 3
+    assert summary_df.loc["slow_query", "rows"] == 30
+    assert summary_df.loc["slow_query", "mb"] == 3 * 13 / 1e6
+
+
+def test_stage_stats_jsonl(monkeypatch, tmp_path):
+    """ """
+    sink_path = tmp_path / "stage_stats.jsonl"
+    monkeypatch.setenv("STAGE_STATS_SINK", str(sink_path))
+    monkeypatch.setenv("QUERY_STATS_RUN_ID", "")
+    tools.start_query_stats_run()
+    with tools.query_stats_bounds(12):
+        for _ in range(2):
+            with tools.record_stage_stats("network.generate_graph") as stage:
+                # hold an allocation across a sample
+                _arr = np.ones(2_000_000)
+                time.sleep(2 * tools.STAGE_STATS_SAMPLE_SECONDS)
+                stage["nodes"], stage["edges"] = 5, 7
+        with tools.record_stage_stats("network.trim"):
+            pass
+    assert not tools._STAGE_STATS_BUFFER
+    stats_df = query_stats_report.load_query_stats(str(sink_path), table="stage_stats")
+    assert len(stats_df) == 3
+    assert set(stats_df["bounds_fid"]) == {"12"}
+    assert (stats_df["peak_rss_mb"] > 0).all()
+    summary_df = query_stats_report.summarise_stage_stats(stats_df)
+    assert summary_df.index[0] == "network.generate_graph"
+    assert summary_df.loc["network.generate_graph", "count"] == 2
+    assert summary_df.loc["network.generate_graph", "edges"] == 14
+    # stages are not recorded without a sink
+    monkeypatch.delenv("STAGE_STATS_SINK")
+    with tools.record_stage_stats("network.trim") as stage:
+        stage["rows"] = 1
+    assert not tools._STAGE_STATS_BUFFER